@@ -1,8 +1,20 @@
-from flask import Flask, render_template, request
-from flight_analysis.models import FlightDatabase
+import hashlib
+import threading
+import time
+from collections.abc import Mapping
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import Flask, Response, g, jsonify, render_template, request, stream_template
+from flight_analysis.export import EXPORT_FORMATS
+from flight_analysis.live import LiveDatabase
+from flight_analysis.loading import process_pool
+from flight_analysis.metrics import METRICS, server_timing
+from flight_analysis.visualizer import CHARTS, FORMATS, FlightVisualizer
 
 app = Flask(__name__)
-db = FlightDatabase("csv_files/flights_test.csv")
+
+# Loaded in the background and rebuilt when the CSV changes; see pin_database()
+live = LiveDatabase("csv_files/flights_test.csv", snapshot=True).start()
 
 # Define available actions for buttons
 ACTIONS = [
@@ -22,27 +34,188 @@ ACTIONS = [
     "unique_airports"
 ]
 
+# Flights per page for the sort actions and filters, by default and at most; whole result sets
+# are streamed by /export.<fmt> instead
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+
+# Sort actions -> (sort key, reverse)
+SORTS = {
+    "sort_by_date": ("date", True),
+    "sort_by_duration": ("duration", True),
+    "sort_by_airline": ("airline", False),
+}
+
+# JSON filter endpoints -> the query parameters they take, named like the method arguments
+FILTERS = {
+    "filter_by_airline": ("airline_name",),
+    "filter_by_class": ("flight_class",),
+    "filter_by_reason": ("reason",),
+    "filter_by_route": ("from_iata", "to_iata"),
+    "filter_by_date_range": ("start_date", "end_date"),
+}
+
+# JSON filter endpoints -> the FlightQuery.where() condition answering them
+FILTER_CONDITIONS = {
+    "filter_by_airline": "airline",
+    "filter_by_class": "flight_class",
+    "filter_by_reason": "reason",
+    "filter_by_route": "route",
+    "filter_by_date_range": "date_between",
+}
+
+# Export filters -> the query parameters they take, see FlightQuery.where()
+EXPORT_FILTERS = {
+    "airline": ("airline",),
+    "flight_class": ("flight_class",),
+    "reason": ("reason",),
+    "route": ("from_iata", "to_iata"),
+    "date_between": ("start_date", "end_date"),
+}
+
+# Seconds clients and proxies may reuse a JSON response before revalidating it with its ETag
+API_MAX_AGE = 10
+
+# Processes drawing charts, so matplotlib never holds the GIL of the request threads
+CHART_WORKERS = 2
+
+_chart_pool = None
+_visualizers = {}
+_visualizers_lock = threading.Lock()
+
+
+@app.before_request
+def start_timing():
+    """With metrics enabled, collect the phases timed during the request for Server-Timing."""
+    if METRICS.enabled:
+        g.request_start = time.perf_counter()
+        g.timings = METRICS.start_timings()
+
+
+@app.after_request
+def report_timing(response):
+    """Add the Server-Timing header and record the request latency."""
+    if METRICS.enabled and "timings" in g:
+        total = time.perf_counter() - g.request_start
+        response.headers["Server-Timing"] = server_timing(g.timings, total=total)
+        name = request.values.get("action") if request.endpoint == "index" else (request.view_args or {}).get("name")
+        label = name if name in ACTIONS or name in FILTERS else ""
+        METRICS.observe("flight_request_seconds", total, endpoint=request.endpoint or "", action=label)
+    return response
+
+
+@app.teardown_request
+def stop_timing(exc):
+    if METRICS.enabled:
+        METRICS.stop_timings()
+
+
+@app.before_request
+def pin_database():
+    """
+    Give the request the database in service when it starts, as g.db.
+
+    The request keeps using that database even if a reload swaps in a new one meanwhile.
+    Until the first load has finished, requests get a 503 with the loading status.
+    """
+    if request.endpoint in ("health", "metrics", "static"):
+        return None
+    current = live.current()
+    if current is None:
+        response = jsonify(live.status())
+        response.status_code = 503
+        response.headers["Retry-After"] = "1"
+        return response
+    g.generation, g.db = current
+    return None
+
+
+@app.get("/health")
+def health():
+    """Loading status and progress; 200 once a database is in service, 503 before."""
+    status = live.status()
+    return jsonify(status), 200 if status["state"] == "ready" else 503
+
+
+@app.get("/metrics")
+def metrics():
+    """
+    Metrics in the Prometheus text format.
+
+    Gauges describe the database in service. Latency histograms and counters are only recorded
+    when metrics are enabled (FLIGHT_METRICS=1).
+    """
+    current = live.current()
+    if current is not None:
+        generation, db = current
+        METRICS.set("flight_rows", len(db))
+        METRICS.set("flight_data_version", db.version)
+        METRICS.set("flight_generation", generation)
+        METRICS.set("flight_query_cache_entries", len(db.cache))
+    if live.load_seconds is not None:
+        METRICS.set("flight_last_load_seconds", live.load_seconds)
+    return Response(METRICS.render(), mimetype="text/plain; version=0.0.4")
+
+
+def page_params(total):
+    """
+    Read the page and page_size request parameters, clamped to the available pages and to
+    1..MAX_PAGE_SIZE flights per page.
+
+    Returns:
+        tuple: (page, pages, page_size)
+    """
+    page_size = min(max(request.values.get("page_size", PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    pages = max(-(-total // page_size), 1)
+    page = min(max(request.values.get("page", 1, type=int), 1), pages)
+    return page, pages, page_size
+
+
+def paginate(key, reverse=False, stream=False):
+    """
+    Select the requested page of flights in sorted order.
+
+    Reads the page and page_size request parameters. When streaming, flights are produced
+    lazily while the template renders instead of being built up front.
+
+    Returns:
+        tuple: (flights on the page, pagination info for the template)
+    """
+    db = g.db
+    page, pages, page_size = page_params(len(db))
+
+    if stream:
+        start = (page - 1) * page_size
+        flights = db.iter_sorted(key, reverse, start, start + page_size)
+    else:
+        flights = db.sorted_page(key, reverse, page, page_size)
+
+    pagination = {"page": page, "pages": pages, "page_size": page_size, "total": len(db),
+                  "stream": 1 if stream else None}
+    return flights, pagination
+
 
 @app.route("/", methods=["GET", "POST"])
 def index():
-    action = request.form.get("action")
+    started = time.perf_counter()
+    db = g.db
+    action = request.values.get("action")
+    stream = request.values.get("stream", type=int) == 1
     result = None
     title = None
+    pagination = None
 
     if action == "sort_by_date":
-        db.sort_by_date(reverse=True)
         title = "Flights sorted by date"
-        result = db.flights
+        result, pagination = paginate("date", reverse=True, stream=stream)
 
     elif action == "sort_by_duration":
-        db.sort_by_duration(reverse=True)
         title = "Flights sorted by duration"
-        result = db.flights
+        result, pagination = paginate("duration", reverse=True, stream=stream)
 
     elif action == "sort_by_airline":
-        db.sort_by_airline()
         title = "Flights sorted by airline"
-        result = db.flights
+        result, pagination = paginate("airline", stream=stream)
 
     elif action == "average_duration":
         title = "Average Flight Duration"
@@ -88,7 +261,188 @@ def index():
         title = "Unique Airports"
         result = db.unique_airports()
 
-    return render_template("index.html", title=title, result=result, actions=ACTIONS)
+    if METRICS.enabled:
+        METRICS.record("query", time.perf_counter() - started)
+    context = dict(title=title, result=result, actions=ACTIONS, action=action, pagination=pagination)
+    if stream:
+        return Response(stream_template("index.html", **context), mimetype="text/html")
+    with METRICS.timed("render"):
+        return render_template("index.html", **context)
+
+
+def etag():
+    """
+    ETag of the current request: the loaded files' source keys (size, mtime and SHA-256) and the
+    data version, plus the path and query parameters. It depends only on the data, so every worker
+    of a multi-process server serving the same files hands out the same tag.
+    """
+    params = sorted(request.args.items(multi=True))
+    sources = [(key["size"], key["mtime_ns"], key["sha256"]) for key in g.db.source_keys]
+    key = f"{sources}:{g.db.version}:{request.path}:{params}"
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def to_json(result):
+    """Turn a query result into JSON data; mappings become [key, value] pairs to keep their order."""
+    if hasattr(result, "most_common"):
+        result = result.most_common()
+    elif isinstance(result, Mapping):
+        result = list(result.items())
+    if isinstance(result, (list, tuple)):
+        return [item.to_dict() if hasattr(item, "to_dict") else to_json(item) for item in result]
+    return result
+
+
+@app.get("/api/<name>")
+def api(name):
+    """
+    JSON version of an action or a filter_by_* query.
+
+    Sort actions and filters return one page of flights (page and page_size parameters). Filter
+    arguments are query parameters named as in FILTERS. Every response carries an ETag and
+    Cache-Control; a request whose If-None-Match still matches gets an empty 304 without the
+    query being run.
+    """
+    if name not in ACTIONS and name not in FILTERS:
+        return jsonify(error=f"Unknown query: {name}"), 404
+
+    tag = etag()
+    if request.if_none_match.contains(tag):
+        return cacheable(Response(status=304), tag)
+    try:
+        data = query(name)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    return cacheable(jsonify(data), tag)
+
+
+def cacheable(response, tag):
+    """Add the ETag and the Cache-Control headers shared by the API and chart responses."""
+    response.set_etag(tag)
+    response.cache_control.public = True
+    response.cache_control.max_age = API_MAX_AGE
+    return response
+
+
+def query(name):
+    """Run an API query and return its JSON data. Raises ValueError for bad parameters."""
+    db = g.db
+    data = {"query": name, "version": db.version}
+    if name in SORTS:
+        flights, pagination = paginate(*SORTS[name])
+        del pagination["stream"]
+        return {**data, **pagination, "result": to_json(flights)}
+
+    if name in FILTERS:
+        missing = [param for param in FILTERS[name] if not request.args.get(param)]
+        if missing:
+            raise ValueError(f"Missing query parameter(s): {', '.join(missing)}")
+        # Same matches as db.filter_by_*(), but Flight objects are only built for the page
+        values = [request.args[param] for param in FILTERS[name]]
+        matches = db.query().where(**{FILTER_CONDITIONS[name]: values[0] if len(values) == 1 else tuple(values)})
+        total = len(matches)
+        page, pages, page_size = page_params(total)
+        pagination = {"page": page, "pages": pages, "page_size": page_size, "total": total}
+        return {**data, **pagination, "result": to_json(matches.page(page, page_size))}
+
+    return {**data, "result": to_json(getattr(db, name)())}
+
+
+@app.get("/export.<fmt>")
+def export(fmt):
+    """
+    Stream flights as csv (the original CSV schema), ndjson or parquet.
+
+    Filters are the query parameters in EXPORT_FILTERS, e.g. airline=Ryanair or
+    from_iata=KRK&to_iata=TFS; sort (date, duration or airline), reverse=1 and limit order and cut
+    the result. The file is written chunk by chunk while it is sent, from the database the request
+    started with, and carries the same ETag handling as the API.
+    """
+    if fmt not in EXPORT_FORMATS:
+        return jsonify(error=f"Unknown export format: {fmt}"), 404
+
+    tag = etag()
+    if request.if_none_match.contains(tag):
+        return cacheable(Response(status=304), tag)
+    try:
+        chunks = g.db.export_chunks(fmt, export_query())
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    response = Response(chunks, mimetype=EXPORT_FORMATS[fmt])
+    response.headers["Content-Disposition"] = f'attachment; filename="flights.{fmt}"'
+    return cacheable(response, tag)
+
+
+def export_query():
+    """Build the FlightQuery described by the export request's parameters. Raises ValueError for bad ones."""
+    query = g.db.query()
+    for name, params in EXPORT_FILTERS.items():
+        values = [request.args.get(param) for param in params]
+        if any(values):
+            if not all(values):
+                raise ValueError(f"{name} needs the query parameter(s): {', '.join(params)}")
+            query = query.where(**{name: values[0] if len(values) == 1 else tuple(values)})
+    if request.args.get("sort"):
+        query = query.order_by(request.args["sort"], request.args.get("reverse", 0, type=int) == 1)
+    limit = request.args.get("limit", type=int)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def visualizer():
+    """The FlightVisualizer for the request's database, rendering in the shared chart pool."""
+    global _chart_pool
+    with _visualizers_lock:
+        if _chart_pool is None:
+            # Not forked: this process runs the reload thread and the request threads
+            _chart_pool = process_pool(CHART_WORKERS)
+        visualizer = _visualizers.get(g.generation)
+        if visualizer is None:
+            # A reload swapped in a new database; the old one's charts are no longer needed
+            _visualizers.clear()
+            visualizer = _visualizers[g.generation] = FlightVisualizer(g.db, executor=_chart_pool)
+        return visualizer
+
+
+def replace_chart_pool(broken):
+    """Start a new chart pool after a worker died, unless another request already has."""
+    global _chart_pool
+    with _visualizers_lock:
+        if _chart_pool is broken:
+            broken.shutdown(wait=False, cancel_futures=True)
+            _chart_pool = None
+            # The visualizers render in the broken pool, and may have cached its failed futures
+            _visualizers.clear()
+
+
+@app.get("/charts/<chart>.<fmt>")
+def chart(chart, fmt):
+    """
+    A FlightVisualizer chart as png, svg or (for route_sankey) Plotly json.
+
+    top_n sets the number of routes for top_routes and route_sankey. Rendered charts are cached
+    per database version and served with the same ETag and Cache-Control handling as the API.
+    """
+    if chart not in CHARTS:
+        return jsonify(error=f"Unknown chart: {chart}"), 404
+
+    tag = etag()
+    if request.if_none_match.contains(tag):
+        return cacheable(Response(status=304), tag)
+    try:
+        with METRICS.timed("chart"):
+            top_n = request.args.get("top_n", type=int)
+            charts = visualizer()
+            try:
+                data = charts.render(chart, fmt, top_n)
+            except BrokenProcessPool:
+                # A chart worker died (e.g. killed for memory); retry once in a fresh pool
+                replace_chart_pool(charts.executor)
+                data = visualizer().render(chart, fmt, top_n)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    return cacheable(Response(data, mimetype=FORMATS[fmt]), tag)
 
 
 if __name__ == "__main__":
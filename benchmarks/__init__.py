@@ -0,0 +1,2 @@
+# Performance benchmarks for the flight_analysis package. Run them from the project root, e.g.
+# python -m benchmarks.bench_ingest
@@ -0,0 +1,84 @@
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+# Statements run in a fresh interpreter; each measures one way the package is started
+SCENARIOS = {
+    "import flight_analysis": "import flight_analysis",
+    "import flight_analysis.visualizer": "import flight_analysis.visualizer",
+    "import app": "import app",
+    "load sample CSV": "from flight_analysis.models import FlightDatabase; "
+                       "FlightDatabase('csv_files/flights_test.csv').flights_per_year()",
+    "render first chart": "from flight_analysis.models import FlightDatabase; "
+                          "from flight_analysis.visualizer import FlightVisualizer; "
+                          "FlightVisualizer(FlightDatabase('csv_files/flights_test.csv')).render('top_routes')",
+}
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def importtime(statement):
+    """
+    Run statement under python -X importtime.
+
+    Returns:
+        tuple: (module, cumulative microseconds) for every top-level import, in import order, and
+        the set of all modules imported.
+    """
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], capture_output=True, text=True,
+                            check=True, env=env)
+    modules, loaded = [], set()
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            loaded.add(match.group(4))
+            if len(match.group(3)) == 1:
+                modules.append((match.group(4), int(match.group(2))))
+    return modules, loaded
+
+
+def wall_time(statement, repeat):
+    """Median wall-clock seconds to start an interpreter and run statement."""
+    command = [sys.executable, "-c", f"import time; start = time.perf_counter(); {statement}; "
+                                     f"print(time.perf_counter() - start)"]
+    return statistics.median(float(subprocess.run(command, capture_output=True, text=True, check=True).stdout)
+                             for _ in range(repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import and startup time with python -X importtime.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5, help="Heaviest top-level imports to list per scenario")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    for name, statement in SCENARIOS.items():
+        seconds = wall_time(statement, args.repeat)
+        modules, loaded = importtime(statement)
+        heaviest = sorted(modules, key=lambda module: module[1], reverse=True)[:args.top]
+        results.append({
+            "name": name,
+            "seconds": seconds,
+            "imports_us": sum(us for _, us in modules),
+            "pandas": "pandas" in loaded,
+            "matplotlib": "matplotlib" in loaded,
+            "heaviest": heaviest,
+        })
+        print(f"{name:<36} {seconds * 1000:>9.1f} ms   pandas={'pandas' in loaded!s:<5} "
+              f"matplotlib={'matplotlib' in loaded!s:<5}")
+        for module, us in heaviest:
+            print(f"    {module:<32} {us / 1000:>9.1f} ms")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
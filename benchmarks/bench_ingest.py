@@ -0,0 +1,53 @@
+import argparse
+import time
+
+import pandas as pd
+
+from flight_analysis.columnar import FlightColumns
+from flight_analysis.models import Flight
+
+
+def load_frame(filepath, rows):
+    """Read the sample CSV and repeat it until it holds the requested number of rows."""
+    df = pd.read_csv(filepath)
+    repeats = -(-rows // len(df))
+    return pd.concat([df] * repeats, ignore_index=True).head(rows)
+
+
+def row_by_row(df):
+    """The original ingestion path: iterrows + Flight.from_row."""
+    return [Flight.from_row(row) for _, row in df.iterrows()]
+
+
+def timed(func, df):
+    start = time.perf_counter()
+    flights = func(df)
+    return flights, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare row-by-row and vectorized CSV ingestion.")
+    parser.add_argument("--csv", default="csv_files/flights_test.csv")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} | {'from_row rows/s':>16} | {'from_frame rows/s':>18} | {'speedup':>7} | "
+          f"{'columnar rows/s':>16}")
+    for rows in args.rows:
+        df = load_frame(args.csv, rows)
+        before, before_secs = timed(row_by_row, df)
+        after, after_secs = timed(Flight.from_frame, df)
+        columns, columns_secs = timed(FlightColumns.from_frame, df)
+
+        # repr() rather than == so that NaN registrations compare equal
+        if list(map(repr, before)) != list(map(repr, after)):
+            raise AssertionError("Flight.from_frame does not match Flight.from_row")
+        if list(map(repr, before)) != list(map(repr, columns.rows())):
+            raise AssertionError("FlightColumns.from_frame does not match Flight.from_row")
+
+        print(f"{rows:>10} | {rows / before_secs:>16,.0f} | {rows / after_secs:>18,.0f} | "
+              f"{before_secs / after_secs:>6.1f}x | {rows / columns_secs:>16,.0f}")
+
+
+if __name__ == "__main__":
+    main()
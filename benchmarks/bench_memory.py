@@ -0,0 +1,63 @@
+import argparse
+import dataclasses
+import gc
+import tracemalloc
+
+from benchmarks.bench_ingest import load_frame
+from flight_analysis.columnar import FlightColumns
+from flight_analysis.models import Flight
+
+# The original representation: a plain dataclass with a per-instance __dict__
+LegacyFlight = dataclasses.make_dataclass('LegacyFlight', Flight.FIELDS)
+
+
+def legacy_flights(df):
+    """Flights as the original loader built them: from_row per row, own strings and Timestamps."""
+    return [LegacyFlight(*Flight.from_row(row).values()) for _, row in df.iterrows()]
+
+
+def read_dates(flights):
+    """Read every date/time so that the lazy Timestamps get created."""
+    for flight in flights:
+        flight.date, flight.dep_time, flight.arr_time
+
+
+def measure(build):
+    """Return (result, bytes still allocated by building it)."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report memory per flight for each representation.")
+    parser.add_argument("--csv", default="csv_files/flights_test.csv")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--legacy-rows", type=int, default=50_000,
+                        help="the row-by-row legacy loader is slow; its cost per flight doesn't depend on row count")
+    args = parser.parse_args()
+
+    legacy_df = load_frame(args.csv, args.legacy_rows)
+    _, legacy_bytes = measure(lambda: legacy_flights(legacy_df))
+    del legacy_df
+
+    df = load_frame(args.csv, args.rows)
+    columns, column_bytes = measure(lambda: FlightColumns.from_frame(df))
+    del df
+    flights, flight_bytes = measure(columns.rows)
+    touched_bytes = measure(lambda: read_dates(flights))[1]
+
+    print(f"{'representation':<40} | {'bytes/flight':>12}")
+    print(f"{'dataclass + from_row (before)':<40} | {legacy_bytes / args.legacy_rows:>12,.0f}")
+    print(f"{'FlightColumns arrays':<40} | {column_bytes / args.rows:>12,.0f}")
+    print(f"{'slotted Flight objects (lazy dates)':<40} | {flight_bytes / args.rows:>12,.0f}")
+    print(f"{'  + after reading every date/time':<40} | {(flight_bytes + touched_bytes) / args.rows:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.bench_ingest import load_frame
+from flight_analysis.models import FlightDatabase
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare FlightDatabase start time from CSV and from a snapshot.")
+    parser.add_argument("--csv", default="csv_files/flights_test.csv")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} | {'csv parse + write (ms)':>22} | {'snapshot load (ms)':>18}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            path = os.path.join(tmp, f"flights_{rows}.csv")
+            load_frame(args.csv, rows).to_csv(path, index=False)
+
+            start = time.perf_counter()
+            FlightDatabase(path, snapshot=True)  # parses the CSV and writes the snapshot
+            csv_secs = time.perf_counter() - start
+
+            start = time.perf_counter()
+            db = FlightDatabase(path, snapshot=True)
+            snapshot_secs = time.perf_counter() - start
+            assert len(db) == rows
+
+            print(f"{rows:>10} | {csv_secs * 1000:>22.1f} | {snapshot_secs * 1000:>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
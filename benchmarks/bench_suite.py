@@ -0,0 +1,167 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.generate import SIZES, write_csv
+from flight_analysis.models import FlightDatabase
+
+ANALYTICS = ("average_duration", "flights_by_airline", "flights_by_aircraft", "busiest_routes", "most_used_airport",
+             "total_flight_hours", "flight_hours_per_airline", "flight_hours_per_year", "flights_per_year",
+             "unique_airlines", "unique_airports")
+
+SORTS = ("sort_by_date", "sort_by_duration", "sort_by_airline")
+
+
+def measure(func, repeat, setup=None):
+    """
+    Time func repeat times, calling setup (untimed) before each run.
+
+    Returns:
+        dict: min, median and max seconds, and the number of runs.
+    """
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {"min": min(times), "median": statistics.median(times), "max": max(times), "runs": repeat}
+
+
+def filter_arguments(db):
+    """Arguments for each filter_by_* method, taken from the data so every filter has matches."""
+    flight = db.columns.rows([0])[0]
+    year = flight.date.year
+    return {
+        "filter_by_airline": (flight.airline_name,),
+        "filter_by_class": (flight.flight_class,),
+        "filter_by_reason": (flight.flight_reason,),
+        "filter_by_route": (flight.from_iata, flight.to_iata),
+        "filter_by_date_range": (f"{year}-01-01", f"{year}-12-31"),
+    }
+
+
+def bench_database(path, repeat):
+    """
+    Time loading, the analytics, the filters and the sorts on one CSV.
+
+    Analytics and filters are timed cold (query cache and running totals dropped before every run)
+    and warm (answered from the cache).
+    """
+    results = {}
+    results["load_flights"] = measure(lambda: FlightDatabase.load_flights(path), 1)
+    results["FlightDatabase"] = measure(lambda: FlightDatabase(path), repeat)
+    db = FlightDatabase(path)
+
+    def cold():
+        db.cache.clear()
+        db._stats = None
+        db._index = None
+        db._timeseries = None
+        db._routes = None
+        db._sketches = None
+
+    for name in ANALYTICS:
+        method = getattr(db, name)
+        results[f"{name} (cold)"] = measure(method, repeat, setup=cold)
+        results[f"{name} (warm)"] = measure(method, repeat)
+
+    for name, args in filter_arguments(db).items():
+        method = getattr(db, name)
+        results[f"{name} (cold)"] = measure(lambda: method(*args), repeat, setup=cold)
+        results[f"{name} (warm)"] = measure(lambda: method(*args), repeat)
+
+    for key, reverse in (("date", True), ("duration", True), ("airline", False)):
+        results[f"sort_order {key}"] = measure(lambda: db.sort_order(key, reverse), repeat,
+                                               setup=lambda: db._sort_orders.clear())
+        results[f"sorted_page {key}"] = measure(lambda: db.sorted_page(key, reverse), repeat)
+    for name in SORTS:
+        results[name] = measure(getattr(db, name), repeat)
+    return results, db
+
+
+def bench_render(db, repeat):
+    """Time rendering index.html through the Flask app for every action, first page only."""
+    import app
+
+    app.live.stop()
+    app.live.swap(db)
+    client = app.app.test_client()
+    results = {"index (no action)": measure(lambda: client.get("/"), repeat)}
+    for action in app.ACTIONS:
+        def render():
+            response = client.get("/", query_string={"action": action})
+            if response.status_code != 200:
+                raise RuntimeError(f"{action}: HTTP {response.status_code}")
+        db.cache.clear()
+        results[f"index {action}"] = measure(render, repeat)
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    """Print the median time of every benchmark relative to an earlier results file."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    before = {(entry["rows"], entry["name"]): entry["median"] for entry in baseline["results"]}
+    print(f"\nCompared with {baseline_path} ({baseline.get('commit')}):")
+    for entry in results:
+        old = before.get((entry["rows"], entry["name"]))
+        if old:
+            print(f"{entry['rows']:>10,} {entry['name']:<40} {entry['median'] / old:>6.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark FlightDatabase and the Flask app on synthetic logs.")
+    parser.add_argument("sizes", nargs="*", default=["10k"],
+                        help=f"Row counts, as numbers or one of {', '.join(SIZES)} (default 10k)")
+    parser.add_argument("--data", default="csv_files/synthetic", help="Where synthetic CSVs are kept")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--no-render", action="store_true", help="Skip the Flask rendering benchmarks")
+    parser.add_argument("--output", default="benchmarks/results.json")
+    parser.add_argument("--compare", metavar="RESULTS", help="An earlier results file to compare against")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        rows = SIZES.get(size.lower()) or int(size)
+        path = os.path.join(args.data, f"flights_{size.lower()}.csv")
+        if not os.path.exists(path):
+            write_csv(path, rows)
+
+        timings, db = bench_database(path, args.repeat)
+        if not args.no_render:
+            timings.update(bench_render(db, args.repeat))
+        for name, timing in timings.items():
+            results.append({"rows": rows, "name": name, **timing})
+            print(f"{rows:>10,} {name:<40} {timing['median'] * 1000:>12.3f} ms")
+
+    report = {
+        "commit": git_commit(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import argparse
+import os
+import string
+
+import numpy as np
+import pandas as pd
+
+SAMPLE_CSV = "csv_files/flights_test.csv"
+
+# Distinct values beyond those in the sample; enough for the tables to look like a large fleet log
+EXTRA_AIRPORTS = 2_000
+EXTRA_AIRLINES = 150
+EXTRA_AIRCRAFT = 40
+
+SIZES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+
+
+def letters(i, width):
+    """The i-th string of width upper-case letters: AAA, AAB, ..."""
+    chars = []
+    for _ in range(width):
+        i, rest = divmod(i, 26)
+        chars.append(string.ascii_uppercase[rest])
+    return ''.join(reversed(chars))
+
+
+def build_pools(sample_csv=SAMPLE_CSV):
+    """
+    Collect the airports, airlines and aircraft of the sample log and add synthetic ones.
+
+    Returns:
+        dict: Pool name -> (array of CSV strings, array of their numeric ids).
+    """
+    df = pd.read_csv(sample_csv)
+    airports = dict(zip(df['From'], df['Dep_id']))
+    airports.update(zip(df['To'], df['Arr_id']))
+    airlines = dict(zip(df['Airline'], df['Airline_id']))
+    aircraft = dict(zip(df['Aircraft'], df['Aircraft_id']))
+
+    taken = {name.rsplit('(', 1)[1].split('/')[0] for name in airports}
+    candidates = (letters(i, 3) for i in range(26 ** 3) if letters(i, 3) not in taken)
+    for i, iata in zip(range(EXTRA_AIRPORTS), candidates):
+        airports[f"City {iata.title()} / {iata.title()} International ({iata}/X{iata})"] = 20_000 + i
+    for i in range(EXTRA_AIRLINES):
+        code = letters(i, 2)
+        airlines[f"Airline {code} ({code}/Z{code})"] = 5_000 + i
+    for i in range(EXTRA_AIRCRAFT):
+        aircraft[f"Jet {100 + i} (J{100 + i})"] = 9_000 + i
+
+    return {name: (np.array(list(pool), dtype=object), np.array(list(pool.values()), dtype=np.int64))
+            for name, pool in (('airport', airports), ('airline', airlines), ('aircraft', aircraft))}
+
+
+def zipf_choice(rng, size, n, skew=1.1):
+    """Pick size indexes from range(n), the first ones far more often, like real route traffic."""
+    weights = 1.0 / np.arange(1, n + 1) ** skew
+    return rng.choice(n, size=size, p=weights / weights.sum())
+
+
+def generate_frame(rng, pools, rows):
+    """Build a DataFrame of rows synthetic flights in the flights_test.csv schema."""
+    airport_names, airport_ids = pools['airport']
+    airline_names, airline_ids = pools['airline']
+    aircraft_names, aircraft_ids = pools['aircraft']
+
+    origin = zipf_choice(rng, rows, len(airport_names))
+    destination = zipf_choice(rng, rows, len(airport_names))
+    destination = np.where(destination == origin, (destination + 1) % len(airport_names), destination)
+    airline = zipf_choice(rng, rows, len(airline_names))
+    aircraft = zipf_choice(rng, rows, len(aircraft_names))
+
+    days = pd.date_range('2010-01-01', '2025-12-31', freq='D').strftime('%Y-%m-%d').to_numpy(object)
+    clock = np.array([f"{m // 60:02d}:{m % 60:02d}:00" for m in range(24 * 60)], dtype=object)
+    seats = np.array([f"{row}{seat}" for row in range(1, 61) for seat in 'ABCDEFGHJK'], dtype=object)
+    registrations = np.array([np.nan] * 9 + [f"SP-{letters(i, 3)}" for i in range(500)], dtype=object)
+
+    dep = rng.integers(0, 24 * 60, rows) // 5 * 5
+    duration = rng.integers(35, 16 * 60, rows) // 5 * 5
+    airline_iata = np.array([name.rsplit('(', 1)[1].split('/')[0] or 'XX' for name in airline_names], dtype=object)
+
+    return pd.DataFrame({
+        'Date': days[rng.integers(0, len(days), rows)],
+        'Flight number': airline_iata[airline] + pd.Series(rng.integers(1, 9999, rows)).astype(str).to_numpy(object),
+        'From': airport_names[origin],
+        'To': airport_names[destination],
+        'Dep time': clock[dep],
+        'Arr time': clock[(dep + duration) % (24 * 60)],
+        'Duration': clock[duration],
+        'Airline': airline_names[airline],
+        'Aircraft': aircraft_names[aircraft],
+        'Registration': registrations[zipf_choice(rng, rows, len(registrations), skew=0.3)],
+        'Seat number': seats[rng.integers(0, len(seats), rows)],
+        'Seat type': rng.integers(1, 4, rows),
+        'Flight class': rng.choice([1, 2], rows, p=[0.85, 0.15]),
+        'Flight reason': rng.choice([1, 2], rows, p=[0.7, 0.3]),
+        'Note': np.nan,
+        'Dep_id': airport_ids[origin],
+        'Arr_id': airport_ids[destination],
+        'Airline_id': airline_ids[airline],
+        'Aircraft_id': aircraft_ids[aircraft],
+    })
+
+
+def write_csv(path, rows, seed=0, chunksize=1_000_000, sample_csv=SAMPLE_CSV):
+    """
+    Write a synthetic flights CSV, generated in chunks so memory stays flat at any size.
+
+    The same seed and row count always produce the same file.
+    """
+    rng = np.random.default_rng(seed)
+    pools = build_pools(sample_csv)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        for start in range(0, rows, chunksize):
+            df = generate_frame(rng, pools, min(chunksize, rows - start))
+            df.to_csv(f, header=start == 0, index=False)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write synthetic flight logs in the flights_test.csv schema.")
+    parser.add_argument("sizes", nargs="*", default=["10k"],
+                        help=f"Row counts, as numbers or one of {', '.join(SIZES)} (default 10k)")
+    parser.add_argument("--out", default="csv_files/synthetic")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        rows = SIZES.get(size.lower()) or int(size)
+        path = write_csv(os.path.join(args.out, f"flights_{size.lower()}.csv"), rows, args.seed)
+        print(f"{path}: {rows:,} rows, {os.path.getsize(path) / 2 ** 20:,.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
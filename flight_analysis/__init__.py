@@ -4,3 +4,6 @@
 # You can also import common classes here if you like:
 
 from .models import Flight, FlightDatabase
+from .columnar import FlightColumns
+from .query import FlightQuery
+from .sketches import FlightSketches
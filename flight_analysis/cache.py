@@ -0,0 +1,127 @@
+import copy
+import functools
+import threading
+import time
+from collections import OrderedDict
+
+from .metrics import METRICS
+
+
+class QueryCache:
+    """
+    Memoizes FlightDatabase query results, tagged with the data version they were computed from.
+
+    Queries without arguments (the aggregates) get one entry each. Parameterised queries share an
+    LRU store bounded by maxsize. An entry computed for an older data version counts as a miss and
+    is replaced, so a result that finishes computing after the data changed is never served.
+    """
+
+    def __init__(self, maxsize=256):
+        """
+        Args:
+            maxsize (int): Maximum number of cached parameterised queries.
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._fixed = {}
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._fixed) + len(self._lru)
+
+    def get_or_compute(self, key, version, compute, keep=None):
+        """
+        Return the cached result for key at version, computing and storing it on a miss.
+
+        Args:
+            key (tuple): (method name, positional args, keyword args).
+            version (int): Current data version.
+            compute (callable): Produces the result on a miss.
+            keep (callable): Called with a computed result; it is only stored if this returns True.
+                Everything is stored if None.
+        """
+        store = self._lru if key[1] or key[2] else self._fixed
+        with self._lock:
+            entry = store.get(key)
+            if entry is not None and entry[0] == version:
+                self.hits += 1
+                if store is self._lru:
+                    self._lru.move_to_end(key)
+                return entry[1]
+            self.misses += 1
+
+        result = compute()
+        if keep is not None and not keep(result):
+            return result
+        with self._lock:
+            entry = store.get(key)
+            if entry is not None and entry[0] > version:
+                return result
+            store[key] = (version, result)
+            if store is self._lru:
+                self._lru.move_to_end(key)
+                while len(self._lru) > self.maxsize:
+                    self._lru.popitem(last=False)
+        return result
+
+    def discard(self, key, result):
+        """Drop key's entry if it still holds result, e.g. a failed computation that must not be served again."""
+        store = self._lru if key[1] or key[2] else self._fixed
+        with self._lock:
+            entry = store.get(key)
+            if entry is not None and entry[1] is result:
+                del store[key]
+
+    def clear(self):
+        """Drop every entry. Hit and miss counters are kept."""
+        with self._lock:
+            self._fixed.clear()
+            self._lru.clear()
+
+    def stats(self):
+        """
+        Return the cache counters.
+
+        Returns:
+            dict: hits, misses, size and maxsize.
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self), 'maxsize': self.maxsize}
+
+
+def cached_query(method):
+    """
+    Decorator memoizing a FlightDatabase method in its QueryCache, keyed by method and arguments.
+
+    Callers get a shallow copy of the cached result, so mutating it does not affect the cache.
+    Calls with unhashable arguments are not cached.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = (method.__name__, args, tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return method(self, *args, **kwargs)
+        if METRICS.enabled:
+            return copy.copy(_instrumented(self, method, key, args, kwargs))
+        result = self.cache.get_or_compute(key, self.version, lambda: method(self, *args, **kwargs))
+        return copy.copy(result)
+
+    return wrapper
+
+
+def _instrumented(db, method, key, args, kwargs):
+    """get_or_compute, recording the query latency and whether the cache answered it."""
+    computed = []
+
+    def compute():
+        computed.append(True)
+        return method(db, *args, **kwargs)
+
+    start = time.perf_counter()
+    result = db.cache.get_or_compute(key, db.version, compute)
+    METRICS.observe('flight_query_seconds', time.perf_counter() - start, query=method.__name__)
+    METRICS.inc('flight_query_cache_total', query=method.__name__, result='miss' if computed else 'hit')
+    return result
@@ -0,0 +1,313 @@
+import numpy as np
+
+from . import models
+from .parsing import (AIRCRAFT_PATTERN, CODES_PATTERN, FLIGHT_CLASS_MAP, FLIGHT_REASON_MAP, SEAT_TYPE_MAP,
+                      map_codes, parse_codes, parse_dates, parse_durations, parse_ids, parse_times)
+
+# Columns holding int64 nanoseconds since the epoch
+TIME_COLUMNS = ('date', 'dep_time', 'arr_time')
+
+# int32 ID columns and the CSV column each is read from; MISSING_ID marks an empty ID
+ID_COLUMNS = {
+    'dep_id': 'Dep_id',
+    'arr_id': 'Arr_id',
+    'airline_id': 'Airline_id',
+    'aircraft_id': 'Aircraft_id',
+}
+MISSING_ID = -1
+
+# Categorical columns and the table their int32 codes point into
+CATEGORY_TABLES = {
+    'flight_number': 'flight_number',
+    'from_airport': 'airport',
+    'to_airport': 'airport',
+    'airline': 'airline',
+    'aircraft': 'aircraft',
+    'registration': 'registration',
+    'seat_number': 'seat_number',
+    'seat_type': 'seat_type',
+    'flight_class': 'flight_class',
+    'flight_reason': 'flight_reason',
+}
+
+# Flight field -> (column, position inside the table entry or None for scalar entries)
+ROW_FIELDS = {
+    'date': ('date', None),
+    'flight_number': ('flight_number', None),
+    'from_airport_name': ('from_airport', 0),
+    'from_iata': ('from_airport', 1),
+    'from_icao': ('from_airport', 2),
+    'to_airport_name': ('to_airport', 0),
+    'to_iata': ('to_airport', 1),
+    'to_icao': ('to_airport', 2),
+    'dep_time': ('dep_time', None),
+    'arr_time': ('arr_time', None),
+    'duration_minutes': ('duration_minutes', None),
+    'airline_name': ('airline', 0),
+    'airline_iata': ('airline', 1),
+    'airline_icao': ('airline', 2),
+    'aircraft_name': ('aircraft', 0),
+    'aircraft_icao': ('aircraft', 1),
+    'registration': ('registration', None),
+    'seat_number': ('seat_number', None),
+    'seat_type': ('seat_type', None),
+    'flight_class': ('flight_class', None),
+    'flight_reason': ('flight_reason', None),
+    'dep_id': ('dep_id', None),
+    'arr_id': ('arr_id', None),
+    'airline_id': ('airline_id', None),
+    'aircraft_id': ('aircraft_id', None),
+}
+
+
+class FlightColumns:
+    """
+    Flights stored column by column as typed NumPy arrays.
+
+    Dates and times are int64 nanoseconds since the epoch, durations are int32 minutes and every
+    string field is dictionary-encoded: the column holds int32 codes into a table of distinct
+    values. Airports, airlines and aircraft are encoded as whole (name, IATA, ICAO) entries, and
+    both airport columns share one table. The CSV's airport, airline and aircraft IDs are int32
+    columns, MISSING_ID where empty. Flight objects are only built by rows().
+    """
+
+    def __init__(self, arrays, tables):
+        """
+        Args:
+            arrays (dict): Column name -> NumPy array, all of the same length.
+            tables (dict): Table name -> list of distinct values (see CATEGORY_TABLES).
+        """
+        self.arrays = arrays
+        self.tables = tables
+        self._buffers = {}
+        self._lookups = {}
+
+    def __len__(self):
+        return len(self.arrays['date'])
+
+    @property
+    def mapped(self):
+        """Whether every column is a read-only memory map, e.g. of a snapshot shared with other processes."""
+        return all(isinstance(array, np.memmap) for array in self.arrays.values())
+
+    @classmethod
+    def from_frame(cls, df):
+        """
+        Parse a flights CSV DataFrame into columns.
+
+        Each distinct raw string is parsed once, so the cost of the string parsing depends on the
+        number of distinct airports, airlines and aircraft rather than on the number of rows.
+        """
+        import pandas as pd
+
+        flight = models.Flight
+        arrays, tables = {}, {}
+
+        # Interleave From/To so airport codes are numbered in the order they first appear
+        airports = np.column_stack([df['From'].to_numpy(object), df['To'].to_numpy(object)]).ravel()
+        codes, tables['airport'] = _encode(
+            airports, lambda u: list(zip(*parse_codes(u, CODES_PATTERN, flight.parse_airport))))
+        arrays['from_airport'], arrays['to_airport'] = codes[0::2], codes[1::2]
+
+        arrays['airline'], tables['airline'] = _encode(
+            df['Airline'], lambda u: list(zip(*parse_codes(u, CODES_PATTERN, flight.parse_airline))))
+        arrays['aircraft'], tables['aircraft'] = _encode(
+            df['Aircraft'],
+            lambda u: list(zip(*parse_codes(u, AIRCRAFT_PATTERN, flight.parse_aircraft, strip_codes=False))))
+
+        registration = df['Registration'] if 'Registration' in df else pd.Series([None] * len(df), dtype=object)
+        arrays['registration'], tables['registration'] = _encode(
+            registration, lambda u: [value or None for value in u.tolist()])
+        arrays['flight_number'], tables['flight_number'] = _encode(df['Flight number'])
+        arrays['seat_number'], tables['seat_number'] = _encode(df['Seat number'])
+        arrays['seat_type'], tables['seat_type'] = _encode(
+            df['Seat type'], lambda u: map_codes(u, SEAT_TYPE_MAP).tolist())
+        arrays['flight_class'], tables['flight_class'] = _encode(
+            df['Flight class'], lambda u: map_codes(u, FLIGHT_CLASS_MAP).tolist())
+        arrays['flight_reason'], tables['flight_reason'] = _encode(
+            df['Flight reason'], lambda u: map_codes(u, FLIGHT_REASON_MAP).tolist())
+
+        arrays['date'] = _to_nanoseconds(parse_dates(df['Date']))
+        arrays['dep_time'] = _to_nanoseconds(parse_times(df['Dep time']))
+        arrays['arr_time'] = _to_nanoseconds(parse_times(df['Arr time']))
+        arrays['duration_minutes'] = np.asarray(
+            parse_durations(df['Duration'], flight.parse_duration_to_minutes), dtype=np.int32)
+        for column, header in ID_COLUMNS.items():
+            arrays[column] = parse_ids(df.get(header), len(df), flight.parse_id, MISSING_ID)
+        return cls(arrays, tables)
+
+    @classmethod
+    def empty(cls):
+        """Return columns without any rows, e.g. to collect tables for translate()."""
+        return cls.from_flights([])
+
+    @classmethod
+    def from_flights(cls, flights):
+        """Encode a list of Flight objects into columns."""
+        values = {field: [getattr(flight, field) for flight in flights] for field in ROW_FIELDS}
+        columns = cls({}, {name: [] for name in set(CATEGORY_TABLES.values())})
+        parts = {}
+        for field, (column, part) in ROW_FIELDS.items():
+            parts.setdefault(column, []).append(values[field])
+
+        for column, fields in parts.items():
+            if column in TIME_COLUMNS:
+                columns.arrays[column] = _to_nanoseconds(fields[0])
+            elif column == 'duration_minutes':
+                columns.arrays[column] = np.array(fields[0], dtype=np.int32)
+            elif column in ID_COLUMNS:
+                columns.arrays[column] = np.array([MISSING_ID if value is None else value for value in fields[0]],
+                                                  dtype=np.int32)
+            else:
+                table_name = CATEGORY_TABLES[column]
+                entries = list(zip(*fields)) if len(fields) > 1 else fields[0]
+                columns.arrays[column] = np.array([columns._code(table_name, entry) for entry in entries],
+                                                  dtype=np.int32)
+        return columns
+
+    def take(self, positions):
+        """Return new columns holding only the given row positions, sharing the same tables."""
+        return FlightColumns({name: array[positions] for name, array in self.arrays.items()}, self.tables)
+
+    def values(self, field, positions=None):
+        """
+        Decode one Flight field.
+
+        Args:
+            field (str): A Flight attribute name, e.g. 'airline_name' or 'dep_time'.
+            positions: Optional row positions (array or slice); all rows if omitted.
+
+        Returns:
+            list: One Python value per selected row.
+        """
+        column, part = ROW_FIELDS[field]
+        array = self.arrays[column] if positions is None else self.arrays[column][positions]
+        if column in TIME_COLUMNS:
+            import pandas as pd
+            return pd.DatetimeIndex(array.view('datetime64[ns]')).tolist()
+        if column in ID_COLUMNS:
+            return [None if value == MISSING_ID else value for value in array.tolist()]
+        if column not in CATEGORY_TABLES:
+            return array.tolist()
+        entries = self.entries(column, part)
+        return [entries[code] for code in array.tolist()]
+
+    def rows(self, positions=None):
+        """
+        Build Flight objects for the given row positions (all rows if omitted).
+
+        Strings are shared with the tables and dates are passed as int nanoseconds, which Flight
+        converts to Timestamps only when they are read.
+        """
+        fields = []
+        for field in ROW_FIELDS:
+            column, _ = ROW_FIELDS[field]
+            if column in TIME_COLUMNS:
+                array = self.arrays[column] if positions is None else self.arrays[column][positions]
+                fields.append(array.tolist())
+            else:
+                fields.append(self.values(field, positions))
+        return [models.Flight(*values) for values in zip(*fields)]
+
+    def entries(self, column, part=None):
+        """Return the table behind a categorical column, or one part of each (name, codes) entry."""
+        table = self.tables[CATEGORY_TABLES[column]]
+        return table if part is None else [entry[part] for entry in table]
+
+    def years(self, positions=None):
+        """Return the calendar year of the selected flights' dates (all rows if omitted) as an int array."""
+        dates = self.arrays['date'] if positions is None else self.arrays['date'][positions]
+        return dates.view('datetime64[ns]').astype('datetime64[Y]').astype(np.int64) + 1970
+
+    def extend(self, other):
+        """
+        Append the rows of another FlightColumns in place.
+
+        The other columns' codes are translated into this object's tables, which grow with any
+        new values. Arrays keep spare capacity, so appending k rows costs O(k) amortized rather
+        than copying the existing rows. Arrays returned earlier stay valid and unchanged.
+        """
+        start, added = len(self), len(other)
+        for column, values in self.translate(other).arrays.items():
+            self._append(column, values, start, added)
+
+    def translate(self, other, columns=None):
+        """
+        Re-encode another FlightColumns against this object's tables, adding any new values to them.
+
+        Args:
+            other (FlightColumns): The rows to re-encode.
+            columns (iterable): Category columns to re-encode; all of them if None. The others are
+                left out of the result, and their tables don't grow.
+
+        Returns:
+            FlightColumns: other's rows, with codes pointing into this object's tables.
+        """
+        columns = CATEGORY_TABLES if columns is None else set(columns)
+        arrays = {name: array for name, array in other.arrays.items() if name not in CATEGORY_TABLES}
+        for table_name in {CATEGORY_TABLES[column] for column in columns}:
+            remap = np.array([self._code(table_name, entry) for entry in other.tables[table_name]], dtype=np.int32)
+            for column in columns:
+                if CATEGORY_TABLES[column] == table_name:
+                    arrays[column] = remap[other.arrays[column]]
+        return FlightColumns(arrays, self.tables)
+
+    def _append(self, column, values, start, added):
+        """Write values after the first start rows of a column, growing its buffer if needed."""
+        buffer = self._buffers.get(column)
+        if buffer is None or len(buffer) < start + added:
+            buffer = np.empty(max(2 * (start + added), 1024), dtype=self.arrays[column].dtype)
+            buffer[:start] = self.arrays[column]
+            self._buffers[column] = buffer
+        buffer[start:start + added] = values
+        self.arrays[column] = buffer[:start + added]
+
+    def _code(self, table_name, entry):
+        """Return the code of a table entry, adding it to the table if it is new."""
+        lookup = self._lookups.get(table_name)
+        if lookup is None:
+            lookup = self._lookups[table_name] = {_key(value): i for i, value in enumerate(self.tables[table_name])}
+        code = lookup.get(_key(entry))
+        if code is None:
+            code = lookup[_key(entry)] = len(self.tables[table_name])
+            self.tables[table_name].append(entry)
+        return code
+
+
+def _encode(values, parse=None):
+    """
+    Dictionary-encode a column.
+
+    Distinct raw values are found with pd.factorize, parsed once each, and values that parse to
+    the same entry share a code.
+
+    Returns:
+        tuple: (int32 codes, list of distinct parsed entries)
+    """
+    import pandas as pd
+
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    uniques = pd.Series(uniques, dtype=object)
+    entries = parse(uniques) if parse else uniques.tolist()
+
+    table, index = [], {}
+    remap = np.empty(len(entries), dtype=np.int32)
+    for i, entry in enumerate(entries):
+        remap[i] = index.setdefault(entry, len(table))
+        if remap[i] == len(table):
+            table.append(entry)
+    return remap[codes], table
+
+
+def _key(value):
+    """Dictionary key for a table entry; all NaN values (missing registrations) share one key."""
+    return _NAN if value != value else value
+
+
+_NAN = object()
+
+
+def _to_nanoseconds(values):
+    """Convert a datetime Series or index to int64 nanoseconds since the epoch."""
+    import pandas as pd
+    return pd.DatetimeIndex(values).as_unit('ns').asi8.copy()
@@ -0,0 +1,223 @@
+import csv
+import os
+import re
+from datetime import date, datetime, time, timedelta
+
+import numpy as np
+
+from . import models
+from .columnar import ID_COLUMNS, MISSING_ID, FlightColumns
+from .parsing import AIRCRAFT_PATTERN, CODES_PATTERN, FLIGHT_CLASS_MAP, FLIGHT_REASON_MAP, SEAT_TYPE_MAP
+
+# Files up to this size are parsed with the csv module; importing pandas costs more than it saves
+SMALL_CSV_BYTES = 4 << 20
+
+# Strings pandas.read_csv reads as missing values by default
+NA_VALUES = frozenset({
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN', '<NA>', 'N/A',
+    'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+})
+
+DATE_PATTERN = re.compile(r'(\d{4})-(\d{2})-(\d{2})')
+TIME_PATTERN = re.compile(r'(\d{1,2}):([0-5]\d):([0-5]\d)')
+DURATION_PATTERN = re.compile(r'(\d+):(\d+):(\d+)')
+CODE_PATTERN = re.compile(r'\d+')
+
+_EPOCH = datetime(1970, 1, 1)
+_NAN = float('nan')
+
+
+class _NeedsPandas(Exception):
+    """The file holds values that only the pandas reader converts exactly as from_frame expects."""
+
+
+def read_columns(filepath):
+    """
+    Parse a flights CSV into FlightColumns, without importing pandas when the file is small.
+
+    Files up to SMALL_CSV_BYTES go through read_small_csv(); larger files, and small ones it
+    cannot handle exactly, are parsed with pandas.read_csv and FlightColumns.from_frame.
+    """
+    if os.path.getsize(filepath) <= SMALL_CSV_BYTES:
+        columns = read_small_csv(filepath)
+        if columns is not None:
+            return columns
+    import pandas as pd
+    return FlightColumns.from_frame(pd.read_csv(filepath))
+
+
+def read_small_csv(filepath):
+    """
+    Parse a flights CSV with the csv and datetime modules only.
+
+    The result is identical to FlightColumns.from_frame(pd.read_csv(filepath)). Values whose
+    conversion depends on pandas' type inference (missing values in required columns, all-numeric
+    text columns, unusual date or time formats) are not handled here.
+
+    Returns:
+        FlightColumns: The flights, or None if the file should be parsed with pandas instead.
+    """
+    try:
+        with open(filepath, newline='', encoding='utf-8-sig') as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            rows = [row for row in reader if row]
+        return _columns(header, rows)
+    except (_NeedsPandas, UnicodeDecodeError, csv.Error):
+        return None
+
+
+def _columns(header, rows):
+    if not header or not rows or any(len(row) != len(header) for row in rows):
+        raise _NeedsPandas
+    values = dict(zip(header, zip(*rows)))
+    if 'Registration' not in values:
+        raise _NeedsPandas
+    try:
+        column = values.__getitem__
+        flight = models.Flight
+        arrays, tables = {}, {}
+
+        # Interleave From/To so airport codes are numbered in the order they first appear
+        airports = [value for pair in zip(column('From'), column('To')) for value in pair]
+        codes, tables['airport'] = _encode(airports, _code_parser(CODES_PATTERN, flight.parse_airport))
+        arrays['from_airport'], arrays['to_airport'] = codes[0::2], codes[1::2]
+        arrays['airline'], tables['airline'] = _encode(
+            column('Airline'), _code_parser(CODES_PATTERN, flight.parse_airline))
+        arrays['aircraft'], tables['aircraft'] = _encode(
+            column('Aircraft'), _code_parser(AIRCRAFT_PATTERN, flight.parse_aircraft, strip_codes=False))
+
+        arrays['registration'], tables['registration'] = _encode(column('Registration'), _text, missing=_NAN)
+        arrays['flight_number'], tables['flight_number'] = _encode(column('Flight number'), _text)
+        arrays['seat_number'], tables['seat_number'] = _encode(column('Seat number'), _text)
+        arrays['seat_type'], tables['seat_type'] = _encode(column('Seat type'), _mapped(SEAT_TYPE_MAP))
+        arrays['flight_class'], tables['flight_class'] = _encode(column('Flight class'), _mapped(FLIGHT_CLASS_MAP))
+        arrays['flight_reason'], tables['flight_reason'] = _encode(
+            column('Flight reason'), _mapped(FLIGHT_REASON_MAP))
+    except KeyError:
+        raise _NeedsPandas
+    for name in ('Registration', 'Flight number', 'Seat number'):
+        present = [value for value in column(name) if value not in NA_VALUES]
+        if present and all(_is_number(value) for value in present):
+            # pandas would read the column as numbers
+            raise _NeedsPandas
+
+    today = datetime.combine(date.today(), time())
+    arrays['date'] = _convert(column('Date'), _date, np.int64)
+    arrays['dep_time'] = _convert(column('Dep time'), lambda value: _time(today, value), np.int64)
+    arrays['arr_time'] = _convert(column('Arr time'), lambda value: _time(today, value), np.int64)
+    arrays['duration_minutes'] = _convert(column('Duration'), _duration, np.int32)
+    for name, header in ID_COLUMNS.items():
+        ids = values.get(header)
+        arrays[name] = np.full(len(rows), MISSING_ID, dtype=np.int32) if ids is None else _convert(ids, _id, np.int32)
+    return FlightColumns(arrays, tables)
+
+
+def _encode(values, parse, missing=None):
+    """
+    Dictionary-encode a column like columnar._encode: each distinct raw value is parsed once and
+    values that parse to the same entry share a code. Missing values become missing, or raise.
+    """
+    codes = np.empty(len(values), dtype=np.int32)
+    raw_codes, entry_codes, table = {}, {}, []
+    for i, value in enumerate(values):
+        code = raw_codes.get(value)
+        if code is None:
+            if value in NA_VALUES:
+                if missing is None:
+                    raise _NeedsPandas
+                entry = missing
+            else:
+                entry = parse(value)
+            code = raw_codes[value] = entry_codes.setdefault(entry, len(table))
+            if code == len(table):
+                table.append(entry)
+        codes[i] = code
+    return codes, table
+
+
+def _convert(values, parse, dtype):
+    """Convert a column with parse, once per distinct value."""
+    cache = {}
+    result = np.empty(len(values), dtype=dtype)
+    for i, value in enumerate(values):
+        converted = cache.get(value)
+        if converted is None:
+            converted = cache[value] = parse(value)
+        result[i] = converted
+    return result
+
+
+def _code_parser(pattern, fallback, strip_codes=True):
+    """Split "Name (CODES)" like parsing.parse_codes, with the scalar parser for values it doesn't match."""
+    regex = re.compile(pattern)
+
+    def parse(value):
+        match = regex.match(value)
+        if match is None:
+            return tuple(fallback(value))
+        groups = match.groups()
+        return (groups[0].strip(),) + tuple(code.strip() if strip_codes else code for code in groups[1:])
+
+    return parse
+
+
+def _text(value):
+    return value
+
+
+def _mapped(mapping):
+    """Translate an integer code through one of the *_MAP dictionaries, like parsing.map_codes."""
+    def parse(value):
+        if CODE_PATTERN.fullmatch(value) is None:
+            raise _NeedsPandas
+        return mapping.get(str(int(value)), 'Unknown')
+
+    return parse
+
+
+def _is_number(value):
+    try:
+        float(value)
+    except ValueError:
+        return False
+    return True
+
+
+def _date(value):
+    match = DATE_PATTERN.fullmatch(value)
+    if match is None:
+        raise _NeedsPandas
+    try:
+        return _nanoseconds(datetime(*map(int, match.groups())))
+    except ValueError:
+        raise _NeedsPandas
+
+
+def _time(today, value):
+    """'HH:MM:SS' as a datetime on today's date, like parsing.parse_times."""
+    match = TIME_PATTERN.fullmatch(value)
+    if match is None:
+        raise _NeedsPandas
+    hours, minutes, seconds = map(int, match.groups())
+    return _nanoseconds(today + timedelta(hours=hours, minutes=minutes, seconds=seconds))
+
+
+def _duration(value):
+    match = DURATION_PATTERN.fullmatch(value)
+    if match is None:
+        raise _NeedsPandas
+    hours, minutes, seconds = map(int, match.groups())
+    return hours * 60 + minutes + seconds // 60
+
+
+def _id(value):
+    if value in NA_VALUES:
+        return MISSING_ID
+    if CODE_PATTERN.fullmatch(value) is None or int(value) > np.iinfo(np.int32).max:
+        raise _NeedsPandas
+    return int(value)
+
+
+def _nanoseconds(moment):
+    return (moment - _EPOCH) // timedelta(microseconds=1) * 1000
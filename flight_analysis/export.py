@@ -0,0 +1,246 @@
+import csv
+import importlib.util
+import io
+import json
+
+import numpy as np
+
+from .columnar import CATEGORY_TABLES, ID_COLUMNS, MISSING_ID, ROW_FIELDS, TIME_COLUMNS
+from .parsing import FLIGHT_CLASS_MAP, FLIGHT_REASON_MAP, SEAT_TYPE_MAP
+
+# Export format -> MIME type
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+# The flights CSV header, in the order of the original files
+CSV_COLUMNS = ('Date', 'Flight number', 'From', 'To', 'Dep time', 'Arr time', 'Duration', 'Airline', 'Aircraft',
+               'Registration', 'Seat number', 'Seat type', 'Flight class', 'Flight reason', 'Note', 'Dep_id',
+               'Arr_id', 'Airline_id', 'Aircraft_id')
+
+# Rows converted and written per chunk
+CHUNK_ROWS = 50_000
+
+_DAY = 86_400 * 10**9
+
+
+def iter_export(columns, positions=None, fmt='csv', chunk_size=CHUNK_ROWS):
+    """
+    Encode flights chunk by chunk, for streaming to a file or an HTTP response.
+
+    Only one chunk of rows is converted at a time, so memory stays flat however many flights are
+    exported, and the first bytes are produced as soon as the first chunk is ready.
+
+    Args:
+        columns (FlightColumns): The flights.
+        positions (np.ndarray): Row positions to export, in output order; all rows if None.
+        fmt (str): 'csv' (the flights CSV schema, readable by FlightDatabase), 'ndjson' (one
+            Flight.to_dict() object per line) or 'parquet' (needs pyarrow).
+        chunk_size (int): Rows per chunk; a Parquet row group each.
+
+    Yields:
+        bytes: Consecutive pieces of the encoded file.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: '{fmt}'")
+    if fmt == 'parquet' and importlib.util.find_spec('pyarrow') is None:
+        raise ValueError("Exporting Parquet needs the pyarrow package")
+    if positions is None:
+        positions = np.arange(len(columns), dtype=np.int64)
+    # Keep the arrays as they are now, so rows appended while exporting don't shift the output
+    columns = type(columns)(dict(columns.arrays), columns.tables)
+    chunks = (positions[start:start + chunk_size] for start in range(0, len(positions), chunk_size))
+    if fmt == 'csv':
+        return _iter_csv(columns, chunks)
+    if fmt == 'ndjson':
+        return _iter_ndjson(columns, chunks)
+    return _iter_parquet(columns, chunks)
+
+
+def _iter_csv(columns, chunks):
+    formatted = {
+        'from_airport': _table_strings(columns, 'airport', _with_codes),
+        'airline': _table_strings(columns, 'airline', _with_codes),
+        'aircraft': _table_strings(columns, 'aircraft', _with_codes),
+        'registration': _table_strings(columns, 'registration', _text),
+        'flight_number': _table_strings(columns, 'flight_number', _text),
+        'seat_number': _table_strings(columns, 'seat_number', _text),
+        'seat_type': _table_strings(columns, 'seat_type', _code_of(SEAT_TYPE_MAP)),
+        'flight_class': _table_strings(columns, 'flight_class', _code_of(FLIGHT_CLASS_MAP)),
+        'flight_reason': _table_strings(columns, 'flight_reason', _code_of(FLIGHT_REASON_MAP)),
+    }
+    arrays = columns.arrays
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(CSV_COLUMNS)
+    yield _take(buffer)
+
+    for chunk in chunks:
+        def strings(column, table=None):
+            return formatted[table or column][arrays[column][chunk]]
+
+        note = np.full(len(chunk), '', dtype=object)
+        writer.writerows(zip(
+            _dates(arrays['date'][chunk]), strings('flight_number'),
+            strings('from_airport'), strings('to_airport', 'from_airport'),
+            _times(arrays['dep_time'][chunk]), _times(arrays['arr_time'][chunk]),
+            _durations(arrays['duration_minutes'][chunk]), strings('airline'), strings('aircraft'),
+            strings('registration'), strings('seat_number'), strings('seat_type'), strings('flight_class'),
+            strings('flight_reason'), note, *(_ids(arrays[column][chunk]) for column in ID_COLUMNS)))
+        yield _take(buffer)
+
+
+def _iter_ndjson(columns, chunks):
+    from .models import Flight
+
+    names = Flight.FIELDS
+    arrays = columns.arrays
+    # Fields with missing (NaN) entries, which become null as in Flight.to_dict()
+    with_nan = {field for field, (column, part) in ROW_FIELDS.items()
+                if column in CATEGORY_TABLES and any(entry != entry for entry in columns.entries(column, part))}
+    for chunk in chunks:
+        values = {}
+        for name in names:
+            if name == 'date':
+                values[name] = _dates(arrays['date'][chunk])
+            elif name in TIME_COLUMNS:
+                values[name] = [time[:5] for time in _times(arrays[name][chunk])]
+            else:
+                values[name] = columns.values(name, chunk)
+                if name in with_nan:
+                    values[name] = [None if value != value else value for value in values[name]]
+        lines = [json.dumps(dict(zip(names, row)), ensure_ascii=False) for row in zip(*values.values())]
+        yield ('\n'.join(lines) + '\n').encode()
+
+
+def _iter_parquet(columns, chunks):
+    import pyarrow.parquet as pq
+
+    dictionaries = _parquet_dictionaries(columns)
+    sink = _ChunkSink()
+    writer = None
+    for chunk in chunks:
+        table = _parquet_table(columns, chunk, dictionaries)
+        if writer is None:
+            writer = pq.ParquetWriter(sink, table.schema)
+        writer.write_table(table)
+        yield sink.take()
+    if writer is None:
+        # Nothing to export: still write a valid file with the schema
+        writer = pq.ParquetWriter(sink, _parquet_table(columns, np.zeros(0, dtype=np.int64), dictionaries).schema)
+    writer.close()
+    yield sink.take()
+
+
+def _parquet_dictionaries(columns):
+    """
+    Arrow dictionaries for the string fields, built once from the tables. Each chunk takes only
+    the entries it uses (see _parquet_table), and Parquet stores them as dictionary pages.
+
+    Returns:
+        dict: Field -> (pa.Array of strings, bool array marking missing entries)
+    """
+    import pyarrow as pa
+
+    dictionaries = {}
+    for field, (column, part) in ROW_FIELDS.items():
+        if column in CATEGORY_TABLES:
+            entries = columns.entries(column, part)
+            missing = np.array([entry is None or entry != entry for entry in entries], dtype=bool)
+            # Parquet can't store nulls inside a dictionary: missing entries are masked per row instead
+            dictionary = pa.array(['' if gone else str(entry) for entry, gone in zip(entries, missing)], pa.string())
+            dictionaries[field] = (dictionary, missing)
+    return dictionaries
+
+
+def _parquet_table(columns, chunk, dictionaries):
+    import pyarrow as pa
+
+    data = {}
+    for field, (column, _) in ROW_FIELDS.items():
+        array = columns.arrays[column][chunk]
+        if field in dictionaries:
+            dictionary, missing = dictionaries[field]
+            mask = missing[array] if missing.any() else None
+            # Every row group stores its dictionary: keep it to the entries this chunk uses
+            used, codes = np.unique(array, return_inverse=True)
+            data[field] = pa.DictionaryArray.from_arrays(codes.astype(np.int32), dictionary.take(used), mask=mask)
+        elif column == 'date':
+            data[field] = pa.array(array.view('datetime64[ns]').astype('datetime64[D]'))
+        elif column in TIME_COLUMNS:
+            data[field] = pa.array(((array % _DAY) // 10**9).astype(np.int32), pa.time32('s'))
+        elif column in ID_COLUMNS:
+            data[field] = pa.array(array, mask=array == MISSING_ID)
+        else:
+            data[field] = pa.array(array)
+    return pa.table(data)
+
+
+class _ChunkSink(io.RawIOBase):
+    """A write-only file that hands out what has been written since the last take()."""
+
+    def __init__(self):
+        self._pieces = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._pieces.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def take(self):
+        data = b''.join(self._pieces)
+        self._pieces = []
+        return data
+
+
+def _take(buffer):
+    data = buffer.getvalue().encode()
+    buffer.seek(0)
+    buffer.truncate()
+    return data
+
+
+def _table_strings(columns, table_name, format_entry):
+    """Format every entry of a table once, as an object array to index with codes."""
+    return np.array([format_entry(entry) for entry in columns.tables[table_name]], dtype=object)
+
+
+def _with_codes(entry):
+    """("Name", "IATA", "ICAO") -> "Name (IATA/ICAO)", as in the From, To, Airline and Aircraft columns."""
+    return f"{entry[0]} ({'/'.join(entry[1:])})"
+
+
+def _text(value):
+    return '' if value is None or value != value else str(value)
+
+
+def _code_of(mapping):
+    codes = {name: code for code, name in mapping.items()}
+    return lambda name: codes.get(name, '')
+
+
+def _dates(values):
+    return values.view('datetime64[ns]').astype('datetime64[D]').astype(str).tolist()
+
+
+def _times(values):
+    """'HH:MM:SS' time of day of int64 nanosecond timestamps."""
+    seconds = ((values % _DAY) // 10**9).tolist()
+    return [f"{second // 3600:02d}:{second // 60 % 60:02d}:{second % 60:02d}" for second in seconds]
+
+
+def _durations(minutes):
+    return [f"{minute // 60:02d}:{minute % 60:02d}:00" for minute in minutes.tolist()]
+
+
+def _ids(values):
+    return ['' if value == MISSING_ID else value for value in values.tolist()]
@@ -0,0 +1,167 @@
+import numpy as np
+
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+class FlightIndex:
+    """
+    Secondary indexes over FlightColumns for the filter_by_* lookups.
+
+    Hash indexes map a key to the ascending row positions holding it, so an equality lookup costs
+    O(k) for k matching flights. Dates are indexed by a date-sorted position array, so a range
+    query is two binary searches plus O(k log k) to put the matches back into row order.
+    The index describes one row order; it must be rebuilt when the flights are reordered, but
+    appended rows can be added with extend().
+    """
+
+    def __init__(self, columns):
+        """
+        Args:
+            columns (FlightColumns): The flights to index.
+        """
+        self.by_airline, self.by_class, self.by_reason, self.by_route = {}, {}, {}, {}
+        self._date_order = _Buffer(_EMPTY)
+        self._sorted_dates = _Buffer(_EMPTY)
+        self.extend(columns, 0)
+
+    def extend(self, columns, start):
+        """
+        Index the rows appended to columns from position start on.
+
+        Hash buckets and, when the new flights are not older than the indexed ones, the date index
+        grow in amortized O(k) for k new rows. Older dates are merged in with one O(n) insert.
+        """
+        arrays = {name: array[start:] for name, array in columns.arrays.items()}
+        airline_keys = [name.lower() for name in columns.entries('airline', 0)]
+        _merge(self.by_airline, _group_table(arrays['airline'], airline_keys), start)
+        _merge(self.by_class, _group_table(arrays['flight_class'], columns.entries('flight_class')), start)
+        _merge(self.by_reason, _group_table(arrays['flight_reason'], columns.entries('flight_reason')), start)
+
+        # Key every row by the pair of IATA codes rather than by the airport entries
+        iata_ids, iatas = _intern(columns.entries('from_airport', 1))
+        width = len(iatas)
+        pair_keys = iata_ids[arrays['from_airport']] * width + iata_ids[arrays['to_airport']]
+        _merge(self.by_route, _group(pair_keys, lambda key: (iatas[key // width], iatas[key % width])), start)
+
+        dates = arrays['date']
+        order = np.argsort(dates, kind='stable')
+        sorted_dates = self._sorted_dates.values()
+        if not len(sorted_dates) or not len(dates) or dates[order[0]] >= sorted_dates[-1]:
+            self._date_order.extend(order + start)
+            self._sorted_dates.extend(dates[order])
+        else:
+            # side='right' keeps equal dates in row order, as a full rebuild would
+            at = np.searchsorted(sorted_dates, dates[order], side='right')
+            self._date_order = _Buffer(np.insert(self._date_order.values(), at, order + start))
+            self._sorted_dates = _Buffer(np.insert(sorted_dates, at, dates[order]))
+
+    def airline(self, airline_name):
+        """Positions of the flights operated by the airline, compared case-insensitively."""
+        return _lookup(self.by_airline, airline_name.lower())
+
+    def flight_class(self, flight_class):
+        """Positions of the flights in the given class."""
+        return _lookup(self.by_class, flight_class)
+
+    def reason(self, reason):
+        """Positions of the flights taken for the given reason."""
+        return _lookup(self.by_reason, reason)
+
+    def route(self, from_iata, to_iata):
+        """Positions of the flights between two IATA codes."""
+        return _lookup(self.by_route, (from_iata, to_iata))
+
+    def date_range(self, start, end):
+        """
+        Positions of the flights dated within [start, end], in row order.
+
+        Args:
+            start (int): Range start in nanoseconds since the epoch.
+            end (int): Range end (inclusive) in nanoseconds since the epoch.
+        """
+        sorted_dates = self._sorted_dates.values()
+        lo = np.searchsorted(sorted_dates, start, side='left')
+        hi = np.searchsorted(sorted_dates, end, side='right')
+        return np.sort(self._date_order.values()[lo:hi])
+
+
+class _Buffer:
+    """An int64 array with spare capacity, so that appending doesn't copy the existing values."""
+
+    __slots__ = ('buffer', 'size')
+
+    def __init__(self, values):
+        self.buffer = values
+        self.size = len(values)
+
+    def values(self):
+        return self.buffer[:self.size]
+
+    def extend(self, values):
+        needed = self.size + len(values)
+        if needed > len(self.buffer):
+            buffer = np.empty(max(2 * needed, 16), dtype=np.int64)
+            buffer[:self.size] = self.values()
+            self.buffer = buffer
+        self.buffer[self.size:needed] = values
+        self.size = needed
+
+
+def _lookup(index, key):
+    bucket = index.get(key)
+    return _EMPTY if bucket is None else bucket.values()
+
+
+def _merge(index, groups, start):
+    """Add positions grouped by _group (relative to start) to a hash index."""
+    for key, positions in groups.items():
+        bucket = index.get(key)
+        if bucket is None:
+            index[key] = _Buffer(positions + start)
+        else:
+            bucket.extend(positions + start)
+
+
+def _intern(values):
+    """
+    Number the distinct values of a table.
+
+    Returns:
+        tuple: (int64 array mapping each table entry to its id, list of distinct values by id)
+    """
+    ids, distinct = {}, []
+    for value in values:
+        if value not in ids:
+            ids[value] = len(distinct)
+            distinct.append(value)
+    return np.array([ids[value] for value in values], dtype=np.int64), distinct
+
+
+def _group_table(codes, keys):
+    """
+    Group rows of a categorical column.
+
+    Args:
+        codes (np.ndarray): Per-row table codes.
+        keys (list): Index key for every table entry; entries sharing a key are merged.
+    """
+    key_ids, distinct = _intern(keys)
+    return _group(key_ids[codes], distinct.__getitem__)
+
+
+def _group(row_keys, decode):
+    """
+    Group rows by integer key.
+
+    Args:
+        row_keys (np.ndarray): Per-row int64 key.
+        decode (callable): Turns an integer key into the dictionary key.
+
+    Returns:
+        dict: Key -> ascending int64 array of row positions.
+    """
+    order = np.argsort(row_keys, kind='stable')
+    sorted_keys = row_keys[order]
+    starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]) if len(order) else _EMPTY
+    ends = np.r_[starts[1:], len(order)]
+    return {decode(int(sorted_keys[start])): order[start:end] for start, end in zip(starts.tolist(), ends.tolist())}
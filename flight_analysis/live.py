@@ -0,0 +1,155 @@
+import os
+import threading
+import time
+
+from .loading import expand_paths
+from .models import FlightDatabase
+
+
+class LiveDatabase:
+    """
+    A FlightDatabase loaded in a background thread and rebuilt when its CSV files change.
+
+    The first load starts with start(), so a server can accept connections (and report progress
+    through status()) before the data is ready. A watcher thread then polls the files' size and
+    mtime; once a change has settled for one interval, a new FlightDatabase is built off to the
+    side and swapped in with a single reference assignment. Readers call current() once per
+    request and keep using the database it returned, so a swap never changes the data under a
+    request that is already running. If a rebuild fails, the previous database stays in service.
+
+    With snapshot=True, several processes (e.g. the workers of a multi-process server) each run
+    a LiveDatabase on the same CSV but share one memory-mapped copy of the data: one of them
+    builds each snapshot generation and the others map it. Threads don't survive fork(), so
+    call start() in each worker process, not before the server forks them.
+    """
+
+    def __init__(self, filepath, interval=2.0, **options):
+        """
+        Args:
+            filepath (str or list): Flights source, as for FlightDatabase.
+            interval (float): Seconds between checks of the files for changes.
+            **options: Further FlightDatabase arguments, e.g. snapshot=True.
+        """
+        self.filepath = filepath
+        self.interval = interval
+        self.options = options
+        self.generation = 0
+        self.error = None
+        self.loaded_at = None
+        self.load_seconds = None
+        self._current = None
+        self._loading_since = None
+        self._attempted = None
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._reload_lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Start loading and watching in a daemon thread (once). Returns self."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='flight-database-loader', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop watching for changes and wait for the thread to finish."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def wait(self, timeout=None):
+        """Block until the first load has finished. Returns False if it timed out."""
+        return self._ready.wait(timeout)
+
+    def current(self):
+        """
+        Return the database currently in service.
+
+        Returns:
+            tuple: (generation, FlightDatabase), or None while the first load is still running or
+            if it failed. The generation grows by one with every swap.
+        """
+        return self._current
+
+    def reload(self):
+        """
+        Build a new FlightDatabase from the files as they are now and swap it in.
+
+        Runs in the calling thread; concurrent calls are serialised.
+
+        Returns:
+            bool: Whether the new database was swapped in; on failure the error is kept in status().
+        """
+        with self._reload_lock:
+            self._attempted = self._signature()
+            self._loading_since = time.perf_counter()
+            try:
+                db = FlightDatabase(self.filepath, **self.options)
+            except Exception as e:
+                self.error = f"{type(e).__name__}: {e}"
+                return False
+            finally:
+                self.load_seconds = time.perf_counter() - self._loading_since
+                self._loading_since = None
+
+            self.swap(db)
+            return True
+
+    def swap(self, db):
+        """Put an already built FlightDatabase in service as the next generation."""
+        self.generation += 1
+        self._current = (self.generation, db)
+        self.error = None
+        self.loaded_at = time.time()
+        self._ready.set()
+
+    def status(self):
+        """
+        Describe the loading state for a health or readiness check.
+
+        Returns:
+            dict: state ('loading', 'ready' or 'failed'), whether a (re)load is running and for how
+            many seconds, the generation, row count and data version in service, whether its data
+            is a shared memory map, when and how fast it was loaded, and the last load error, if any.
+        """
+        current, loading_since = self._current, self._loading_since
+        if current is not None:
+            state = 'ready'
+        else:
+            state = 'loading' if loading_since is not None or self.error is None else 'failed'
+        generation, db = current if current is not None else (0, None)
+        return {
+            'state': state,
+            'loading': loading_since is not None,
+            'loading_seconds': None if loading_since is None else round(time.perf_counter() - loading_since, 3),
+            'generation': generation,
+            'rows': None if db is None else len(db),
+            'version': None if db is None else db.version,
+            'mapped': None if db is None else db.columns.mapped,
+            'loaded_at': self.loaded_at,
+            'load_seconds': None if self.load_seconds is None else round(self.load_seconds, 3),
+            'error': self.error,
+        }
+
+    def _run(self):
+        self.reload()
+        seen = self._attempted
+        while not self._stop.wait(self.interval):
+            signature = self._signature()
+            # Only rebuild once the files have stopped changing, so a half-written file isn't loaded
+            if signature != self._attempted and signature == seen:
+                self.reload()
+            seen = signature
+
+    def _signature(self):
+        """Size and mtime of every source file; changes when a file is written, added or removed."""
+        signature = []
+        for path in expand_paths(self.filepath):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                signature.append((path, None, None))
+            else:
+                signature.append((path, stat.st_size, stat.st_mtime_ns))
+        return tuple(signature)
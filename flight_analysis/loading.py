@@ -0,0 +1,124 @@
+import glob
+import multiprocessing
+import os
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+from .csvreader import read_columns
+from .snapshot import save_snapshot
+
+
+@dataclass
+class FileLoad:
+    """Outcome of parsing one source file."""
+    path: str
+    rows: int
+    seconds: float
+    error: Optional[str] = None
+
+
+def expand_paths(source):
+    """
+    Resolve a flight log source into a sorted list of CSV paths.
+
+    Args:
+        source (str or list): A CSV file, a directory (all *.csv inside it), a glob pattern, or a
+            list of any of these.
+
+    Returns:
+        list[str]: Paths in a deterministic order: lists keep their order, directories and globs
+        are sorted.
+    """
+    if isinstance(source, (list, tuple)):
+        return [path for item in source for path in expand_paths(item)]
+    source = os.fspath(source)
+    if os.path.isdir(source):
+        return sorted(glob.glob(os.path.join(source, '*.csv')))
+    if glob.has_magic(source):
+        return sorted(glob.glob(source))
+    return [source]
+
+
+def process_pool(workers):
+    """
+    A process pool whose workers don't fork this process. The callers run next to other threads
+    (the live reload thread, the web server's request threads), and a forked child inherits any
+    lock one of them held at that moment, already locked; forkserver and spawn start clean.
+
+    Args:
+        workers (int): Worker processes.
+
+    Returns:
+        ProcessPoolExecutor
+    """
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+
+
+def parse_file(path):
+    """
+    Parse one CSV into FlightColumns. Runs in a worker process, so errors are returned, not raised.
+
+    Returns:
+        tuple: (FlightColumns or None, FileLoad)
+    """
+    start = time.perf_counter()
+    try:
+        columns = read_columns(path)
+    except Exception as e:
+        return None, FileLoad(path, 0, time.perf_counter() - start, f"{type(e).__name__}: {e}")
+    return columns, FileLoad(path, len(columns), time.perf_counter() - start)
+
+
+def build_snapshot(path, directory, key):
+    """
+    Parse one CSV and write it as a snapshot generation. Runs in a separate process, so the memory
+    the parser leaves behind is returned to the system when the process exits.
+
+    Returns:
+        int: Number of flights written.
+    """
+    columns = read_columns(path)
+    save_snapshot(columns, directory, key)
+    return len(columns)
+
+
+def load_files(paths, workers=None):
+    """
+    Parse several CSVs in parallel in a process pool and merge them.
+
+    Files are merged in the order of paths, whatever order the workers finish in, so the result is
+    deterministic. Files that fail to parse are skipped with a warning and reported.
+
+    Args:
+        paths (list[str]): CSV files, e.g. from expand_paths().
+        workers (int): Worker processes; defaults to one per CPU. 1 parses in this process.
+
+    Returns:
+        tuple: (merged FlightColumns, list of FileLoad in path order)
+    """
+    if not paths:
+        raise ValueError("No flight CSV files to load")
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    if workers == 1:
+        results = [parse_file(path) for path in paths]
+    else:
+        with process_pool(workers) as executor:
+            results = list(executor.map(parse_file, paths))
+
+    loaded = [columns for columns, _ in results if columns is not None]
+    report = [load for _, load in results]
+    if not loaded:
+        errors = '; '.join(f"{load.path}: {load.error}" for load in report)
+        raise ValueError(f"Could not load any flight CSV: {errors}")
+    for load in report:
+        if load.error is not None:
+            warnings.warn(f"Skipped '{load.path}', which could not be loaded: {load.error}")
+
+    merged = loaded[0]
+    for columns in loaded[1:]:
+        merged.extend(columns)
+    return merged, report
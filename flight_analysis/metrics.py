@@ -0,0 +1,195 @@
+import bisect
+import contextlib
+import contextvars
+import os
+import threading
+import time
+
+# Upper bounds, in seconds, of the latency histogram buckets
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Metric name -> (Prometheus type, help text)
+METRICS_HELP = {
+    'flight_query_seconds': ('histogram', 'FlightDatabase query latency, including cache lookups.'),
+    'flight_phase_seconds': ('histogram', 'Time spent in each loading, indexing, query and rendering phase.'),
+    'flight_load_seconds': ('histogram', 'Time to build a FlightDatabase from its source.'),
+    'flight_request_seconds': ('histogram', 'Flask request latency by endpoint and action.'),
+    'flight_query_cache_total': ('counter', 'Query cache lookups by result (hit or miss).'),
+    'flight_rows_scanned_total': ('counter', 'Rows read by each phase.'),
+    'flight_rows': ('gauge', 'Flights in the database in service.'),
+    'flight_data_version': ('gauge', 'Data version of the database in service.'),
+    'flight_generation': ('gauge', 'Number of databases loaded and swapped in so far.'),
+    'flight_last_load_seconds': ('gauge', 'Duration of the most recent load.'),
+    'flight_query_cache_entries': ('gauge', 'Results held in the query cache.'),
+}
+
+_timings = contextvars.ContextVar('flight_timings', default=None)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram in the Prometheus style."""
+
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """
+    Optional latency histograms and counters, exported in the Prometheus text format.
+
+    Instrumented code checks enabled (or calls timed(), which returns a shared no-op context
+    manager when disabled), so turning metrics off leaves one attribute lookup per call site.
+    Phases timed between start_timings() and stop_timings() are also collected for that context,
+    e.g. for a request's Server-Timing header.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._histograms = {}
+        self._counters = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds, **labels):
+        """Add a duration to the histogram name{labels}."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def inc(self, name, amount=1, **labels):
+        """Increase the counter name{labels}."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        """Set the gauge name{labels}."""
+        self._gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def timed(self, phase, rows=None):
+        """
+        Context manager timing a phase into flight_phase_seconds and the current request's timings.
+
+        Args:
+            phase (str): Phase name, e.g. 'parse', 'stats' or 'render'.
+            rows (int): Rows the phase reads, added to flight_rows_scanned_total.
+        """
+        if not self.enabled:
+            return _NOT_TIMED
+        return self._timed(phase, rows)
+
+    @contextlib.contextmanager
+    def _timed(self, phase, rows):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - start, rows)
+
+    def record(self, phase, seconds, rows=None):
+        """Record a phase that was timed by the caller; see timed()."""
+        self.observe('flight_phase_seconds', seconds, phase=phase)
+        if rows is not None:
+            self.inc('flight_rows_scanned_total', rows, phase=phase)
+        timings = _timings.get()
+        if timings is not None:
+            timings.append((phase, seconds))
+
+    def start_timings(self):
+        """
+        Start collecting the phases timed in the current context, e.g. for one request.
+
+        Returns:
+            list: Receives a (phase, seconds) pair for every phase timed until stop_timings().
+        """
+        timings = []
+        _timings.set(timings)
+        return timings
+
+    def stop_timings(self):
+        """Stop collecting phases in the current context."""
+        _timings.set(None)
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format."""
+        with self._lock:
+            histograms = {key: (list(h.counts), h.sum, h.count) for key, h in self._histograms.items()}
+            counters = dict(self._counters)
+        gauges = dict(self._gauges)
+
+        lines = []
+        for name, (kind, help_text) in METRICS_HELP.items():
+            if kind == 'histogram':
+                samples = [(key, value) for key, value in histograms.items() if key[0] == name]
+            else:
+                samples = [(key, value) for key, value in (counters if kind == 'counter' else gauges).items()
+                           if key[0] == name]
+            if not samples:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for (_, labels), value in sorted(samples, key=lambda sample: sample[0][1]):
+                if kind != 'histogram':
+                    lines.append(f"{name}{_labels(labels)} {_number(value)}")
+                    continue
+                counts, total, count = value
+                cumulative = 0
+                for bound, bucket in zip(BUCKETS + (float('inf'),), counts):
+                    cumulative += bucket
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {_number(total)}")
+                lines.append(f"{name}_count{_labels(labels)} {count}")
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        """Drop every recorded value."""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+        self._gauges.clear()
+
+
+def server_timing(timings, **extra):
+    """
+    Format phase timings as a Server-Timing header value, e.g. 'stats;dur=1.2, render;dur=0.4'.
+
+    Repeated phases are summed.
+
+    Args:
+        timings (list): (phase, seconds) pairs, e.g. from Metrics.start_timings().
+        **extra: More phase=seconds entries, e.g. total.
+    """
+    totals = {}
+    for phase, seconds in list(timings) + list(extra.items()):
+        totals[phase] = totals.get(phase, 0.0) + seconds
+    return ', '.join(f"{phase};dur={seconds * 1000:.3f}" for phase, seconds in totals.items())
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+_NOT_TIMED = contextlib.nullcontext()
+
+# The process-wide registry; set FLIGHT_METRICS=1 to enable it at startup
+METRICS = Metrics(enabled=os.environ.get('FLIGHT_METRICS') == '1')
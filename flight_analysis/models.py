@@ -1,54 +1,117 @@
-import pandas as pd
-from dataclasses import dataclass
+import os
+import time
+import warnings
+import numpy as np
 from datetime import datetime
 from typing import Optional
-from collections import Counter, defaultdict
+
+from .cache import QueryCache, cached_query
+from .columnar import FlightColumns
+from .csvreader import SMALL_CSV_BYTES, read_columns
+from .export import CHUNK_ROWS, iter_export
+from .indexes import FlightIndex
+from .loading import FileLoad, build_snapshot, expand_paths, load_files, process_pool
+from .metrics import METRICS
+from .snapshot import load_snapshot, recorded_source, save_snapshot, snapshot_lock, source_key
+from .stats import FlightStats
+from .tail import CsvTail
+from .timeseries import TimeSeriesIndex
+from .query import FlightQuery
+from .routes import RouteGraph
+from .sketches import DEFAULT_QUANTILES, FlightSketches
+from .parsing import FLIGHT_CLASS_MAP, FLIGHT_REASON_MAP, SEAT_TYPE_MAP
+
+
+def _timestamp_property(slot):
+    """
+    Property for a date/time slot that may hold int nanoseconds since the epoch.
+    The integer is converted to a pd.Timestamp the first time it is read.
+    """
+    def get(self):
+        value = getattr(self, slot)
+        if type(value) is int:
+            import pandas as pd
+            value = pd.Timestamp(value)
+            setattr(self, slot, value)
+        return value
+
+    def set(self, value):
+        setattr(self, slot, value)
+
+    return property(get, set)
 
 
-@dataclass
 class Flight:
-    date: datetime
-    flight_number: str
-    from_airport_name: str
-    from_iata: str
-    from_icao: str
-    to_airport_name: str
-    to_iata: str
-    to_icao: str
-    dep_time: datetime
-    arr_time: datetime
-    duration_minutes: int
-    airline_name: str
-    airline_iata: str
-    airline_icao: str
-    aircraft_name: str
-    aircraft_icao: str
-    registration: Optional[str]
-    seat_number: str
-    seat_type: str
-    flight_class: str
-    flight_reason: str
+    """
+    A single flight from the log.
+
+    A slotted record, so there is no per-instance __dict__. date, dep_time and arr_time may be
+    given as datetimes or as int nanoseconds since the epoch (as FlightColumns.rows() does);
+    integers are turned into pd.Timestamp when first read. Flights built by FlightColumns share
+    their string values with the column tables instead of holding copies.
+    """
+
+    FIELDS = ('date', 'flight_number', 'from_airport_name', 'from_iata', 'from_icao', 'to_airport_name',
+              'to_iata', 'to_icao', 'dep_time', 'arr_time', 'duration_minutes', 'airline_name', 'airline_iata',
+              'airline_icao', 'aircraft_name', 'aircraft_icao', 'registration', 'seat_number', 'seat_type',
+              'flight_class', 'flight_reason', 'dep_id', 'arr_id', 'airline_id', 'aircraft_id')
+
+    __slots__ = tuple('_' + name if name in ('date', 'dep_time', 'arr_time') else name for name in FIELDS)
+
+    date = _timestamp_property('_date')
+    dep_time = _timestamp_property('_dep_time')
+    arr_time = _timestamp_property('_arr_time')
+
+    def __init__(self, date: datetime, flight_number: str, from_airport_name: str, from_iata: str, from_icao: str,
+                 to_airport_name: str, to_iata: str, to_icao: str, dep_time: datetime, arr_time: datetime,
+                 duration_minutes: int, airline_name: str, airline_iata: str, airline_icao: str,
+                 aircraft_name: str, aircraft_icao: str, registration: Optional[str], seat_number: str,
+                 seat_type: str, flight_class: str, flight_reason: str, dep_id: Optional[int] = None,
+                 arr_id: Optional[int] = None, airline_id: Optional[int] = None, aircraft_id: Optional[int] = None):
+        self._date = date
+        self.flight_number = flight_number
+        self.from_airport_name = from_airport_name
+        self.from_iata = from_iata
+        self.from_icao = from_icao
+        self.to_airport_name = to_airport_name
+        self.to_iata = to_iata
+        self.to_icao = to_icao
+        self._dep_time = dep_time
+        self._arr_time = arr_time
+        self.duration_minutes = duration_minutes
+        self.airline_name = airline_name
+        self.airline_iata = airline_iata
+        self.airline_icao = airline_icao
+        self.aircraft_name = aircraft_name
+        self.aircraft_icao = aircraft_icao
+        self.registration = registration
+        self.seat_number = seat_number
+        self.seat_type = seat_type
+        self.flight_class = flight_class
+        self.flight_reason = flight_reason
+        self.dep_id = dep_id
+        self.arr_id = arr_id
+        self.airline_id = airline_id
+        self.aircraft_id = aircraft_id
+
+    def values(self):
+        """Return the field values as a tuple, in FIELDS order."""
+        return tuple(getattr(self, name) for name in self.FIELDS)
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self.values() == other.values()
+
+    __hash__ = None
+
+    def __repr__(self):
+        fields = ', '.join(f"{name}={value!r}" for name, value in zip(self.FIELDS, self.values()))
+        return f"{self.__class__.__name__}({fields})"
 
     @classmethod
     def from_row(cls, row):
-        # Mapping for seat type
-        seat_type_map = {
-            '1': 'Window',
-            '2': 'Middle',
-            '3': 'Aisle'
-        }
-
-        # Mapping for flight class
-        flight_class_map = {
-            '1': 'Economy',
-            '2': 'Business'
-        }
-
-        # Mapping for flight reason
-        flight_reason_map = {
-            '1': 'Leisure',
-            '2': 'Business'
-        }
+        import pandas as pd
 
         # Parse departure airport
         from_airport_name, from_iata, from_icao = cls.parse_airport(row['From'])
@@ -81,11 +144,32 @@ class Flight:
             aircraft_icao=aircraft_icao,
             registration=row.get('Registration') or None,
             seat_number=row['Seat number'],
-            seat_type=seat_type_map.get(str(row['Seat type']).strip(), 'Unknown'),
-            flight_class=flight_class_map.get(str(row['Flight class']).strip(), 'Unknown'),
-            flight_reason=flight_reason_map.get(str(row['Flight reason']).strip(), 'Unknown')
+            seat_type=SEAT_TYPE_MAP.get(str(row['Seat type']).strip(), 'Unknown'),
+            flight_class=FLIGHT_CLASS_MAP.get(str(row['Flight class']).strip(), 'Unknown'),
+            flight_reason=FLIGHT_REASON_MAP.get(str(row['Flight reason']).strip(), 'Unknown'),
+            dep_id=cls.parse_id(row.get('Dep_id')),
+            arr_id=cls.parse_id(row.get('Arr_id')),
+            airline_id=cls.parse_id(row.get('Airline_id')),
+            aircraft_id=cls.parse_id(row.get('Aircraft_id'))
         )
 
+    @classmethod
+    def from_frame(cls, df):
+        """
+        Build Flight objects from a whole DataFrame at once.
+
+        Every column is parsed in a single vectorized pass instead of calling from_row for each
+        row. Values that the fast path cannot handle fall back to the scalar parsers, so the
+        result is identical to ``[Flight.from_row(row) for _, row in df.iterrows()]``.
+
+        Args:
+            df (pd.DataFrame): Flight log in the flights CSV schema.
+
+        Returns:
+            list[Flight]: One Flight per row, in row order.
+        """
+        return FlightColumns.from_frame(df).rows()
+
     def __str__(self):
         reg_str = f" | Reg: {self.registration}" if self.registration else ""
         return (f"{self.date.date()} | {self.flight_number} | {self.from_airport_name} , IATA: {self.from_iata}, "
@@ -96,12 +180,41 @@ class Flight:
                 f"Seat: {self.seat_number} ({self.seat_type}) | "
                 f"Reason: {self.flight_reason}{reg_str}")
 
+    def to_dict(self):
+        """
+        Return the flight as a JSON-serialisable dict keyed by field name.
+
+        The date is an ISO date, departure and arrival are 'HH:MM' local times, and missing values
+        (NaN) become None.
+        """
+        data = {name: value for name, value in zip(self.FIELDS, self.values())}
+        for name, value in data.items():
+            if isinstance(value, float) and value != value:
+                data[name] = None
+        data['date'] = self.date.date().isoformat()
+        data['dep_time'] = self.dep_time.strftime('%H:%M')
+        data['arr_time'] = self.arr_time.strftime('%H:%M')
+        return data
+
     @staticmethod
     def parse_duration_to_minutes(duration_str: str) -> int:
         """Convert 'HH:MM:SS' to total minutes."""
         h, m, s = map(int, duration_str.split(':'))
         return h * 60 + m + s // 60
 
+    @staticmethod
+    def parse_id(value) -> Optional[int]:
+        """Convert a Dep_id/Arr_id/Airline_id/Aircraft_id value to an int, or None if it is empty."""
+        if value is None or value != value or (isinstance(value, str) and not value.strip()):
+            return None
+        try:
+            number = float(value)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Could not parse ID: '{value}'") from e
+        if not number.is_integer():
+            raise ValueError(f"Could not parse ID: '{value}'")
+        return int(number)
+
     @staticmethod
     def parse_airport(airport_str: str):
         """Parse the airports columns and get the name, ICAO and IATA codes"""
@@ -150,129 +263,593 @@ class Flight:
 
 
 class FlightDatabase:
-    def __init__(self, filepath):
-        self.flights = self.load_flights(filepath)
+    """
+    Flight log analytics backed by FlightColumns.
+
+    Flights are held as typed column arrays and the analytics are answered from FlightStats running
+    totals. Flight objects are only built when rows are requested, e.g. through the flights property.
+    Aggregate results are memoized per data version; any change to the flights bumps the version.
+    The filter_by_* lookups are not: the index answers them without scanning, and caching their
+    Flight lists would keep up to cache_size copies of large parts of the data alive.
+    New flights can be added with append(), ingest_rows() or, with follow=True, poll().
+    The approx_* methods answer from FlightSketches instead, in memory bounded by their error bounds.
+    """
+
+    def __init__(self, filepath, cache_size=256, follow=False, snapshot=None, workers=None, sketch_bounds=None):
+        """
+        Args:
+            filepath (str or list): Flights CSV to load, or several: a directory of CSVs, a glob
+                pattern or a list of paths. Several files are parsed in parallel and merged in
+                path order.
+            cache_size (int): Maximum number of cached parameterised queries.
+            follow (bool): Keep track of the file's read offset so poll() can pick up appended lines.
+            snapshot (str or bool): Snapshot directory to load from (and rebuild when the CSV has
+                changed), or True for .snapshots/<csv name> next to the CSV. Not used with follow.
+            workers (int): Processes used to parse several files; defaults to one per CPU.
+            sketch_bounds (dict): Error bounds of the sketches behind the approx_* methods, passed
+                to FlightSketches(), e.g. {'distinct_error': 0.02}.
+        """
+        paths = expand_paths(filepath)
+        single = not isinstance(filepath, (list, tuple)) and paths == [os.fspath(filepath)]
+        if not single and (follow or snapshot):
+            raise ValueError("follow and snapshot need a single CSV file")
+
+        self._tail = CsvTail(filepath) if follow else None
+        start = time.perf_counter()
+        if self._tail is not None:
+            with METRICS.timed('parse'):
+                df = self._tail.read()
+                # A log that is still empty has no header yet: start without rows and let poll() pick them up
+                self.columns = FlightColumns.from_frame(df) if len(df.columns) else FlightColumns.empty()
+        elif single:
+            self.columns = self.load_columns(filepath, snapshot)
+        else:
+            with METRICS.timed('parse_files'):
+                self.columns, self.load_report = load_files(paths, workers)
+        if single:
+            self.load_report = [FileLoad(filepath, len(self.columns), time.perf_counter() - start)]
+        # What was loaded, identified by content rather than by process: equal in every process
+        # loading the same files, e.g. for HTTP validators shared by the workers of a server
+        recorded = None
+        if single and snapshot:
+            recorded = recorded_source(_snapshot_directory(filepath, snapshot), filepath)
+        self.source_keys = [recorded] if recorded else [source_key(path) for path in paths]
+        if METRICS.enabled:
+            METRICS.observe('flight_load_seconds', time.perf_counter() - start)
+        self.version = 0
+        self._stats = None
+        self.cache = QueryCache(cache_size)
+        self._flights = None
+        self._index = None
+        self._timeseries = None
+        self._routes = None
+        self._sketches = None
+        self.sketch_bounds = dict(sketch_bounds or {})
+        self._sort_orders = {}
+
+    def __len__(self):
+        return len(self.columns)
+
+    @property
+    def flights(self):
+        """All flights as a list of Flight objects, built on first access. Treat it as read-only."""
+        if self._flights is None:
+            with METRICS.timed('materialize', len(self.columns)):
+                self._flights = self.columns.rows()
+        return self._flights
+
+    @property
+    def stats(self):
+        """FlightStats running totals, computed on first use and kept up to date by appends."""
+        if self._stats is None:
+            with METRICS.timed('stats', len(self.columns)):
+                self._stats = FlightStats.from_columns(self.columns)
+        return self._stats
+
+    @property
+    def index(self):
+        """FlightIndex over the current row order, built on first use and rebuilt after a sort."""
+        if self._index is None:
+            with METRICS.timed('index', len(self.columns)):
+                self._index = FlightIndex(self.columns)
+        return self._index
+
+    @property
+    def timeseries(self):
+        """TimeSeriesIndex over the flights' dates, built on first use and kept up to date by appends."""
+        if self._timeseries is None:
+            with METRICS.timed('timeseries', len(self.columns)):
+                self._timeseries = TimeSeriesIndex(self.columns)
+        return self._timeseries
+
+    @property
+    def routes(self):
+        """RouteGraph of the flights, built on first use and kept up to date by appends."""
+        if self._routes is None:
+            with METRICS.timed('routes', len(self.columns)):
+                self._routes = RouteGraph(self.columns)
+        return self._routes
+
+    @property
+    def sketches(self):
+        """FlightSketches of the flights, built on first use and kept up to date by appends."""
+        if self._sketches is None:
+            with METRICS.timed('sketches', len(self.columns)):
+                self._sketches = FlightSketches.from_columns(self.columns, **self.sketch_bounds)
+        return self._sketches
 
     @staticmethod
     def load_flights(filepath):
         """Load flight data from CSV and convert to a list of Flight objects."""
-        df = pd.read_csv(filepath)
-        flights = [Flight.from_row(row) for col, row in df.iterrows()]
-        return flights
+        return read_columns(filepath).rows()
+
+    @staticmethod
+    def load_columns(filepath, snapshot=None):
+        """
+        Load flight data from CSV into FlightColumns.
+
+        With a snapshot directory, the memory-mapped snapshot is used when it matches the CSV's
+        size and mtime (or content hash); otherwise the CSV is parsed and the snapshot rebuilt.
+        The arrays are mapped read-only, so every process loading the same snapshot shares one copy
+        of the data through the page cache, and only one of them rebuilds it (see snapshot_lock).
+        """
+        if not snapshot:
+            with METRICS.timed('parse'):
+                return read_columns(filepath)
+        snapshot = _snapshot_directory(filepath, snapshot)
+
+        with METRICS.timed('snapshot_load'), snapshot_lock(snapshot):
+            columns = load_snapshot(snapshot, filepath)
+        if columns is not None:
+            return columns
+        with snapshot_lock(snapshot, exclusive=True):
+            # Another process may have built it while this one waited for the lock
+            with METRICS.timed('snapshot_load'):
+                columns = load_snapshot(snapshot, filepath)
+            if columns is not None:
+                return columns
+            key = source_key(filepath)
+            if os.path.getsize(filepath) > SMALL_CSV_BYTES:
+                # Build in a child process and map the result, so this process doesn't keep the
+                # parser's leftover memory and holds no more private data than the ones that only map
+                try:
+                    with METRICS.timed('snapshot_build'), process_pool(1) as executor:
+                        executor.submit(build_snapshot, filepath, snapshot, key).result()
+                except OSError as e:
+                    warnings.warn(f"Could not write snapshot to '{snapshot}': {e}")
+                    with METRICS.timed('parse'):
+                        return read_columns(filepath)
+                columns = load_snapshot(snapshot)
+                if columns is not None:
+                    return columns
+            with METRICS.timed('parse'):
+                columns = read_columns(filepath)
+            try:
+                with METRICS.timed('snapshot_save'):
+                    save_snapshot(columns, snapshot, key)
+            except OSError as e:
+                warnings.warn(f"Could not write snapshot to '{snapshot}': {e}")
+            return columns
+
+    def _rows(self, positions):
+        """Return the flights at the given positions, reusing Flight objects that were already built."""
+        if self._flights is not None:
+            return [self._flights[i] for i in positions.tolist()]
+        with METRICS.timed('materialize', len(positions)):
+            return self.columns.rows(positions)
+
+    def _reorder(self, order):
+        """Permute the stored flights into the given order."""
+        if self._flights is not None:
+            self._flights = [self._flights[i] for i in order.tolist()]
+        self.columns = self.columns.take(order)
+        self._invalidate()
+
+    def _invalidate(self):
+        """Bump the data version and drop everything derived from the current rows and their order."""
+        self.version += 1
+        self._index = None
+        self._sort_orders = {}
+        self.cache.clear()
+
+    def append(self, flights):
+        """
+        Add Flight objects to the database.
+
+        Only the new flights are encoded, and the index and running totals are extended in place, so
+        their cost is proportional to the number of new flights. The materialized flights list, if
+        built, is replaced by an extended copy (O(n)), so lists handed out earlier don't change.
+        """
+        self._extend(FlightColumns.from_flights(list(flights)))
+
+    def ingest_rows(self, rows):
+        """
+        Parse CSV rows (mappings with the flights CSV columns, e.g. from csv.DictReader) with
+        Flight.from_row and add them to the database.
+        """
+        self.append(Flight.from_row(row) for row in rows)
+
+    def poll(self):
+        """
+        Load the lines appended to the followed CSV since the last load or poll.
+
+        Returns:
+            int: Number of flights added.
+        """
+        if self._tail is None:
+            raise ValueError("This FlightDatabase was not created with follow=True")
+        df = self._tail.read()
+        if df.empty:
+            return 0
+        self._extend(FlightColumns.from_frame(df))
+        return len(df)
+
+    def _extend(self, columns):
+        """Append encoded flights and update everything derived from the rows incrementally."""
+        if not len(columns):
+            return
+        start = len(self.columns)
+        self.columns.extend(columns)
+        if self._stats is not None:
+            self._stats.update(self.columns, start)
+        if self._index is not None:
+            self._index.extend(self.columns, start)
+        if self._timeseries is not None:
+            self._timeseries.extend(self.columns, start)
+        if self._routes is not None:
+            self._routes.extend(self.columns, start)
+        if self._sketches is not None:
+            self._sketches.update(self.columns, start)
+        if self._flights is not None:
+            self._flights = self._flights + self.columns.rows(slice(start, None))
+        self.version += 1
+        self._sort_orders = {}
+        self.cache.clear()
+
+    def sort_order(self, key, reverse=False):
+        """
+        Return the permutation that sorts the flights, without reordering them.
+
+        Each order is computed once and reused until the data changes.
+
+        Args:
+            key (str): 'date', 'duration' or 'airline'.
+            reverse (bool): Descending order; equal keys keep their original order, as with list.sort().
+
+        Returns:
+            np.ndarray: Row positions in sorted order.
+        """
+        order = self._sort_orders.get((key, reverse))
+        if order is None:
+            if key == 'date':
+                keys = self.columns.arrays['date']
+            elif key == 'duration':
+                keys = self.columns.arrays['duration_minutes']
+            elif key == 'airline':
+                keys = self._airline_ranks()[self.columns.arrays['airline']]
+            else:
+                raise ValueError(f"Unknown sort key: '{key}'")
+            with METRICS.timed('sort', len(keys)):
+                order = _stable_argsort(keys, reverse)
+            self._sort_orders[(key, reverse)] = order
+        return order
+
+    def _view(self, order):
+        """Return the flights in the given order, sharing the cached Flight objects."""
+        flights = self.flights
+        return [flights[i] for i in order.tolist()]
+
+    def _airline_ranks(self):
+        """Rank of every airline table entry when the airline names are sorted alphabetically."""
+        names = self.columns.entries('airline', 0)
+        rank = {name: i for i, name in enumerate(sorted(set(names)))}
+        return np.array([rank[name] for name in names], dtype=np.int64)
 
     def display(self, n=5):
         """Display the first n Flight objects."""
-        for flight in self.flights[:n]:
+        for flight in self.columns.rows(slice(0, n)):
             print(flight)
 
     def sort_by_date(self, reverse=False):
         """Sort flights by date."""
-        self.flights.sort(key=lambda f: f.date, reverse=reverse)
+        self._reorder(self.sort_order('date', reverse))
 
     def sort_by_duration(self, reverse=False):
         """Sort flights by flight duration in minutes."""
-        self.flights.sort(key=lambda f: f.duration_minutes, reverse=reverse)
+        self._reorder(self.sort_order('duration', reverse))
 
     def sort_by_airline(self):
         """Sort flights alphabetically by airline name."""
-        self.flights.sort(key=lambda f: f.airline_name)
+        self._reorder(self.sort_order('airline'))
+
+    def sorted_page(self, key, reverse=False, page=1, page_size=50):
+        """
+        Return one page of the flights in sorted order, building Flight objects for that page only.
+
+        Args:
+            key (str): Sort key, see sort_order().
+            reverse (bool): Descending order.
+            page (int): 1-based page number.
+            page_size (int): Flights per page.
+        """
+        start = (page - 1) * page_size
+        return self._rows(self.sort_order(key, reverse)[start:start + page_size])
+
+    def iter_sorted(self, key, reverse=False, start=0, stop=None, chunk_size=256):
+        """
+        Yield flights in sorted order, building chunk_size Flight objects at a time.
+
+        Args:
+            key (str): Sort key, see sort_order().
+            reverse (bool): Descending order.
+            start (int): Position in the sorted order to start from.
+            stop (int): Position to stop before; the end if None.
+            chunk_size (int): Flights built per step.
+        """
+        order = self.sort_order(key, reverse)[start:stop]
+        for i in range(0, len(order), chunk_size):
+            yield from self._rows(order[i:i + chunk_size])
+
+    def export_chunks(self, fmt='csv', query=None, chunk_size=CHUNK_ROWS):
+        """
+        Encode flights for export, chunk by chunk; see export.iter_export().
+
+        Args:
+            fmt (str): 'csv' (the original CSV schema), 'ndjson' or 'parquet'.
+            query (FlightQuery): Flights to export, in the query's order; all flights in stored
+                order if None.
+            chunk_size (int): Rows converted at a time.
+
+        Returns:
+            generator: bytes pieces of the file.
+        """
+        positions = None if query is None else query.positions()
+        return iter_export(self.columns, positions, fmt, chunk_size)
+
+    def export(self, path, fmt=None, query=None):
+        """
+        Write flights to a file without holding the whole export in memory.
+
+        Args:
+            path (str): Output file.
+            fmt (str): 'csv', 'ndjson' or 'parquet'; taken from the file extension if None.
+            query (FlightQuery): Flights to export, see export_chunks().
+        """
+        fmt = fmt or os.path.splitext(path)[1].lstrip('.').lower()
+        chunks = self.export_chunks(fmt, query)
+        with open(path, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+
+    def sorted_by_date(self, reverse=False):
+        """Return the flights sorted by date, leaving the stored order untouched."""
+        return self._view(self.sort_order('date', reverse))
+
+    def sorted_by_duration(self, reverse=False):
+        """Return the flights sorted by duration in minutes, leaving the stored order untouched."""
+        return self._view(self.sort_order('duration', reverse))
+
+    def sorted_by_airline(self, reverse=False):
+        """Return the flights sorted alphabetically by airline name, leaving the stored order untouched."""
+        return self._view(self.sort_order('airline', reverse))
+
+    def query(self):
+        """
+        Start a composable query over all flights, e.g.
+        db.query().where(airline='Ryanair', route=('KRK', 'TFS')).order_by('date').limit(10).
+
+        Returns:
+            FlightQuery: Evaluated lazily; see FlightQuery for the results it offers.
+        """
+        return FlightQuery(self)
 
     def filter_by_airline(self, airline_name):
         """Return all flights operated by the given airline."""
-        return [f for f in self.flights if f.airline_name.lower() == airline_name.lower()]
+        return self._rows(self.index.airline(airline_name))
 
     def filter_by_class(self, flight_class):
         """Return all flights with a specific class (e.g., 'Economy')."""
-        return [f for f in self.flights if f.flight_class == flight_class]
+        return self._rows(self.index.flight_class(flight_class))
 
     def filter_by_reason(self, reason):
         """Return all flights by reason (e.g., 'Business', 'Leisure')."""
-        return [f for f in self.flights if f.flight_reason == reason]
+        return self._rows(self.index.reason(reason))
 
     def filter_by_route(self, from_iata, to_iata):
         """Return all flights between two IATA airport codes."""
-        return [f for f in self.flights if f.from_iata == from_iata and f.to_iata == to_iata]
+        return self._rows(self.index.route(from_iata, to_iata))
 
     def filter_by_date_range(self, start_date, end_date):
         """Return all flights within a given date range."""
-        return [f for f in self.flights if start_date <= f.date <= end_date]
+        return self._rows(self.index.date_range(*_window(start_date, end_date)))
+
+    @cached_query
+    def flights_between(self, start_date, end_date, airline_name=None):
+        """Return the number of flights dated within [start_date, end_date], optionally for one airline."""
+        start, end = _window(start_date, end_date)
+        return self.timeseries.count(start, end, airline_name)
+
+    @cached_query
+    def flight_hours_between(self, start_date, end_date, airline_name=None):
+        """Return the hours flown on flights dated within [start_date, end_date], optionally for one airline."""
+        start, end = _window(start_date, end_date)
+        return round(self.timeseries.minutes(start, end, airline_name) / 60, 2)
+
+    @cached_query
+    def flights_per_period(self, freq='month', start_date=None, end_date=None, airline_name=None):
+        """
+        Count flights per day, week or month.
+        Args:
+            freq (str): 'day', 'week' (starting on Monday) or 'month'.
+            start_date, end_date: Optional inclusive window; the whole log by default.
+            airline_name (str): Only count this airline's flights.
+        Returns:
+            dict: A dictionary mapping each period's first day to its number of flights, including
+            periods without flights.
+        """
+        labels, counts, _ = self.timeseries.series(freq, *_window(start_date, end_date), airline_name)
+        return dict(zip(labels, counts.tolist()))
 
+    @cached_query
+    def flight_hours_per_period(self, freq='month', start_date=None, end_date=None, airline_name=None):
+        """
+        Calculate flight hours per day, week or month; see flights_per_period().
+        Returns:
+            dict: A dictionary mapping each period's first day to its total flight hours.
+        """
+        labels, _, minutes = self.timeseries.series(freq, *_window(start_date, end_date), airline_name)
+        return {label: round(total / 60, 2) for label, total in zip(labels, minutes.tolist())}
+
+    @cached_query
     def average_duration(self):
         """Calculate and return the average flight duration in minutes."""
-        return sum(f.duration_minutes for f in self.flights) / len(self.flights)
+        return self.stats.average_duration()
 
+    @cached_query
     def flights_by_airline(self):
         """Return a Counter of flights grouped by airline."""
-        return Counter(f.airline_name for f in self.flights)
+        return self.stats.flights_by_airline()
 
+    @cached_query
     def flights_by_aircraft(self):
         """Return a Counter of flights grouped by aircraft."""
-        return Counter(f.aircraft_name for f in self.flights)
+        return self.stats.flights_by_aircraft()
 
+    @cached_query
     def busiest_routes(self):
         """Return the top 5 most frequent routes as (route, count) tuples."""
-        routes = Counter(f"{f.from_iata}->{f.to_iata}" for f in self.flights)
-        return routes.most_common(10)
+        return [(f"{origin}->{destination}", count) for (origin, destination), count in self.routes.top_routes(10)]
+
+    @cached_query
+    def top_routes(self, n=10, weight='flights'):
+        """Return the n busiest routes as ((from_iata, to_iata), flights or minutes) tuples."""
+        return self.routes.top_routes(n, weight)
 
+    @cached_query
+    def airport_degree(self, iata):
+        """Return the number of destinations, origins, departures and arrivals of an airport."""
+        return self.routes.degree(iata)
+
+    @cached_query
+    def connected_components(self):
+        """Return the groups of airports connected by routes, largest first."""
+        return self.routes.connected_components()
+
+    @cached_query
+    def route_sankey(self, top_n=10):
+        """Return the nodes and links of a Sankey diagram of the top_n busiest routes."""
+        return self.routes.sankey(top_n)
+
+    @cached_query
     def unique_airlines(self):
         """Return a sorted list of all unique airline names."""
-        return sorted(set(f.airline_name for f in self.flights))
+        return self.stats.unique_airlines()
 
+    @cached_query
     def unique_airports(self):
         """Return a sorted list of all unique airport names used."""
-        airports = set()
-        for f in self.flights:
-            airports.add(f.from_airport_name)
-            airports.add(f.to_airport_name)
-        return sorted(airports)
+        return self.stats.unique_airports()
 
+    @cached_query
     def most_used_airport(self):
         """Return the airport (by name) that appears most often as origin or destination."""
-        from collections import Counter
-        airport_counts = Counter()
-        for f in self.flights:
-            airport_counts[f.from_airport_name] += 1
-            airport_counts[f.to_airport_name] += 1
-        return airport_counts.most_common(1)[0]
+        return self.stats.most_used_airport()
 
+    @cached_query
     def total_flight_hours(self):
         """
         Calculate the total time spent flying across all flights, in hours.
         Returns:
             float: Total flight time in hours.
         """
-        total_minutes = sum(f.duration_minutes for f in self.flights)
-        return round(total_minutes / 60, 2)
+        return self.stats.total_flight_hours()
 
+    @cached_query
     def flight_hours_per_airline(self):
         """
         Calculate total flight hours grouped by airline.
         Returns:
             dict: Mapping of airline names to total flight hours.
         """
-        airline_hours = defaultdict(int)
-        for f in self.flights:
-            airline_hours[f.airline_name] += f.duration_minutes
-        return {airline: round(minutes / 60, 2) for airline, minutes in airline_hours.items()}
+        return self.stats.flight_hours_per_airline()
 
+    @cached_query
     def flight_hours_per_year(self):
         """
         Calculate total flight time per year in hours, sorted by ascending year.
         Returns:
             dict: A dictionary mapping years to total flight hours, sorted by year.
         """
-        hours_per_year = defaultdict(float)
-        for f in self.flights:
-            hours_per_year[f.date.year] += f.duration_minutes / 60.0
-        return {year: round(minutes, 2) for year, minutes in hours_per_year.items()}
+        return self.stats.flight_hours_per_year()
 
+    @cached_query
     def flights_per_year(self):
         """
         Calculate total flights number per year, sorted by ascending year.
         Returns:
             dict: A dictionary mapping years to total flights, sorted by year.
         """
-        flights_per_year = defaultdict(int)
-        for f in self.flights:
-            flights_per_year[f.date.year] += 1
-        return dict(sorted(flights_per_year.items()))  # Sorted by year ascending
+        return self.stats.flights_per_year()
+
+    @cached_query
+    def duration_percentiles(self, quantiles=DEFAULT_QUANTILES):
+        """Return a mapping of quantiles (fractions) to flight durations in minutes, interpolated linearly."""
+        minutes = self.columns.arrays['duration_minutes']
+        if not len(minutes):
+            return {q: float('nan') for q in quantiles}
+        return dict(zip(quantiles, np.quantile(minutes, list(quantiles)).tolist()))
+
+    @cached_query
+    def approx_unique_airports(self):
+        """Estimate the number of unique airports with HyperLogLog; see unique_airports()."""
+        return self.sketches.unique_airports()
+
+    @cached_query
+    def approx_unique_airlines(self):
+        """Estimate the number of unique airlines with HyperLogLog; see unique_airlines()."""
+        return self.sketches.unique_airlines()
+
+    @cached_query
+    def approx_busiest_routes(self, n=10):
+        """Return the n busiest routes as (route, estimated count) tuples; see busiest_routes()."""
+        return self.sketches.busiest_routes(n)
+
+    @cached_query
+    def approx_most_used_airport(self):
+        """Return the most used airport and its estimated count; see most_used_airport()."""
+        return self.sketches.most_used_airport()
+
+    @cached_query
+    def approx_flights_by_aircraft(self, n=10):
+        """Return a Counter of the estimated flights of the n most flown aircraft; see flights_by_aircraft()."""
+        return self.sketches.flights_by_aircraft(n)
+
+    @cached_query
+    def approx_duration_percentiles(self, quantiles=DEFAULT_QUANTILES):
+        """Estimate duration percentiles with a t-digest; see duration_percentiles()."""
+        return self.sketches.duration_percentiles(quantiles)
+
+
+def _snapshot_directory(filepath, snapshot):
+    """The snapshot directory of FlightDatabase's snapshot argument: .snapshots/<csv name> for True."""
+    if snapshot is True:
+        return os.path.join(os.path.dirname(filepath), '.snapshots', os.path.basename(filepath))
+    return snapshot
+
+
+def _window(start_date, end_date):
+    """Convert window bounds accepted by pd.Timestamp to nanoseconds since the epoch; None stays None."""
+    import pandas as pd
+    return tuple(None if value is None else pd.Timestamp(value).value for value in (start_date, end_date))
+
+
+def _stable_argsort(keys, reverse=False):
+    """
+    Stable argsort matching list.sort(): with reverse=True, equal keys keep their original order.
+    """
+    if reverse:
+        # Sort the reversed array stably, then map back and reverse: ties stay in original order
+        order = np.argsort(keys[::-1], kind='stable')[::-1]
+        return len(keys) - 1 - order
+    return np.argsort(keys, kind='stable')
+
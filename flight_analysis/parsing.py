@@ -0,0 +1,123 @@
+import re
+
+# pandas is imported inside the functions, so that the maps and patterns can be used without it
+
+# Mapping for seat type
+SEAT_TYPE_MAP = {
+    '1': 'Window',
+    '2': 'Middle',
+    '3': 'Aisle'
+}
+
+# Mapping for flight class
+FLIGHT_CLASS_MAP = {
+    '1': 'Economy',
+    '2': 'Business'
+}
+
+# Mapping for flight reason
+FLIGHT_REASON_MAP = {
+    '1': 'Leisure',
+    '2': 'Business'
+}
+
+# "Name (IATA/ICAO)" as found in the From, To and Airline columns. Only strings where the last
+# parenthesised group holds exactly one '/' match; anything else goes through the scalar parsers.
+CODES_PATTERN = r'^(?P<name>.*)\((?P<iata>[^()/]*)/(?P<icao>[^()/]*)\)[^()]*$'
+
+# "Name (ICAO)" as found in the Aircraft column.
+AIRCRAFT_PATTERN = r'^(?P<name>.*)\((?P<icao>[^()]*)\)[^()]*$'
+
+
+def parse_codes(series, pattern, fallback, strip_codes=True):
+    """
+    Split a "Name (CODES)" column with a regex, using the scalar parser for rows it doesn't match.
+
+    Args:
+        series (pd.Series): Raw column values.
+        pattern (str): CODES_PATTERN or AIRCRAFT_PATTERN.
+        fallback (callable): Scalar parser, e.g. Flight.parse_airport.
+        strip_codes (bool): Whether to strip whitespace around the codes, as the scalar parser does.
+
+    Returns:
+        list[list]: One list per regex group (name first, then the codes), each with one value per row.
+    """
+    import pandas as pd
+
+    if not pd.api.types.is_string_dtype(series):
+        # An all-empty column is read as floats, let the scalar parser raise on it
+        values = [fallback(value) for value in series.tolist()]
+        return [list(column) for column in zip(*values)] or [[] for _ in range(re.compile(pattern).groups)]
+
+    parts = series.str.extract(pattern)
+    columns = []
+    for i, name in enumerate(parts.columns):
+        column = parts[name].str.strip() if i == 0 or strip_codes else parts[name]
+        columns.append(column.tolist())
+
+    for pos in parts.iloc[:, 0].isna().to_numpy().nonzero()[0]:
+        for column, value in zip(columns, fallback(series.iloc[pos])):
+            column[pos] = value
+    return columns
+
+
+def parse_dates(series):
+    """Convert a date column to datetimes, parsing element by element if the formats are mixed."""
+    import pandas as pd
+
+    try:
+        return pd.to_datetime(series)
+    except (ValueError, TypeError):
+        return pd.to_datetime(series.map(pd.to_datetime))
+
+
+def parse_times(series):
+    """
+    Convert an 'HH:MM:SS' column to datetimes on today's date, as pd.to_datetime does for a
+    single time string.
+    """
+    import pandas as pd
+
+    try:
+        return pd.Timestamp.today().normalize() + pd.to_timedelta(series)
+    except (ValueError, TypeError):
+        return pd.to_datetime(series.map(pd.to_datetime))
+
+
+def parse_durations(series, fallback):
+    """Convert an 'HH:MM:SS' duration column to total minutes."""
+    try:
+        parts = series.str.split(':', expand=True)
+        if parts.shape[1] != 3:
+            raise ValueError("Duration is not in 'HH:MM:SS' format")
+        parts = parts.astype('int64')
+        return parts[0] * 60 + parts[1] + parts[2] // 60
+    except (ValueError, TypeError, AttributeError):
+        return series.map(fallback)
+
+
+def parse_ids(series, size, fallback, missing=-1):
+    """
+    Convert an integer ID column (Dep_id, Arr_id, Airline_id, Aircraft_id) to an int32 array.
+
+    Args:
+        series (pd.Series): Raw column values, or None if the CSV has no such column.
+        size (int): Number of rows.
+        fallback (callable): Scalar parser for values that are not plain numbers, e.g. Flight.parse_id.
+        missing (int): Value stored for empty IDs.
+    """
+    import numpy as np
+    import pandas as pd
+
+    if series is None:
+        return np.full(size, missing, dtype=np.int32)
+    numbers = pd.to_numeric(series, errors='coerce')
+    unparsed = (numbers.isna() & series.notna()) | (numbers.notna() & (numbers % 1 != 0))
+    for pos in unparsed.to_numpy().nonzero()[0]:
+        numbers.iloc[pos] = fallback(series.iloc[pos])
+    return numbers.fillna(missing).to_numpy().astype(np.int32)
+
+
+def map_codes(series, mapping):
+    """Translate a numeric code column through one of the *_MAP dictionaries."""
+    return series.astype(str).str.strip().map(mapping).fillna('Unknown')
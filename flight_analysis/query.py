@@ -0,0 +1,223 @@
+import numpy as np
+
+from . import models
+from .stats import FlightStats
+
+# Predicate name -> number of values it takes
+PREDICATES = {
+    'airline': 1,
+    'flight_class': 1,
+    'reason': 1,
+    'route': 2,
+    'date_between': 2,
+}
+
+# Rows of the smallest position set tested per step when a limit lets evaluation stop early
+_CHUNK = 1024
+
+# Largest result whose positions are kept in the QueryCache; bigger ones are recomputed, so a
+# few broad queries can't fill the cache with copies of most of the row numbers
+CACHED_POSITIONS = 100_000
+
+
+class FlightQuery:
+    """
+    A composable, lazily evaluated selection of flights.
+
+    Built with FlightDatabase.query() and refined with where(), order_by() and limit(); each call
+    returns a new query, so a query can be reused as the base of several others. Nothing is read
+    until a result is asked for. Every predicate is answered by the FlightIndex as an ascending
+    array of row positions, and the arrays are intersected smallest first with binary searches,
+    so no flights are copied and no Flight objects are built to filter. Positions of up to
+    CACHED_POSITIONS rows are memoized in the database's QueryCache per data version; a query
+    without conditions reads the database's own sort orders instead.
+    """
+
+    def __init__(self, flight_db, predicates=(), order=None, count=None):
+        """
+        Args:
+            flight_db (FlightDatabase): The flights to query.
+            predicates (tuple): (name, values) pairs, combined with AND.
+            order (tuple): (sort key, reverse), see FlightDatabase.sort_order(); row order if None.
+            count (int): Maximum number of flights; no limit if None.
+        """
+        self.flight_db = flight_db
+        self.predicates = predicates
+        self.order = order
+        self.count = count
+
+    def __repr__(self):
+        return f"FlightQuery(predicates={self.predicates!r}, order={self.order!r}, limit={self.count!r})"
+
+    def where(self, airline=None, flight_class=None, reason=None, route=None, date_between=None):
+        """
+        Return a query that also requires every given condition.
+
+        Args:
+            airline (str): Airline name, compared case-insensitively.
+            flight_class (str): Flight class, e.g. 'Economy'.
+            reason (str): Flight reason, e.g. 'Leisure'.
+            route (tuple): (from_iata, to_iata).
+            date_between (tuple): (start_date, end_date), inclusive, as accepted by pd.Timestamp.
+        """
+        predicates = list(self.predicates)
+        for name, value in (('airline', airline), ('flight_class', flight_class), ('reason', reason),
+                            ('route', route), ('date_between', date_between)):
+            if value is None:
+                continue
+            values = (value,) if PREDICATES[name] == 1 else tuple(value)
+            if len(values) != PREDICATES[name]:
+                raise ValueError(f"{name} needs {PREDICATES[name]} values, got {len(values)}")
+            predicates.append((name, values))
+        return FlightQuery(self.flight_db, tuple(predicates), self.order, self.count)
+
+    def order_by(self, key, reverse=False):
+        """
+        Return a query sorted by key ('date', 'duration' or 'airline'). Equal keys keep their row
+        order, as with list.sort().
+        """
+        if key not in ('date', 'duration', 'airline'):
+            raise ValueError(f"Unknown sort key: '{key}'")
+        return FlightQuery(self.flight_db, self.predicates, (key, bool(reverse)), self.count)
+
+    def limit(self, count):
+        """Return a query stopping after count flights."""
+        if count < 0:
+            raise ValueError("limit must not be negative")
+        return FlightQuery(self.flight_db, self.predicates, self.order, int(count))
+
+    def positions(self):
+        """
+        Evaluate the query.
+
+        Returns:
+            np.ndarray: Row positions of the matching flights, in result order.
+        """
+        db = self.flight_db
+        if not self.predicates:
+            # Every row: the database already keeps each sort order, so there is nothing to cache
+            selected = np.arange(len(db), dtype=np.int64) if self.order is None else db.sort_order(*self.order)
+            return _read_only(selected[:self.count])
+        key = ('query', self.predicates, (('order', self.order), ('limit', self.count)))
+        return db.cache.get_or_compute(key, db.version, self._evaluate,
+                                       keep=lambda selected: len(selected) <= CACHED_POSITIONS)
+
+    def __len__(self):
+        return len(self.positions())
+
+    def __iter__(self):
+        return iter(self.flights())
+
+    def flights(self):
+        """Return the matching flights as Flight objects, built for the selected rows only."""
+        return self.flight_db._rows(self.positions())
+
+    def page(self, page, page_size):
+        """Return one page of the matching flights, building Flight objects for that page only."""
+        start = (page - 1) * page_size
+        return self.flight_db._rows(self.positions()[start:start + page_size])
+
+    def columns(self):
+        """Return the matching flights as FlightColumns sharing the database's tables."""
+        return self.flight_db.columns.take(self.positions())
+
+    @property
+    def stats(self):
+        """
+        FlightStats over the matching flights, e.g. query.stats.flights_by_airline(). Computed from
+        the selected rows' columns, without building Flight objects.
+        """
+        db = self.flight_db
+        # Without a limit the order doesn't change which flights are counted
+        order = self.order if self.count is not None else None
+        key = ('query_stats', self.predicates, (('order', order), ('limit', self.count)))
+        return db.cache.get_or_compute(key, db.version, lambda: FlightStats.from_columns(self.columns()))
+
+    def _evaluate(self):
+        matches = sorted((self._lookup(name, values) for name, values in self.predicates), key=len)
+        early = self.count if self.order is None else None
+        selected = _intersect_all(matches[0], matches[1:], early)
+        if self.order is not None:
+            selected = self._sorted(selected)
+        if self.count is not None:
+            selected = selected[:self.count]
+        # The result is cached and may be a view of an index bucket, so hand it out read-only
+        return _read_only(selected)
+
+    def _lookup(self, name, values):
+        index = self.flight_db.index
+        if name == 'airline':
+            return index.airline(*values)
+        if name == 'flight_class':
+            return index.flight_class(*values)
+        if name == 'reason':
+            return index.reason(*values)
+        if name == 'route':
+            return index.route(*values)
+        return index.date_range(*models._window(*values))
+
+    def _sorted(self, selected):
+        """Order the selected positions by the sort key, sorting only the rows the limit can reach."""
+        key, reverse = self.order
+        db = self.flight_db
+        if key == 'date':
+            keys = db.columns.arrays['date'][selected]
+        elif key == 'duration':
+            keys = db.columns.arrays['duration_minutes'][selected]
+        else:
+            keys = db._airline_ranks()[db.columns.arrays['airline'][selected]]
+
+        if self.count is not None and self.count < len(selected):
+            if self.count == 0:
+                return selected[:0]
+            # Keep every row tied with the last one that fits, so the stable sort below still
+            # decides which of the ties come first
+            if reverse:
+                cutoff = np.partition(keys, len(keys) - self.count)[len(keys) - self.count]
+                candidates = np.flatnonzero(keys >= cutoff)
+            else:
+                cutoff = np.partition(keys, self.count - 1)[self.count - 1]
+                candidates = np.flatnonzero(keys <= cutoff)
+            selected, keys = selected[candidates], keys[candidates]
+        return selected[models._stable_argsort(keys, reverse)]
+
+
+def _intersect_all(smallest, others, limit=None):
+    """
+    Intersect ascending position arrays.
+
+    Args:
+        smallest (np.ndarray): The shortest array; the result is a subset of it.
+        others (list): The other arrays.
+        limit (int): Stop once this many positions are found; all if None.
+    """
+    if limit is None or not others:
+        for other in others:
+            smallest = _intersect(smallest, other)
+        return smallest
+    found, total = [], 0
+    for start in range(0, len(smallest), max(_CHUNK, limit)):
+        chunk = smallest[start:start + max(_CHUNK, limit)]
+        for other in others:
+            chunk = _intersect(chunk, other)
+        found.append(chunk)
+        total += len(chunk)
+        if total >= limit:
+            break
+    return np.concatenate(found) if found else smallest[:0]
+
+
+def _intersect(small, large):
+    """Positions of the ascending array small that are also in large, in O(len(small) log len(large))."""
+    if not len(small) or not len(large):
+        return small[:0]
+    at = np.searchsorted(large, small)
+    at[at == len(large)] = len(large) - 1
+    return small[large[at] == small]
+
+
+def _read_only(positions):
+    """A read-only view of positions, which may be cached or shared with an index."""
+    positions = positions.view()
+    positions.flags.writeable = False
+    return positions
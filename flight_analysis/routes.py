@@ -0,0 +1,158 @@
+import heapq
+
+import numpy as np
+
+from .columnar import MISSING_ID
+
+# Edge weights accepted by RouteGraph.top_routes()
+WEIGHTS = ('flights', 'minutes')
+
+
+class RouteGraph:
+    """
+    The route network as a weighted adjacency structure: airport -> destination -> [flights, minutes].
+
+    Airports are numbered nodes, one per IATA code, so routes agree with FlightIndex.route() and
+    FlightStats.route_counts(); the CSV's Dep_id/Arr_id of each airport is kept in airport_ids.
+    Edges are folded in batch by batch (one np.unique over the batch's integer route keys), so
+    adding k flights costs O(k log k) plus the number of distinct routes among them, and queries
+    never build per-flight string keys. Only the routes and durations are kept, so reordering the
+    rows leaves the graph valid.
+    """
+
+    def __init__(self, columns):
+        """
+        Args:
+            columns (FlightColumns): The flights to add.
+        """
+        self.airports = []
+        self.nodes = {}
+        self.airport_ids = {}
+        self.adjacency = {}
+        self.incoming = {}
+        self.edges = {}
+        self._components = None
+        self.extend(columns, 0)
+
+    def extend(self, columns, start):
+        """Add the rows appended to columns from position start on."""
+        node_of = np.array([self._node(iata) for iata in columns.entries('from_airport', 1)], dtype=np.int64)
+        origins = node_of[columns.arrays['from_airport'][start:]]
+        destinations = node_of[columns.arrays['to_airport'][start:]]
+        if not len(origins):
+            return
+        minutes = columns.arrays['duration_minutes'][start:].astype(np.int64)
+
+        # New routes are added in the order they first appear in the batch, as in FlightStats
+        width = len(self.airports)
+        keys = origins * width + destinations
+        unique, first_seen, inverse, counts = np.unique(keys, return_index=True, return_inverse=True,
+                                                        return_counts=True)
+        totals = np.bincount(inverse, weights=minutes).astype(np.int64)
+        for i in np.argsort(first_seen, kind='stable').tolist():
+            origin, destination = divmod(int(unique[i]), width)
+            edge = self.edges.get((origin, destination))
+            if edge is None:
+                edge = self.edges[(origin, destination)] = [0, 0]
+                self.adjacency.setdefault(origin, {})[destination] = edge
+                self.incoming.setdefault(destination, {})[origin] = edge
+            edge[0] += int(counts[i])
+            edge[1] += int(totals[i])
+
+        for nodes, ids in ((origins, columns.arrays['dep_id'][start:]),
+                           (destinations, columns.arrays['arr_id'][start:])):
+            known = ids != MISSING_ID
+            for node, airport_id in np.unique(np.column_stack([nodes[known], ids[known]]), axis=0).tolist():
+                self.airport_ids.setdefault(node, airport_id)
+        self._components = None
+
+    def _node(self, iata):
+        node = self.nodes.get(iata)
+        if node is None:
+            node = self.nodes[iata] = len(self.airports)
+            self.airports.append(iata)
+        return node
+
+    def top_routes(self, n=10, weight='flights'):
+        """
+        Return the n heaviest routes, found with a heap in O(E log n) for E routes.
+
+        Args:
+            n (int): Number of routes.
+            weight (str): 'flights' or 'minutes'.
+
+        Returns:
+            list[tuple]: ((from_iata, to_iata), weight) pairs, heaviest first; ties keep the order
+            in which the routes first appeared, as Counter.most_common() does.
+        """
+        if weight not in WEIGHTS:
+            raise ValueError(f"Unknown weight: '{weight}'")
+        column = WEIGHTS.index(weight)
+        top = heapq.nlargest(n, self.edges.items(), key=lambda item: item[1][column])
+        return [((self.airports[origin], self.airports[destination]), edge[column])
+                for (origin, destination), edge in top]
+
+    def degree(self, iata):
+        """
+        Return an airport's connectivity.
+
+        Returns:
+            dict: destinations and origins (distinct airports flown to and from), departures and
+            arrivals (flights), all zero for an unknown airport.
+        """
+        node = self.nodes.get(iata)
+        outgoing = self.adjacency.get(node, {})
+        incoming = self.incoming.get(node, {})
+        return {
+            'destinations': len(outgoing),
+            'origins': len(incoming),
+            'departures': sum(edge[0] for edge in outgoing.values()),
+            'arrivals': sum(edge[0] for edge in incoming.values()),
+        }
+
+    def connected_components(self):
+        """
+        Return the groups of airports connected by routes in either direction.
+
+        Computed with union-find in O(E α(V)) and kept until flights are added.
+
+        Returns:
+            list[list]: Sorted IATA codes per component, largest component first.
+        """
+        if self._components is None:
+            parent = list(range(len(self.airports)))
+
+            def find(node):
+                while parent[node] != node:
+                    parent[node] = parent[parent[node]]
+                    node = parent[node]
+                return node
+
+            for origin, destination in self.edges:
+                a, b = find(origin), find(destination)
+                if a != b:
+                    parent[max(a, b)] = min(a, b)
+            groups = {}
+            for node in self.incoming.keys() | self.adjacency.keys():
+                groups.setdefault(find(node), []).append(self.airports[node])
+            self._components = sorted((sorted(group) for group in groups.values()),
+                                      key=lambda group: (-len(group), group))
+        return [list(group) for group in self._components]
+
+    def sankey(self, n=10):
+        """
+        Node and link arrays of a Sankey diagram of the n busiest routes.
+
+        Returns:
+            dict: nodes (sorted IATA codes), and source, target (indexes into nodes) and value
+            (flights) with one entry per route, busiest first.
+        """
+        routes = self.top_routes(n)
+        nodes = sorted({airport for route, _ in routes for airport in route})
+        index = {airport: i for i, airport in enumerate(nodes)}
+        return {
+            'nodes': nodes,
+            'source': [index[origin] for (origin, _), _ in routes],
+            'target': [index[destination] for (_, destination), _ in routes],
+            'value': [count for _, count in routes],
+        }
@@ -0,0 +1,396 @@
+import math
+from collections import Counter
+from hashlib import blake2b
+
+import numpy as np
+
+# Percentiles reported by default, as fractions
+DEFAULT_QUANTILES = (0.5, 0.9, 0.99)
+
+_UINT64 = np.uint64
+
+
+class FlightSketches:
+    """
+    Approximate aggregates over flights in bounded memory.
+
+    Distinct airports, airlines and aircraft are counted with HyperLogLog, the busiest routes,
+    airports and aircraft are found with Count-Min sketches that track their heaviest keys, and
+    duration percentiles come from a t-digest. Memory depends on the error bounds only, not on the
+    number of flights or of distinct values, and keys are hashed by name, so sketches built from
+    different files, shards or processes (each with its own tables) can be merged.
+
+    Like FlightStats, batches are folded in with one np.bincount per column: only the distinct
+    values of a batch are hashed, so adding k flights costs O(k) plus their distinct values.
+    """
+
+    def __init__(self, distinct_error=0.01, frequency_error=0.0005, confidence=0.99, compression=100,
+                 capacity=100):
+        """
+        Args:
+            distinct_error (float): Relative standard error of the distinct counts.
+            frequency_error (float): Maximum overestimate of a flight count, as a fraction of all
+                flights, with probability confidence.
+            confidence (float): Probability that a count is within frequency_error.
+            compression (int): t-digest compression; higher is more accurate at the extremes.
+            capacity (int): Heaviest keys tracked per Count-Min sketch: the largest n of the top-n
+                queries.
+        """
+        self.count = 0
+        self.distinct = {name: HyperLogLog(distinct_error) for name in ('airport', 'airline', 'aircraft')}
+        self.frequent = {name: HeavyHitters(capacity, frequency_error, confidence)
+                         for name in ('route', 'airport', 'aircraft')}
+        self.durations = TDigest(compression)
+
+    @classmethod
+    def from_columns(cls, columns, **bounds):
+        """Sketch a whole FlightColumns; bounds are passed to FlightSketches()."""
+        sketches = cls(**bounds)
+        sketches.update(columns)
+        return sketches
+
+    def update(self, columns, start=0):
+        """
+        Fold flights into the sketches.
+
+        Args:
+            columns (FlightColumns): The flights, with any tables.
+            start (int): Only rows from this position on are added.
+        """
+        arrays = {name: array[start:] for name, array in columns.arrays.items()}
+        if not len(arrays['date']):
+            return
+        self.count += len(arrays['date'])
+
+        airports = columns.entries('from_airport', 0)
+        size = len(airports)
+        airport_counts = (np.bincount(arrays['from_airport'], minlength=size)
+                          + np.bincount(arrays['to_airport'], minlength=size))
+        airport_counts = _named_counts(airports, airport_counts)
+        aircraft_counts = _named_counts(columns.entries('aircraft', 0), np.bincount(arrays['aircraft']))
+        airline_counts = _named_counts(columns.entries('airline', 0), np.bincount(arrays['airline']))
+
+        iata = columns.entries('from_airport', 1)
+        keys = arrays['from_airport'].astype(np.int64) * size + arrays['to_airport']
+        unique, counts = np.unique(keys, return_counts=True)
+        route_counts = {f"{iata[key // size]}->{iata[key % size]}": count
+                        for key, count in zip(unique.tolist(), counts.tolist())}
+
+        self.distinct['airport'].add(airport_counts)
+        self.distinct['airline'].add(airline_counts)
+        self.distinct['aircraft'].add(aircraft_counts)
+        self.frequent['route'].add(route_counts)
+        self.frequent['airport'].add(airport_counts)
+        self.frequent['aircraft'].add(aircraft_counts)
+        minutes, counts = np.unique(arrays['duration_minutes'], return_counts=True)
+        self.durations.add(minutes, counts)
+
+    def merge(self, other):
+        """Add the flights summarized by another FlightSketches with the same error bounds."""
+        for name, sketch in self.distinct.items():
+            sketch.merge(other.distinct[name])
+        for name, sketch in self.frequent.items():
+            sketch.merge(other.frequent[name])
+        self.durations.merge(other.durations)
+        self.count += other.count
+
+    def unique_airports(self):
+        """Estimate the number of distinct airports (by name) used as origin or destination."""
+        return self.distinct['airport'].estimate()
+
+    def unique_airlines(self):
+        """Estimate the number of distinct airline names."""
+        return self.distinct['airline'].estimate()
+
+    def unique_aircraft(self):
+        """Estimate the number of distinct aircraft names."""
+        return self.distinct['aircraft'].estimate()
+
+    def busiest_routes(self, n=10):
+        """Return the n most frequent routes as ("FROM->TO", estimated count) tuples."""
+        return self.frequent['route'].top(n)
+
+    def top_airports(self, n=10):
+        """Return the n airports (by name) most used as origin or destination, with estimated counts."""
+        return self.frequent['airport'].top(n)
+
+    def most_used_airport(self):
+        """Return the airport (by name) that appears most often as origin or destination."""
+        return self.top_airports(1)[0]
+
+    def flights_by_aircraft(self, n=10):
+        """Return a Counter of the estimated flights of the n most flown aircraft."""
+        return Counter(dict(self.frequent['aircraft'].top(n)))
+
+    def duration_percentiles(self, quantiles=DEFAULT_QUANTILES):
+        """
+        Estimate flight duration percentiles.
+
+        Args:
+            quantiles (iterable): Fractions between 0 and 1.
+
+        Returns:
+            dict: Quantile -> duration in minutes.
+        """
+        return {q: self.durations.quantile(q) for q in quantiles}
+
+
+class HyperLogLog:
+    """
+    Distinct count estimate with 2**precision one-byte registers.
+
+    A key's 64-bit hash picks a register with its top bits and records the longest run of leading
+    zeros seen in the rest. The relative standard error is about 1.04 / sqrt(2**precision); small
+    counts fall back to linear counting and are nearly exact. Merging takes register maxima.
+    """
+
+    def __init__(self, error=0.01):
+        """
+        Args:
+            error (float): Target relative standard error; the precision is the smallest meeting it.
+        """
+        if not 0 < error < 1:
+            raise ValueError("error must be between 0 and 1")
+        self.precision = min(max(math.ceil(2 * math.log2(1.04 / error)), 4), 18)
+        self.registers = np.zeros(1 << self.precision, dtype=np.uint8)
+
+    def add(self, keys):
+        """Add keys (any iterable, hashed by str(); a mapping adds its keys)."""
+        hashes = _hash64(keys)
+        if not len(hashes):
+            return
+        bits = 64 - self.precision
+        buckets = (hashes >> _UINT64(bits)).astype(np.int64)
+        rest = hashes & _UINT64((1 << bits) - 1)
+        ranks = (bits - _bit_length(rest) + 1).astype(np.uint8)
+        np.maximum.at(self.registers, buckets, ranks)
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("Only HyperLogLogs with the same precision can be merged")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self):
+        """Return the estimated number of distinct keys added."""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            return round(m * math.log(m / zeros))
+        return round(raw)
+
+
+class CountMinSketch:
+    """
+    Frequency estimates in a depth x width table of counters.
+
+    Each key is counted in one cell per row and estimated by the smallest of its cells, so an
+    estimate is never below the true count and, with probability confidence, exceeds it by at most
+    error times the total count. Sketches with the same shape merge by adding the tables.
+    """
+
+    def __init__(self, error=0.0005, confidence=0.99):
+        """
+        Args:
+            error (float): Maximum overestimate as a fraction of the total count.
+            confidence (float): Probability that an estimate is within the error.
+        """
+        if not 0 < error < 1 or not 0 < confidence < 1:
+            raise ValueError("error and confidence must be between 0 and 1")
+        self.width = math.ceil(math.e / error)
+        self.depth = math.ceil(math.log(1 / (1 - confidence)))
+        self.table = np.zeros((self.depth, self.width), dtype=np.int64)
+        self.total = 0
+
+    def _cells(self, hashes):
+        """Column of every hash in every row (double hashing with the two 32-bit halves)."""
+        low = hashes & _UINT64(0xFFFFFFFF)
+        high = (hashes >> _UINT64(32)) | _UINT64(1)
+        rows = np.arange(self.depth, dtype=np.uint64)[:, None]
+        return ((low + rows * high) % _UINT64(self.width)).astype(np.int64)
+
+    def add(self, hashes, counts):
+        cells = self._cells(hashes)
+        for row in range(self.depth):
+            np.add.at(self.table[row], cells[row], counts)
+        self.total += int(np.sum(counts))
+
+    def estimate(self, hashes):
+        """Return the estimated counts of the hashed keys."""
+        cells = self._cells(hashes)
+        return self.table[np.arange(self.depth)[:, None], cells].min(axis=0)
+
+    def merge(self, other):
+        if self.table.shape != other.table.shape:
+            raise ValueError("Only Count-Min sketches with the same error bounds can be merged")
+        self.table += other.table
+        self.total += other.total
+
+
+class HeavyHitters:
+    """
+    The most frequent keys of a stream: a CountMinSketch plus the capacity keys with the highest
+    estimates so far.
+
+    After every batch the tracked keys and the batch's keys are re-estimated and the heaviest
+    capacity of them kept, so memory is bounded by the sketch and the capacity.
+    """
+
+    def __init__(self, capacity=100, error=0.0005, confidence=0.99):
+        """
+        Args:
+            capacity (int): Number of keys tracked.
+            error (float): See CountMinSketch.
+            confidence (float): See CountMinSketch.
+        """
+        self.capacity = capacity
+        self.sketch = CountMinSketch(error, confidence)
+        self.candidates = {}
+
+    def add(self, counts):
+        """
+        Args:
+            counts (dict): Key -> number of occurrences in the batch.
+        """
+        if not counts:
+            return
+        keys = list(counts)
+        self.sketch.add(_hash64(keys), np.array(list(counts.values()), dtype=np.int64))
+        self._track(keys)
+
+    def _track(self, keys):
+        candidates = dict(self.candidates)
+        for key, hashed in zip(keys, _hash64(keys).tolist()):
+            candidates[key] = hashed
+        keys = list(candidates)
+        estimates = self.sketch.estimate(np.array(list(candidates.values()), dtype=np.uint64))
+        # Ties are broken by key, so the same stream always keeps the same keys
+        order = sorted(range(len(keys)), key=lambda i: (-estimates[i], str(keys[i])))[:self.capacity]
+        self.candidates = {keys[i]: candidates[keys[i]] for i in order}
+
+    def merge(self, other):
+        if other.capacity != self.capacity:
+            raise ValueError("Only heavy hitters with the same capacity can be merged")
+        self.sketch.merge(other.sketch)
+        self._track(list(other.candidates))
+
+    def top(self, n=10):
+        """
+        Return the n keys with the highest estimates.
+
+        Returns:
+            list[tuple]: (key, estimated count) pairs, highest first, ties by key.
+        """
+        if n > self.capacity:
+            raise ValueError(f"Only the top {self.capacity} keys are tracked")
+        keys = list(self.candidates)
+        if not keys:
+            return []
+        estimates = self.sketch.estimate(np.array(list(self.candidates.values()), dtype=np.uint64)).tolist()
+        return sorted(zip(keys, estimates), key=lambda item: (-item[1], str(item[0])))[:n]
+
+
+class TDigest:
+    """
+    Quantile estimates from weighted centroids (a merging t-digest with the k1 scale function).
+
+    Centroids are small near the extremes and larger around the median, so tail percentiles are
+    the most accurate; there are at most about compression of them. Points and other digests are
+    merged in with one sorted pass.
+    """
+
+    def __init__(self, compression=100):
+        """
+        Args:
+            compression (int): Bound on the number of centroids; higher is more accurate.
+        """
+        if compression < 10:
+            raise ValueError("compression must be at least 10")
+        self.compression = compression
+        self.means = np.zeros(0, dtype=np.float64)
+        self.weights = np.zeros(0, dtype=np.int64)
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, values, weights=None):
+        """
+        Args:
+            values (np.ndarray): Points to add.
+            weights (np.ndarray): Occurrences of each point; one each if None.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if not len(values):
+            return
+        weights = np.ones(len(values), dtype=np.int64) if weights is None else np.asarray(weights, dtype=np.int64)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self._compress(np.concatenate([self.means, values]), np.concatenate([self.weights, weights]))
+
+    def merge(self, other):
+        if not len(other.means):
+            return
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress(np.concatenate([self.means, other.means]), np.concatenate([self.weights, other.weights]))
+
+    def _compress(self, means, weights):
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order].tolist(), weights[order].tolist()
+        total = sum(weights)
+        scale = self.compression / (2 * math.pi)
+
+        def limit(done):
+            # The largest cumulative fraction the next centroid may reach: one unit of k1 further
+            k = scale * math.asin(2 * done / total - 1) + 1
+            return total * (math.sin(min(k / scale, math.pi / 2)) + 1) / 2
+
+        merged_means, merged_weights = [means[0]], [weights[0]]
+        done = 0
+        bound = limit(done)
+        for mean, weight in zip(means[1:], weights[1:]):
+            if done + merged_weights[-1] + weight <= bound:
+                merged_weights[-1] += weight
+                merged_means[-1] += (mean - merged_means[-1]) * weight / merged_weights[-1]
+            else:
+                done += merged_weights[-1]
+                bound = limit(done)
+                merged_means.append(mean)
+                merged_weights.append(weight)
+        self.means = np.array(merged_means)
+        self.weights = np.array(merged_weights, dtype=np.int64)
+
+    def quantile(self, q):
+        """Return the estimated value below which a fraction q of the points lie (NaN if empty)."""
+        if not 0 <= q <= 1:
+            raise ValueError("q must be between 0 and 1")
+        if not len(self.means):
+            return math.nan
+        total = int(self.weights.sum())
+        centers = np.cumsum(self.weights) - self.weights / 2
+        return float(np.interp(q * total, np.r_[0, centers, total], np.r_[self.min, self.means, self.max]))
+
+
+def _hash64(keys):
+    """Stable 64-bit hashes of keys by their str(), equal in every process (unlike hash())."""
+    return np.array([int.from_bytes(blake2b(str(key).encode(), digest_size=8).digest(), 'little') for key in keys],
+                    dtype=np.uint64)
+
+
+def _bit_length(values):
+    """Bit length of every uint64 value (0 for 0)."""
+    values = values.copy()
+    lengths = np.zeros(len(values), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        high = values >= _UINT64(1 << shift)
+        lengths[high] += shift
+        values[high] >>= _UINT64(shift)
+    return lengths + (values != 0)
+
+
+def _named_counts(names, counts):
+    """Per-code counts -> {name: count} for the codes that occur, adding up codes sharing a name."""
+    result = {}
+    for code in np.flatnonzero(counts).tolist():
+        result[names[code]] = result.get(names[code], 0) + int(counts[code])
+    return result
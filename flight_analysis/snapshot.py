@@ -0,0 +1,175 @@
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: snapshots still work, but processes don't coordinate building them
+    fcntl = None
+
+from .columnar import ROW_FIELDS, FlightColumns
+
+# Tables whose entries are (name, codes...) tuples; JSON stores them as lists
+TUPLE_TABLES = ('airport', 'airline', 'aircraft')
+
+CURRENT = 'current.json'
+LOCK = '.lock'
+
+
+def source_key(filepath, digest=None):
+    """
+    Identify the contents of a source CSV.
+
+    Args:
+        filepath (str): The CSV file.
+        digest (str): Its SHA-256, if already known.
+
+    Returns:
+        dict: size, mtime_ns and sha256 of the file.
+    """
+    stat = os.stat(filepath)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest or file_digest(filepath)}
+
+
+def file_digest(filepath):
+    """Return the SHA-256 hex digest of a file, read in 1 MiB blocks."""
+    sha = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+@contextlib.contextmanager
+def snapshot_lock(directory, exclusive=False):
+    """
+    Hold an advisory lock on a snapshot directory, shared between processes.
+
+    Readers take it shared while they open the current generation, and a writer takes it
+    exclusively while it builds one. Web workers starting together therefore parse the CSV once:
+    the first to get the exclusive lock builds the snapshot and the others map it when they get
+    their turn. A generation is never removed while another process is still opening it.
+
+    Args:
+        directory (str): Snapshot directory, created if needed.
+        exclusive (bool): Take the writer's lock instead of a reader's.
+    """
+    try:
+        os.makedirs(directory, exist_ok=True)
+        f = open(os.path.join(directory, LOCK), 'a')
+    except OSError:
+        # A read-only location can't be locked, but it can't be rebuilt either
+        yield
+        return
+    with f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield
+
+
+def save_snapshot(columns, directory, key):
+    """
+    Write columns to a snapshot directory.
+
+    Each column becomes a .npy file and the tables go to tables.json, inside a new generation
+    subdirectory. current.json, which records the source key and the generation, is replaced
+    atomically last, so readers never see a half-written snapshot. Older generations are removed
+    afterwards; processes that still have them memory-mapped keep working.
+
+    Args:
+        columns (FlightColumns): Parsed flights.
+        directory (str): Snapshot directory, created if needed.
+        key (dict): source_key() of the CSV the columns were parsed from.
+
+    Returns:
+        str: The new generation's directory.
+    """
+    os.makedirs(directory, exist_ok=True)
+    generation = tempfile.mkdtemp(prefix='gen-', dir=directory)
+    for name, array in columns.arrays.items():
+        np.save(os.path.join(generation, f'{name}.npy'), np.ascontiguousarray(array))
+    with open(os.path.join(generation, 'tables.json'), 'w', encoding='utf-8') as f:
+        json.dump(columns.tables, f)
+
+    _write_json(os.path.join(directory, CURRENT), {'source': key, 'generation': os.path.basename(generation)})
+    for name in os.listdir(directory):
+        if name.startswith('gen-') and name != os.path.basename(generation):
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+    return generation
+
+
+def load_snapshot(directory, filepath=None, mmap=True):
+    """
+    Load the current snapshot generation.
+
+    The snapshot is only used if it was built from the CSV as it is now: same size, and either the
+    same modification time or (when only the mtime changed) the same SHA-256.
+
+    Args:
+        directory (str): Snapshot directory.
+        filepath (str): Source CSV to validate against; skip validation if None.
+        mmap (bool): Memory-map the arrays read-only instead of reading them into memory.
+
+    Returns:
+        FlightColumns: The snapshot, or None if there is no valid one.
+    """
+    try:
+        with open(os.path.join(directory, CURRENT), encoding='utf-8') as f:
+            current = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if filepath is not None and not _matches(current['source'], filepath):
+        return None
+
+    generation = os.path.join(directory, current['generation'])
+    try:
+        with open(os.path.join(generation, 'tables.json'), encoding='utf-8') as f:
+            tables = json.load(f)
+        arrays = {name[:-4]: np.load(os.path.join(generation, name), mmap_mode='r' if mmap else None)
+                  for name in os.listdir(generation) if name.endswith('.npy')}
+    except (OSError, ValueError):
+        # A writer removed this generation between reading current.json and opening the files
+        return None
+    if any(column not in arrays for column, _ in ROW_FIELDS.values()):
+        # Written before a column was added; rebuild it from the CSV
+        return None
+    for name in TUPLE_TABLES:
+        tables[name] = [tuple(entry) for entry in tables[name]]
+    return FlightColumns(arrays, tables)
+
+
+def recorded_source(directory, filepath):
+    """
+    Return the source key the current snapshot generation was built from, if it still describes
+    filepath, so the CSV doesn't have to be hashed again; None otherwise.
+    """
+    try:
+        with open(os.path.join(directory, CURRENT), encoding='utf-8') as f:
+            key = json.load(f)['source']
+    except (OSError, ValueError, KeyError):
+        return None
+    return key if _matches(key, filepath) else None
+
+
+def _matches(key, filepath):
+    """Whether a recorded source key still describes filepath."""
+    try:
+        stat = os.stat(filepath)
+    except OSError:
+        return False
+    if stat.st_size != key['size']:
+        return False
+    return stat.st_mtime_ns == key['mtime_ns'] or file_digest(filepath) == key['sha256']
+
+
+def _write_json(path, data):
+    """Write JSON to path atomically via a temporary file and os.replace."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
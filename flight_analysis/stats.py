@@ -0,0 +1,167 @@
+import numpy as np
+from collections import Counter
+
+from .columnar import CATEGORY_TABLES
+
+# Categorical columns whose per-code row counts are kept
+COUNTED_COLUMNS = ('airline', 'aircraft', 'from_airport', 'to_airport', 'flight_class')
+
+
+class FlightStats:
+    """
+    Running totals behind the FlightDatabase aggregates.
+
+    Counts and minutes are kept per table code (airline, aircraft, airports), per route and per
+    year, and are folded in batch by batch with np.bincount. Adding k flights therefore costs
+    O(k) plus the number of distinct values, and every aggregate is answered from the totals
+    without touching the rows. Totals don't depend on row order, so sorting leaves them valid.
+    """
+
+    def __init__(self, tables):
+        """
+        Args:
+            tables (dict): The FlightColumns tables the codes point into. They may grow as flights
+                are appended; the totals are padded to match.
+        """
+        self.tables = tables
+        self.count = 0
+        self.minutes = 0
+        self.code_counts = {column: np.zeros(0, dtype=np.int64) for column in COUNTED_COLUMNS}
+        self.airline_minutes = np.zeros(0, dtype=np.int64)
+        self.routes = Counter()
+        self.year_counts = Counter()
+        self.year_minutes = Counter()
+
+    @classmethod
+    def from_columns(cls, columns):
+        """Compute the totals for a whole FlightColumns."""
+        stats = cls(columns.tables)
+        stats.update(columns)
+        return stats
+
+    def update(self, columns, start=0):
+        """
+        Fold flights into the totals.
+
+        Args:
+            columns (FlightColumns): Columns sharing this object's tables.
+            start (int): Only rows from this position on are added.
+        """
+        arrays = {name: array[start:] for name, array in columns.arrays.items()}
+        minutes = arrays['duration_minutes'].astype(np.int64)
+        self.count += len(minutes)
+        self.minutes += int(minutes.sum())
+
+        for column in COUNTED_COLUMNS:
+            size = len(columns.entries(column))
+            self.code_counts[column] = _padded(self.code_counts[column], size) + np.bincount(
+                arrays[column], minlength=size)
+        size = len(columns.entries('airline'))
+        self.airline_minutes = _padded(self.airline_minutes, size) + np.bincount(
+            arrays['airline'], weights=minutes, minlength=size).astype(np.int64)
+
+        # New routes are added in the order they first appear in the batch
+        width = len(columns.entries('to_airport'))
+        keys = arrays['from_airport'].astype(np.int64) * width + arrays['to_airport']
+        for key, count in _first_seen_counts(keys):
+            self.routes[(key // width, key % width)] += count
+
+        years = columns.years(slice(start, None))
+        if len(years):
+            first = int(years.min())
+            counts = np.bincount(years - first)
+            totals = np.bincount(years - first, weights=minutes).astype(np.int64)
+            for offset in np.flatnonzero(counts).tolist():
+                self.year_counts[first + offset] += int(counts[offset])
+                self.year_minutes[first + offset] += int(totals[offset])
+
+    def _counter(self, column, part=None, totals=None):
+        """Decode per-code totals into a Counter keyed by the table entry or one part of it."""
+        table = self.tables[CATEGORY_TABLES[column]]
+        totals = self.code_counts[column] if totals is None else totals
+        result = Counter()
+        for entry, total in zip(table, totals.tolist()):
+            if total:
+                result[entry if part is None else entry[part]] += total
+        return result
+
+    def average_duration(self):
+        """Calculate and return the average flight duration in minutes."""
+        return self.minutes / self.count
+
+    def flights_by_airline(self):
+        """Return a Counter of flights grouped by airline."""
+        return self._counter('airline', 0)
+
+    def flights_by_aircraft(self):
+        """Return a Counter of flights grouped by aircraft."""
+        return self._counter('aircraft', 0)
+
+    def flights_by_class(self):
+        """Return a Counter of flights grouped by class."""
+        return self._counter('flight_class')
+
+    def route_counts(self):
+        """Return a Counter of flights per (from_iata, to_iata) route, in first-seen order."""
+        airports = self.tables['airport']
+        routes = Counter()
+        for (origin, destination), count in self.routes.items():
+            routes[(airports[origin][1], airports[destination][1])] += count
+        return routes
+
+    def busiest_routes(self, n=10):
+        """Return the top n most frequent routes as (route, count) tuples."""
+        routes = Counter()
+        for (origin, destination), count in self.route_counts().items():
+            routes[f"{origin}->{destination}"] += count
+        return routes.most_common(n)
+
+    def unique_airlines(self):
+        """Return a sorted list of all unique airline names."""
+        return sorted(self._counter('airline', 0))
+
+    def unique_airports(self):
+        """Return a sorted list of all unique airport names used."""
+        return sorted(self._counter('from_airport', 0) | self._counter('to_airport', 0))
+
+    def most_used_airport(self):
+        """Return the airport (by name) that appears most often as origin or destination."""
+        size = len(self.tables['airport'])
+        totals = _padded(self.code_counts['from_airport'], size) + _padded(self.code_counts['to_airport'], size)
+        return self._counter('from_airport', 0, totals).most_common(1)[0]
+
+    def total_flight_hours(self):
+        """Return the total time spent flying across all flights, in hours."""
+        return round(self.minutes / 60, 2)
+
+    def flight_hours_per_airline(self):
+        """Return a mapping of airline names to total flight hours."""
+        airline_minutes = self._counter('airline', 0, self.airline_minutes)
+        return {airline: round(minutes / 60, 2) for airline, minutes in airline_minutes.items()}
+
+    def flight_hours_per_year(self):
+        """Return a mapping of years to total flight hours, sorted by year."""
+        return {year: round(self.year_minutes[year] / 60.0, 2) for year in sorted(self.year_minutes)}
+
+    def flights_per_year(self):
+        """Return a mapping of years to total flights, sorted by year."""
+        return {year: self.year_counts[year] for year in sorted(self.year_counts)}
+
+
+def _padded(totals, size):
+    """Extend a per-code totals array with zeros for table entries added since it was built."""
+    if len(totals) >= size:
+        return totals
+    return np.concatenate([totals, np.zeros(size - len(totals), dtype=totals.dtype)])
+
+
+def _first_seen_counts(keys):
+    """
+    Count integer keys with np.unique.
+
+    Returns:
+        list[tuple]: (key, count) pairs in the order the keys first appear.
+    """
+    unique, first_seen, counts = np.unique(keys, return_index=True, return_counts=True)
+    order = np.argsort(first_seen, kind='stable')
+    return list(zip(unique[order].tolist(), counts[order].tolist()))
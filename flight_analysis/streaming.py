@@ -0,0 +1,76 @@
+from .columnar import FlightColumns
+from .sketches import FlightSketches
+from .stats import COUNTED_COLUMNS, FlightStats
+
+
+def iter_column_batches(filepath, chunksize=100_000):
+    """
+    Read a flights CSV in chunks, yielding each chunk as FlightColumns.
+
+    Only one chunk is held in memory at a time. Each batch has its own tables.
+
+    Args:
+        filepath (str): Flights CSV.
+        chunksize (int): Rows per chunk.
+    """
+    import pandas as pd
+
+    with pd.read_csv(filepath, chunksize=chunksize) as reader:
+        for df in reader:
+            yield FlightColumns.from_frame(df)
+
+
+def iter_flights(filepath, chunksize=100_000):
+    """Yield Flight objects from a flights CSV, building them one chunk at a time."""
+    for batch in iter_column_batches(filepath, chunksize):
+        yield from batch.rows()
+
+
+def stream_stats(batches):
+    """
+    Fold a stream of FlightColumns batches into FlightStats.
+
+    The columns the totals count are re-encoded against one shared set of tables, so memory grows
+    with the number of distinct airports, airlines and aircraft but not with the number of rows;
+    flight numbers, seats and registrations are not kept at all.
+
+    Args:
+        batches (iterable): FlightColumns, e.g. from iter_column_batches().
+
+    Returns:
+        FlightStats: Totals answering the FlightDatabase aggregates (flight_hours_per_year,
+        busiest_routes, flights_by_airline, ...) for the whole stream.
+    """
+    tables = FlightColumns.empty()
+    stats = FlightStats(tables.tables)
+    for batch in batches:
+        stats.update(tables.translate(batch, COUNTED_COLUMNS))
+    return stats
+
+
+def csv_stats(filepath, chunksize=100_000):
+    """Compute FlightStats over a flights CSV that may not fit in memory."""
+    return stream_stats(iter_column_batches(filepath, chunksize))
+
+
+def stream_sketches(batches, **bounds):
+    """
+    Fold a stream of FlightColumns batches into FlightSketches.
+
+    Unlike stream_stats(), batches keep their own tables and nothing grows with the data: memory
+    is set by the error bounds alone, so this suits unbounded streams. Sketches of several files
+    or shards can be combined with FlightSketches.merge().
+
+    Args:
+        batches (iterable): FlightColumns, e.g. from iter_column_batches().
+        **bounds: Error bounds, see FlightSketches().
+    """
+    sketches = FlightSketches(**bounds)
+    for batch in batches:
+        sketches.update(batch)
+    return sketches
+
+
+def csv_sketches(filepath, chunksize=100_000, **bounds):
+    """Compute FlightSketches over a flights CSV that may not fit in memory."""
+    return stream_sketches(iter_column_batches(filepath, chunksize), **bounds)
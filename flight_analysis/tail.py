@@ -0,0 +1,43 @@
+import io
+import os
+
+
+class CsvTail:
+    """
+    Reads a growing CSV file incrementally.
+
+    The byte offset of the last complete line read is remembered, so each read() only parses
+    the lines appended since the previous one. A trailing line without a newline is left for
+    the next read, in case the writer is still in the middle of it.
+    """
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.offset = 0
+        self.header = None
+
+    def read(self):
+        """
+        Parse the complete lines added since the last read.
+
+        Returns:
+            pd.DataFrame: The new rows (possibly empty), with the columns of the file's header.
+        """
+        import pandas as pd
+
+        if os.path.getsize(self.filepath) < self.offset:
+            raise ValueError(f"'{self.filepath}' shrank since it was last read; reload it instead")
+
+        with open(self.filepath, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read()
+        lines = data[:data.rfind(b'\n') + 1]
+        if not lines:
+            return pd.DataFrame(columns=self.header)
+
+        self.offset += len(lines)
+        if self.header is None:
+            df = pd.read_csv(io.BytesIO(lines))
+            self.header = list(df.columns)
+            return df
+        return pd.read_csv(io.BytesIO(lines), header=None, names=self.header)
@@ -0,0 +1,155 @@
+from datetime import date
+
+import numpy as np
+
+from .indexes import _Buffer, _group_table
+
+# Bucket sizes accepted by TimeSeriesIndex.series()
+FREQUENCIES = ('day', 'week', 'month')
+
+
+class TimeSeriesIndex:
+    """
+    Date-sorted prefix sums of flight counts and minutes, overall and per airline.
+
+    The flights' dates are kept sorted next to a cumulative sum of their durations, so the number
+    of flights in any date window is the distance between two binary searches and the minutes
+    flown are the difference of two prefix sums: O(log n) per window, whatever its size. Bucketed
+    series cost one binary search per bucket. Only dates and durations are kept, so the index is
+    not affected by reordering the rows; appended flights are added with extend().
+    """
+
+    def __init__(self, columns):
+        """
+        Args:
+            columns (FlightColumns): The flights to index.
+        """
+        self.overall = _PrefixSums()
+        self.by_airline = {}
+        self.extend(columns, 0)
+
+    def extend(self, columns, start):
+        """
+        Add the rows appended to columns from position start on.
+
+        Flights not older than the indexed ones are appended in O(k) for k new rows; older dates
+        are merged in with one O(n) pass over the series they belong to.
+        """
+        dates = columns.arrays['date'][start:]
+        minutes = columns.arrays['duration_minutes'][start:].astype(np.int64)
+        self.overall.add(dates, minutes)
+        airline_keys = [name.lower() for name in columns.entries('airline', 0)]
+        for airline, positions in _group_table(columns.arrays['airline'][start:], airline_keys).items():
+            series = self.by_airline.get(airline)
+            if series is None:
+                series = self.by_airline[airline] = _PrefixSums()
+            series.add(dates[positions], minutes[positions])
+
+    def _series(self, airline):
+        if airline is None:
+            return self.overall
+        return self.by_airline.get(airline.lower(), _EMPTY_SERIES)
+
+    def count(self, start, end, airline=None):
+        """
+        Number of flights dated within [start, end].
+
+        Args:
+            start (int): Window start in nanoseconds since the epoch.
+            end (int): Window end (inclusive) in nanoseconds since the epoch.
+            airline (str): Only count this airline's flights, compared case-insensitively.
+        """
+        lo, hi = self._series(airline).window(start, end)
+        return hi - lo
+
+    def minutes(self, start, end, airline=None):
+        """Total duration in minutes of the flights dated within [start, end]; see count()."""
+        series = self._series(airline)
+        lo, hi = series.window(start, end)
+        totals = series.totals.values()
+        return int(totals[hi] - totals[lo])
+
+    def series(self, freq, start=None, end=None, airline=None):
+        """
+        Flight counts and minutes per day, week (starting on Monday) or month.
+
+        Args:
+            freq (str): One of FREQUENCIES.
+            start (int): First date in nanoseconds since the epoch; the earliest flight if None.
+            end (int): Last date (inclusive); the latest flight if None.
+            airline (str): Only count this airline's flights, compared case-insensitively.
+
+        Returns:
+            tuple: (list of bucket start dates, int64 counts, int64 minutes), with a zero entry
+            for every bucket in the window that has no flights.
+        """
+        if freq not in FREQUENCIES:
+            raise ValueError(f"Unknown frequency: '{freq}'")
+        dates = self.overall.dates.values()
+        if not len(dates):
+            return [], np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        start = int(dates[0]) if start is None else start
+        end = int(dates[-1]) if end is None else end
+        if end < start:
+            return [], np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+        edges = _bucket_starts(freq, start, end)
+        series = self._series(airline)
+        lo, hi = series.window(start, end)
+        inner = np.clip(np.searchsorted(series.dates.values(), edges[1:-1].astype(np.int64), side='left'), lo, hi)
+        bounds = np.r_[lo, inner, hi]
+        totals = series.totals.values()
+        labels = [date.fromisoformat(str(edge)) for edge in edges[:-1].astype('datetime64[D]')]
+        return labels, np.diff(bounds), np.diff(totals[bounds])
+
+
+class _PrefixSums:
+    """Sorted dates and the running total of minutes up to each of them (totals[0] is 0)."""
+
+    __slots__ = ('dates', 'totals')
+
+    def __init__(self):
+        self.dates = _Buffer(np.empty(0, dtype=np.int64))
+        self.totals = _Buffer(np.zeros(1, dtype=np.int64))
+
+    def add(self, dates, minutes):
+        if not len(dates):
+            return
+        order = np.argsort(dates, kind='stable')
+        dates, minutes = dates[order], minutes[order]
+        current = self.dates.values()
+        if not len(current) or dates[0] >= current[-1]:
+            self.dates.extend(dates)
+            self.totals.extend(self.totals.values()[-1] + np.cumsum(minutes))
+            return
+        merged = np.concatenate([current, dates])
+        order = np.argsort(merged, kind='stable')
+        all_minutes = np.concatenate([np.diff(self.totals.values()), minutes])
+        self.dates = _Buffer(merged[order])
+        self.totals = _Buffer(np.r_[0, np.cumsum(all_minutes[order])])
+
+    def window(self, start, end):
+        """Range of sorted positions dated within [start, end]."""
+        dates = self.dates.values()
+        lo = int(np.searchsorted(dates, start, side='left'))
+        hi = int(np.searchsorted(dates, end, side='right'))
+        return lo, max(lo, hi)
+
+
+_EMPTY_SERIES = _PrefixSums()
+
+
+def _bucket_starts(freq, start, end):
+    """
+    Start of every bucket overlapping [start, end], as datetime64[ns], plus the start of the next.
+    """
+    first, last = np.datetime64(start, 'ns'), np.datetime64(end, 'ns')
+    if freq == 'month':
+        months = np.arange(first.astype('datetime64[M]'), last.astype('datetime64[M]') + 2)
+        return months.astype('datetime64[ns]')
+    days = first.astype('datetime64[D]'), last.astype('datetime64[D]')
+    if freq == 'day':
+        return np.arange(days[0], days[1] + 2).astype('datetime64[ns]')
+    # 1970-01-01 was a Thursday; shift so that weeks start on Monday
+    monday = days[0] - (days[0].astype(np.int64) + 3) % 7
+    return np.arange(monday, days[1] + 8, 7).astype('datetime64[ns]')
@@ -1,41 +1,120 @@
-import matplotlib.pyplot as plt
-import seaborn as sns
-from collections import Counter, defaultdict
-import plotly.graph_objects as go
-sns.set(style="whitegrid")
+import functools
+import importlib.util
+import io
+from concurrent.futures import Future
+
+from .cache import QueryCache
+
+# matplotlib, seaborn and plotly take a few hundred milliseconds to import, so they are only
+# imported when a chart is first drawn.
+
+# Output format -> MIME type
+FORMATS = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+    'json': 'application/json',
+}
 
 
 class FlightVisualizer:
     """
     A class to create various visualizations from a FlightDatabase object.
+
+    The plot_* methods show a chart interactively. render() draws the same charts headless (Agg
+    for matplotlib, Plotly JSON for the Sankey diagram) and returns the encoded bytes, cached per
+    chart, format, parameters and data version. With an executor, drawing runs in its workers,
+    and concurrent requests for the same chart share one render.
     """
 
-    def __init__(self, flight_db):
+    def __init__(self, flight_db, cache_size=64, executor=None):
         """
         Initialize the visualizer with a FlightDatabase instance.
 
         Args:
             flight_db (FlightDatabase): Instance of FlightDatabase containing flights.
+            cache_size (int): Maximum number of rendered charts kept.
+            executor (concurrent.futures.Executor): Pool to render in, ideally a ProcessPoolExecutor
+                since drawing holds the GIL; render() draws in the calling thread if None.
         """
         self.flight_db = flight_db
+        self.cache = QueryCache(cache_size)
+        self.executor = executor
+
+    def chart_data(self, chart, top_n=None):
+        """
+        Return the data behind a chart, computed from the database's running totals.
+
+        Args:
+            chart (str): One of CHARTS.
+            top_n (int): Number of routes for 'top_routes' and 'route_sankey'.
+
+        Returns:
+            dict: Plain lists, ready to be sent to a worker process.
+        """
+        stats = self.flight_db.stats
+        if chart == 'flights_per_year':
+            per_year = stats.flights_per_year()
+            return {'years': list(per_year), 'counts': list(per_year.values())}
+        if chart == 'class_distribution':
+            per_class = stats.flights_by_class()
+            return {'labels': list(per_class), 'sizes': list(per_class.values())}
+        if chart == 'top_routes':
+            top_n = CHARTS[chart][1] if top_n is None else top_n
+            return {'routes': [list(route) for route in self.flight_db.routes.top_routes(top_n)], 'top_n': top_n}
+        if chart == 'route_sankey':
+            top_n = CHARTS[chart][1] if top_n is None else top_n
+            return dict(self.flight_db.routes.sankey(top_n), top_n=top_n)
+        raise ValueError(f"Unknown chart: '{chart}'")
+
+    def render(self, chart, fmt='png', top_n=None):
+        """
+        Render a chart to bytes without a display.
+
+        Args:
+            chart (str): One of CHARTS.
+            fmt (str): 'png' or 'svg' for the matplotlib charts; 'json' (Plotly figure JSON) for
+                'route_sankey', which also renders to png or svg when kaleido is installed.
+            top_n (int): Number of routes for 'top_routes' and 'route_sankey'.
+
+        Returns:
+            bytes: The encoded chart, see FORMATS for the MIME types.
+        """
+        if chart not in CHARTS:
+            raise ValueError(f"Unknown chart: '{chart}'")
+        if fmt not in FORMATS or (fmt == 'json' and chart != 'route_sankey'):
+            raise ValueError(f"Chart '{chart}' cannot be rendered as '{fmt}'")
+        if chart == 'route_sankey' and fmt != 'json' and importlib.util.find_spec('kaleido') is None:
+            raise ValueError("Rendering 'route_sankey' as an image needs the kaleido package")
+        if CHARTS[chart][1] is not None:
+            top_n = CHARTS[chart][1] if top_n is None else int(top_n)
+            if top_n < 1:
+                raise ValueError("top_n must be at least 1")
+        else:
+            top_n = None
+
+        def submit():
+            data = self.chart_data(chart, top_n)
+            if self.executor is not None:
+                return self.executor.submit(render_chart, chart, data, fmt)
+            future = Future()
+            future.set_result(render_chart(chart, data, fmt))
+            return future
+
+        key = (chart, (fmt,), (('top_n', top_n),))
+        future = self.cache.get_or_compute(key, self.flight_db.version, submit)
+        try:
+            return future.result()
+        except Exception:
+            # Only finished charts are kept: the next request draws a failed one again
+            self.cache.discard(key, future)
+            raise
 
     def plot_flights_per_year(self):
         """
         Plot the number of flights taken per year as a bar chart.
         """
-        data = defaultdict(int)
-        for flight in self.flight_db.flights:
-            data[flight.date.year] += 1
-
-        years = sorted(data.keys())
-        counts = [data[year] for year in years]
-
-        plt.figure(figsize=(8, 5))
-        sns.barplot(x=years, y=counts, hue=years, palette="Blues_d", legend=False)
-        plt.title("Flights Per Year")
-        plt.xlabel("Year")
-        plt.ylabel("Number of Flights")
-        plt.tight_layout()
+        plt = _pyplot()
+        _draw_flights_per_year(plt.figure(figsize=(8, 5)), self.chart_data('flights_per_year'))
         plt.show()
 
     def plot_top_routes(self, top_n=5):
@@ -45,34 +124,16 @@ class FlightVisualizer:
         Args:
             top_n (int): Number of top routes to display.
         """
-        routes = Counter(f"{f.from_iata} → {f.to_iata}" for f in self.flight_db.flights)
-        top_routes = routes.most_common(top_n)
-
-        labels, counts = zip(*top_routes)
-
-        plt.figure(figsize=(10, 5))
-        sns.barplot(x=list(labels), y=list(counts), hue=labels, palette="Oranges_r", legend=False)
-        plt.title(f"Top {top_n} Busiest Routes")
-        plt.xlabel("Route")
-        plt.ylabel("Number of Flights")
-        plt.xticks(rotation=45)
-        plt.tight_layout()
+        plt = _pyplot()
+        _draw_top_routes(plt.figure(figsize=(10, 5)), self.chart_data('top_routes', top_n))
         plt.show()
 
     def plot_class_distribution(self):
         """
         Plot a pie chart showing the distribution of flight classes (e.g., Economy, Business).
         """
-        class_counts = Counter(f.flight_class for f in self.flight_db.flights)
-
-        labels = list(class_counts.keys())
-        sizes = list(class_counts.values())
-
-        plt.figure(figsize=(6, 6))
-        plt.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=140,
-                colors=sns.color_palette("pastel"))
-        plt.title("Flight Class Distribution")
-        plt.tight_layout()
+        plt = _pyplot()
+        _draw_class_distribution(plt.figure(figsize=(6, 6)), self.chart_data('class_distribution'))
         plt.show()
 
     def plot_route_sankey(self, top_n=10):
@@ -82,30 +143,103 @@ class FlightVisualizer:
         Args:
             top_n (int): Number of top routes to display.
         """
-        # Count top routes
-        route_counts = Counter((f.from_iata, f.to_iata) for f in self.flight_db.flights)
-        most_common = route_counts.most_common(top_n)
-
-        airports = list(set([r[0] for r, _ in most_common] + [r[1] for r, _ in most_common]))
-        airport_index = {airport: i for i, airport in enumerate(airports)}
-
-        source_indices = [airport_index[route[0]] for route, _ in most_common]
-        target_indices = [airport_index[route[1]] for route, _ in most_common]
-        values = [count for _, count in most_common]
-
-        fig = go.Figure(data=[go.Sankey(
-            node=dict(
-                pad=15,
-                thickness=20,
-                line=dict(color="black", width=0.5),
-                label=airports,
-                color="blue"
-            ),
-            link=dict(
-                source=source_indices,
-                target=target_indices,
-                value=values
-            ))])
-
-        fig.update_layout(title_text="Flight Route Flow (Top Routes)", font=dict(size=10, color='darkblue'))
-        fig.show()
+        _sankey_figure(self.chart_data('route_sankey', top_n)).show()
+
+
+def render_chart(chart, data, fmt):
+    """
+    Draw a chart from chart_data() output and encode it. Runs in worker processes.
+
+    matplotlib charts are drawn on a standalone Figure with the Agg canvas, so pyplot's global
+    state and the interactive backend are never touched.
+    """
+    if chart == 'route_sankey':
+        fig = _sankey_figure(data)
+        return fig.to_json().encode() if fmt == 'json' else fig.to_image(format=fmt)
+
+    _seaborn()
+    from matplotlib.figure import Figure
+
+    draw, _, figsize = CHARTS[chart]
+    fig = Figure(figsize=figsize)
+    draw(fig, data)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+@functools.cache
+def _seaborn():
+    """Import seaborn and apply the chart theme, once, before the first figure is created."""
+    import seaborn as sns
+    sns.set(style="whitegrid")
+    return sns
+
+
+def _pyplot():
+    _seaborn()
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def _draw_flights_per_year(fig, data):
+    sns = _seaborn()
+    ax = fig.add_subplot()
+    years = data['years']
+    sns.barplot(x=years, y=data['counts'], hue=years, palette="Blues_d", legend=False, ax=ax)
+    ax.set_title("Flights Per Year")
+    ax.set_xlabel("Year")
+    ax.set_ylabel("Number of Flights")
+    fig.tight_layout()
+
+
+def _draw_top_routes(fig, data):
+    sns = _seaborn()
+    ax = fig.add_subplot()
+    labels = [f"{origin} → {destination}" for (origin, destination), _ in data['routes']]
+    counts = [count for _, count in data['routes']]
+    sns.barplot(x=labels, y=counts, hue=labels, palette="Oranges_r", legend=False, ax=ax)
+    ax.set_title(f"Top {data['top_n']} Busiest Routes")
+    ax.set_xlabel("Route")
+    ax.set_ylabel("Number of Flights")
+    ax.tick_params(axis='x', labelrotation=45)
+    fig.tight_layout()
+
+
+def _draw_class_distribution(fig, data):
+    sns = _seaborn()
+    ax = fig.add_subplot()
+    ax.pie(data['sizes'], labels=data['labels'], autopct='%1.1f%%', startangle=140,
+           colors=sns.color_palette("pastel"))
+    ax.set_title("Flight Class Distribution")
+    fig.tight_layout()
+
+
+def _sankey_figure(data):
+    import plotly.graph_objects as go
+
+    fig = go.Figure(data=[go.Sankey(
+        node=dict(
+            pad=15,
+            thickness=20,
+            line=dict(color="black", width=0.5),
+            label=data['nodes'],
+            color="blue"
+        ),
+        link=dict(
+            source=data['source'],
+            target=data['target'],
+            value=data['value']
+        ))])
+
+    fig.update_layout(title_text="Flight Route Flow (Top Routes)", font=dict(size=10, color='darkblue'))
+    return fig
+
+
+# Chart name -> (matplotlib draw function or None, default top_n or None, figure size)
+CHARTS = {
+    'flights_per_year': (_draw_flights_per_year, None, (8, 5)),
+    'top_routes': (_draw_top_routes, 5, (10, 5)),
+    'class_distribution': (_draw_class_distribution, None, (6, 6)),
+    'route_sankey': (None, 10, None),
+}
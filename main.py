@@ -7,20 +7,20 @@ def main():
     flight_db = FlightDatabase("csv_files/flights_test.csv")
 
     print("\n=== Sort by Date (Descending) ===")
-    flight_db.sort_by_date(reverse=True)
-    flight_db.display(6)
+    for f in flight_db.sorted_by_date(reverse=True)[:6]:
+        print(f)
 
     print("\n=== Sort by Date (Ascending) ===")
-    flight_db.sort_by_date(reverse=False)
-    flight_db.display(6)
+    for f in flight_db.sorted_by_date(reverse=False)[:6]:
+        print(f)
 
     print("\n=== Sort by Duration (Longest First) ===")
-    flight_db.sort_by_duration(reverse=True)
-    flight_db.display(3)
+    for f in flight_db.sorted_by_duration(reverse=True)[:3]:
+        print(f)
 
     print("\n=== Sort by Airline ===")
-    flight_db.sort_by_airline()
-    flight_db.display(3)
+    for f in flight_db.sorted_by_airline()[:3]:
+        print(f)
 
     print("\n=== Filter by Airline: Ryanair ===")
     ryanair_flights = flight_db.filter_by_airline("Ryanair")
@@ -0,0 +1,1007 @@
+import csv
+import importlib.util
+import json
+import os
+import tempfile
+import unittest
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.generate import write_csv
+from flight_analysis import Flight, FlightColumns, FlightDatabase, FlightSketches
+from flight_analysis.cache import QueryCache
+from flight_analysis.csvreader import read_columns, read_small_csv
+from flight_analysis.live import LiveDatabase
+from flight_analysis.sketches import CountMinSketch, HyperLogLog, TDigest
+from flight_analysis.streaming import csv_sketches, csv_stats, iter_column_batches
+
+QUANTILES = (0.01, 0.1, 0.5, 0.9, 0.99)
+
+
+class SketchTest(unittest.TestCase):
+    """The approximate aggregates against the exact FlightDatabase methods."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.path = write_csv(os.path.join(cls.tmp.name, 'flights.csv'), 20_000, seed=1)
+        cls.db = FlightDatabase(cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def assert_heavy_hitters(self, approx, exact, error):
+        """Estimates never undercount, overcount by at most error * flights and miss no clear winner."""
+        slack = error * len(self.db)
+        for key, estimate in approx:
+            self.assertGreaterEqual(estimate, exact[key])
+            self.assertLessEqual(estimate, exact[key] + slack)
+        cutoff = exact.most_common(len(approx))[-1][1]
+        for key, count in exact.most_common(len(approx)):
+            if count > cutoff + slack:
+                self.assertIn(key, dict(approx))
+
+    def test_distinct_counts(self):
+        db = self.db
+        for approx, exact in ((db.approx_unique_airports(), db.unique_airports()),
+                              (db.approx_unique_airlines(), db.unique_airlines())):
+            # Four standard errors
+            self.assertAlmostEqual(approx, len(exact), delta=0.04 * len(exact))
+
+    def test_heavy_hitters(self):
+        db = self.db
+        routes = db.stats.route_counts()
+        routes = type(routes)({f"{origin}->{destination}": count for (origin, destination), count in routes.items()})
+        self.assert_heavy_hitters(db.approx_busiest_routes(10), routes, 0.0005)
+        self.assertEqual([route for route, _ in db.approx_busiest_routes(3)],
+                         [route for route, _ in db.busiest_routes()[:3]])
+        self.assert_heavy_hitters(db.approx_flights_by_aircraft(10).most_common(), db.flights_by_aircraft(), 0.0005)
+        self.assertEqual(db.approx_most_used_airport()[0], db.most_used_airport()[0])
+
+    def test_duration_percentiles(self):
+        minutes = self.db.columns.arrays['duration_minutes']
+        approx = self.db.approx_duration_percentiles(QUANTILES)
+        exact = self.db.duration_percentiles(QUANTILES)
+        self.assertEqual(list(exact.values()), np.quantile(minutes, QUANTILES).tolist())
+        for q in QUANTILES:
+            # Rank error: the fraction of flights at or below the estimate
+            self.assertAlmostEqual(float(np.mean(minutes <= approx[q])), q, delta=0.01)
+
+    def test_error_bounds(self):
+        self.assertGreater(HyperLogLog(0.005).precision, HyperLogLog(0.02).precision)
+        self.assertGreater(CountMinSketch(0.0001).width, CountMinSketch(0.01).width)
+        self.assertGreater(CountMinSketch(confidence=0.999).depth, CountMinSketch(confidence=0.9).depth)
+
+        coarse = FlightDatabase(self.path, sketch_bounds={'distinct_error': 0.05, 'frequency_error': 0.01})
+        self.assertEqual(coarse.sketches.distinct['airport'].precision, HyperLogLog(0.05).precision)
+        self.assert_heavy_hitters(coarse.approx_flights_by_aircraft(10).most_common(),
+                                  coarse.flights_by_aircraft(), 0.01)
+
+        with self.assertRaises(ValueError):
+            HyperLogLog(0.01).merge(HyperLogLog(0.05))
+        with self.assertRaises(ValueError):
+            FlightSketches(frequency_error=0.01).merge(FlightSketches())
+
+    def test_hyperloglog(self):
+        keys = [f"key-{i}" for i in range(100_000)]
+        first, second = HyperLogLog(0.01), HyperLogLog(0.01)
+        first.add(keys[:60_000])
+        second.add(keys[40_000:])
+        self.assertAlmostEqual(first.estimate(), 60_000, delta=0.03 * 60_000)
+        first.merge(second)
+        self.assertAlmostEqual(first.estimate(), 100_000, delta=0.03 * 100_000)
+        self.assertEqual(HyperLogLog().estimate(), 0)
+
+    def test_tdigest(self):
+        values = np.random.default_rng(0).lognormal(5, 1, 100_000)
+        digest = TDigest(100)
+        for chunk in np.array_split(values, 10):
+            digest.add(chunk)
+        self.assertLessEqual(len(digest.means), 2 * digest.compression)
+        self.assertEqual(digest.quantile(0), values.min())
+        self.assertEqual(digest.quantile(1), values.max())
+        for q in QUANTILES:
+            self.assertAlmostEqual(float(np.mean(values <= digest.quantile(q))), q, delta=0.005)
+
+    def test_merge_shards(self):
+        whole = self.db.sketches
+        shards = [FlightSketches.from_columns(batch) for batch in iter_column_batches(self.path, 6_000)]
+        merged = shards[0]
+        for shard in shards[1:]:
+            merged.merge(shard)
+
+        # Keys are hashed by name, so shards with their own tables fill the same registers and cells
+        self.assertEqual(merged.count, whole.count)
+        for name, sketch in whole.distinct.items():
+            np.testing.assert_array_equal(merged.distinct[name].registers, sketch.registers)
+        for name, sketch in whole.frequent.items():
+            np.testing.assert_array_equal(merged.frequent[name].sketch.table, sketch.sketch.table)
+        self.assertEqual(merged.busiest_routes(10), whole.busiest_routes(10))
+        self.assertEqual(csv_sketches(self.path, 5_000).top_airports(10), whole.top_airports(10))
+
+        minutes = self.db.columns.arrays['duration_minutes']
+        for q, value in merged.duration_percentiles(QUANTILES).items():
+            self.assertAlmostEqual(float(np.mean(minutes <= value)), q, delta=0.01)
+
+    def test_appends(self):
+        db = FlightDatabase(self.path)
+        sketches = db.sketches
+        extra = FlightDatabase('csv_files/flights_test.csv')
+        db.append(extra.flights)
+        self.assertIs(db.sketches, sketches)
+        self.assertEqual(sketches.count, len(db))
+
+        fresh = FlightSketches.from_columns(db.columns)
+        for name, sketch in fresh.distinct.items():
+            np.testing.assert_array_equal(sketches.distinct[name].registers, sketch.registers)
+        self.assertEqual(db.approx_busiest_routes(10), fresh.busiest_routes(10))
+
+
+class GrowthTest(unittest.TestCase):
+    """A database grown by append(), ingest_rows() and poll() against a fresh load of the same rows."""
+
+    WINDOWS = (('2012-01-01', '2015-06-30'), ('2019-03-15', '2019-03-15'), ('2000-01-01', '2030-01-01'))
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.frame = pd.read_csv(write_csv(os.path.join(cls.tmp.name, 'all.csv'), 3_000, seed=2))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def write(self, name, df):
+        path = os.path.join(self.tmp.name, name)
+        df.to_csv(path, index=False)
+        return path
+
+    def grown(self, df):
+        """Load the first third, then build every derived structure before adding the rest."""
+        db = FlightDatabase(self.write('base.csv', df[:1_000]))
+        db.stats, db.index, db.timeseries, db.routes, db.sketches, db.flights
+        return db
+
+    def assert_same(self, grown, fresh):
+        self.assertEqual(len(grown), len(fresh))
+        # Compared as dicts: rows ingested from csv.DictReader have None where a loaded CSV has NaN
+        self.assertEqual([flight.to_dict() for flight in grown.flights], [flight.to_dict() for flight in fresh.flights])
+        for name in ('busiest_routes', 'flights_by_airline', 'flights_by_aircraft', 'unique_airports',
+                     'most_used_airport', 'total_flight_hours', 'flight_hours_per_year', 'flights_per_year',
+                     'connected_components', 'approx_unique_airports', 'approx_busiest_routes'):
+            self.assertEqual(getattr(grown, name)(), getattr(fresh, name)(), name)
+
+        airlines = [airline for airline, _ in fresh.flights_by_airline().most_common(3)]
+        for airline in airlines:
+            self.assertEqual(grown.index.airline(airline).tolist(), fresh.index.airline(airline).tolist())
+        for flight_class in ('Economy', 'Business'):
+            self.assertEqual(grown.index.flight_class(flight_class).tolist(),
+                             fresh.index.flight_class(flight_class).tolist())
+        for (origin, destination), _ in fresh.top_routes(3):
+            self.assertEqual(grown.index.route(origin, destination).tolist(),
+                             fresh.index.route(origin, destination).tolist())
+        for start, end in self.WINDOWS:
+            self.assertEqual([flight.to_dict() for flight in grown.filter_by_date_range(start, end)],
+                             [flight.to_dict() for flight in fresh.filter_by_date_range(start, end)])
+            for airline in (None, *airlines):
+                self.assertEqual(grown.flights_between(start, end, airline), fresh.flights_between(start, end, airline))
+                self.assertEqual(grown.flight_hours_between(start, end, airline),
+                                 fresh.flight_hours_between(start, end, airline))
+        for freq in ('day', 'week', 'month'):
+            self.assertEqual(grown.flights_per_period(freq), fresh.flights_per_period(freq))
+            self.assertEqual(grown.flight_hours_per_period(freq, airline_name=airlines[0]),
+                             fresh.flight_hours_per_period(freq, airline_name=airlines[0]))
+
+    def check_appends(self, df):
+        db = self.grown(df)
+        db.append(FlightDatabase(self.write('middle.csv', df[1_000:2_000])).flights)
+        with open(self.write('rest.csv', df[2_000:]), newline='', encoding='utf-8') as f:
+            db.ingest_rows(csv.DictReader(f))
+        self.assert_same(db, FlightDatabase(self.write('all.csv', df)))
+
+    def test_out_of_order_appends(self):
+        # Random dates: every batch holds flights older than the ones indexed, so they are merged in
+        self.check_appends(self.frame)
+
+    def test_in_order_appends(self):
+        self.check_appends(self.frame.sort_values('Date', kind='stable').reset_index(drop=True))
+
+    def test_poll(self):
+        path = os.path.join(self.tmp.name, 'log.csv')
+        open(path, 'w').close()
+        db = FlightDatabase(path, follow=True)
+        self.assertEqual(len(db), 0)
+        self.assertEqual(db.poll(), 0)
+
+        lines = self.frame.to_csv(index=False).splitlines(keepends=True)
+        for start, stop in ((0, 1), (1, 1_200), (1_200, len(lines))):
+            with open(path, 'a', newline='', encoding='utf-8') as f:
+                f.writelines(lines[start:stop])
+            self.assertEqual(db.poll(), stop - max(start, 1))
+            if start == 1:
+                db.stats, db.index, db.timeseries, db.routes, db.sketches, db.flights
+        self.assert_same(db, FlightDatabase(path))
+
+
+SAMPLE_CSV = 'csv_files/flights_test.csv'
+
+
+def sample_text():
+    """The sample log as strings, exactly as written in the file (empty cells stay empty)."""
+    return pd.read_csv(SAMPLE_CSV, dtype=str, keep_default_na=False)
+
+
+class FromFrameTest(unittest.TestCase):
+    """Flight.from_frame against the row-by-row Flight.from_row it replaces."""
+
+    def check(self, df):
+        expected = [repr(Flight.from_row(row)) for _, row in df.iterrows()]
+        self.assertEqual([repr(flight) for flight in Flight.from_frame(df)], expected)
+
+    def test_sample(self):
+        self.check(pd.read_csv(SAMPLE_CSV))
+
+    def test_fallback_rows(self):
+        text = sample_text()
+        text.loc[0, 'From'] = 'Cancun / Cancun ( CUN / MMUN )'
+        text.loc[1, 'To'] = 'Istanbul / Istanbul Airport (IST /LTFM)'
+        text.loc[2, 'Airline'] = 'Ryanair ( FR / RYR )'
+        text.loc[3, 'Registration'] = 'SP-LWA'
+        text.loc[4, 'Seat type'] = ''
+        text.loc[5, ['Dep_id', 'Airline_id']] = ''
+        text.loc[6, 'Aircraft_id'] = ''
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'flights.csv')
+            text.to_csv(path, index=False)
+            df = pd.read_csv(path)
+        self.assertTrue(df['Registration'].isna().any() and df['Seat type'].isna().any())
+        self.check(df)
+
+
+def set_cell(column, row, value):
+    """A change to sample_text() setting one cell."""
+    def change(text):
+        text.loc[row, column] = value
+        return text
+    return change
+
+
+class CsvReaderTest(unittest.TestCase):
+    """The stdlib reader for small files against FlightColumns.from_frame(pd.read_csv(...))."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def check(self, change, deferred):
+        """Write the sample with change applied and compare both readers; deferred: pandas must parse it."""
+        text = change(sample_text())
+        path = os.path.join(self.tmp.name, 'flights.csv')
+        text.to_csv(path, index=False)
+        expected = FlightColumns.from_frame(pd.read_csv(path))
+
+        small = read_small_csv(path)
+        self.assertEqual(small is None, deferred)
+        columns = read_columns(path)
+        self.assertEqual([repr(flight) for flight in columns.rows()], [repr(flight) for flight in expected.rows()])
+        # repr, since missing table entries are NaN
+        self.assertEqual(repr(columns.tables), repr(expected.tables))
+        for name, array in expected.arrays.items():
+            np.testing.assert_array_equal(columns.arrays[name], array, err_msg=name)
+
+    def test_handled(self):
+        for change in (lambda text: text,
+                       set_cell('From', 0, 'Cancun / Cancun ( CUN / MMUN )'),
+                       set_cell('Registration', 1, 'NA'),
+                       set_cell('Seat number', 0, '12'),
+                       set_cell('Flight class', 0, '01'),
+                       set_cell('Dep time', 0, '7:05:00'),
+                       set_cell('Aircraft', 0, 'Boeing'),
+                       set_cell('Dep_id', 0, ''),
+                       lambda text: text.assign(Registration=''),
+                       lambda text: text.drop(columns=['Dep_id', 'Arr_id', 'Airline_id', 'Aircraft_id'])):
+            with self.subTest(change=change):
+                self.check(change, deferred=False)
+
+    def test_deferred_to_pandas(self):
+        for change in (set_cell('Flight number', 0, 'NA'),
+                       set_cell('Flight number', 0, ''),
+                       set_cell('Seat number', 2, 'N/A'),
+                       lambda text: text.assign(**{'Flight number': [str(1000 + i) for i in range(len(text))]}),
+                       lambda text: text.assign(Registration=[str(i) for i in range(len(text))]),
+                       lambda text: text.assign(**{'Seat number': [str(i) for i in range(len(text))]}),
+                       set_cell('Date', 0, '2019-10-26 10:00:00'),
+                       set_cell('Date', 0, '10/26/2019'),
+                       lambda text: text.assign(Dep_id=[f"{value}.0" for value in text['Dep_id']]),
+                       set_cell('Flight class', 0, 'Economy'),
+                       lambda text: text.drop(columns=['Registration'])):
+            with self.subTest(change=change):
+                self.check(change, deferred=True)
+
+    def test_empty(self):
+        path = os.path.join(self.tmp.name, 'empty.csv')
+        with open(SAMPLE_CSV, encoding='utf-8') as f, open(path, 'w', encoding='utf-8') as out:
+            out.write(f.readline())
+        self.assertIsNone(read_small_csv(path))
+
+
+class AppTest(unittest.TestCase):
+    """The endpoints of app.py, served from a generated log."""
+
+    @classmethod
+    def setUpClass(cls):
+        import app
+
+        cls.app = app
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.live = LiveDatabase(write_csv(os.path.join(cls.tmp.name, 'flights.csv'), 3_000, seed=3))
+        cls.live.reload()
+        cls.db = cls.live.current()[1]
+        cls.patch = mock.patch.multiple(app, live=cls.live, _chart_pool=None, _visualizers={})
+        cls.patch.start()
+        cls.client = app.app.test_client()
+
+    @classmethod
+    def tearDownClass(cls):
+        if cls.app._chart_pool is not None:
+            cls.app._chart_pool.shutdown()
+        cls.patch.stop()
+        cls.tmp.cleanup()
+
+    def test_filter_pages(self):
+        db = self.db
+        airline = db.flights_by_airline().most_common(1)[0][0]
+        route = db.top_routes(1)[0][0]
+        for name, params, flights in (
+                ('filter_by_class', {'flight_class': 'Economy'}, db.filter_by_class('Economy')),
+                ('filter_by_airline', {'airline_name': airline.upper()}, db.filter_by_airline(airline.upper())),
+                ('filter_by_route', {'from_iata': route[0], 'to_iata': route[1]}, db.filter_by_route(*route)),
+                ('filter_by_date_range', {'start_date': '2015-01-01', 'end_date': '2016-12-31'},
+                 db.filter_by_date_range('2015-01-01', '2016-12-31'))):
+            expected = [flight.to_dict() for flight in flights]
+            for page, page_size in ((1, 50), (3, 7), (10_000, 20)):
+                with self.subTest(name=name, page=page, page_size=page_size):
+                    data = self.client.get(f'/api/{name}', query_string={**params, 'page': page,
+                                                                         'page_size': page_size}).get_json()
+                    self.assertEqual(data['total'], len(expected))
+                    self.assertEqual(data['pages'], max(-(-len(expected) // page_size), 1))
+                    start = (data['page'] - 1) * page_size
+                    self.assertEqual(data['result'], json.loads(json.dumps(expected[start:start + page_size])))
+
+    def test_api_errors_and_revalidation(self):
+        response = self.client.get('/api/flights_by_airline')
+        self.assertEqual(response.status_code, 200)
+        # The body is the same in every worker process, like the ETag
+        self.assertEqual(set(response.get_json()), {'query', 'version', 'result'})
+        revalidated = self.client.get('/api/flights_by_airline', headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual((revalidated.status_code, revalidated.data), (304, b''))
+
+        self.assertEqual(self.client.get('/api/filter_by_route?from_iata=KRK').status_code, 400)
+        self.assertEqual(self.client.get('/api/filter_by_class').status_code, 400)
+        bad_date = self.client.get('/api/filter_by_date_range?start_date=someday&end_date=2020-01-01')
+        self.assertEqual(bad_date.status_code, 400)
+        self.assertIn('error', bad_date.get_json())
+        self.assertEqual(self.client.get('/api/no_such_query').status_code, 404)
+
+    def test_page_clamping(self):
+        from app import MAX_PAGE_SIZE
+
+        expected = json.loads(json.dumps([flight.to_dict() for flight in self.db.sorted_by_date(reverse=True)]))
+        for params, (page, pages, page_size) in (
+                ({'page_size': 10 * MAX_PAGE_SIZE}, (1, 3, MAX_PAGE_SIZE)),
+                ({'page_size': 0}, (1, 3_000, 1)),
+                ({'page': -2, 'page_size': 700}, (1, 5, 700)),
+                ({'page': 99, 'page_size': 700}, (5, 5, 700))):
+            with self.subTest(**params):
+                data = self.client.get('/api/sort_by_date', query_string=params).get_json()
+                self.assertEqual((data['page'], data['pages'], data['page_size'], data['total']),
+                                 (page, pages, page_size, 3_000))
+                self.assertEqual(data['result'], expected[(page - 1) * page_size:page * page_size])
+
+    def test_export(self):
+        db = self.db
+        airline = db.flights[0].airline_name
+        response = self.client.get(f'/export.csv?airline={airline}&flight_class=Economy&sort=date&reverse=1&limit=40')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Disposition'], 'attachment; filename="flights.csv"')
+        target = os.path.join(self.tmp.name, 'export.csv')
+        with open(target, 'wb') as f:
+            f.write(response.data)
+        query = db.query().where(airline=airline, flight_class='Economy').order_by('date', reverse=True).limit(40)
+        self.assertEqual([flight.to_dict() for flight in FlightDatabase(target).flights],
+                         [flight.to_dict() for flight in query.flights()])
+
+        lines = self.client.get('/export.ndjson?reason=Leisure').data.decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines],
+                         [flight.to_dict() for flight in db.flights if flight.flight_reason == 'Leisure'])
+
+        for params in ('from_iata=KRK', 'sort=price', 'limit=-1', 'start_date=someday&end_date=2020-01-01'):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get('/export.csv?' + params).status_code, 400)
+        self.assertEqual(self.client.get('/export.xlsx').status_code, 404)
+
+    def test_charts(self):
+        response = self.client.get('/charts/top_routes.svg?top_n=3')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'image/svg+xml')
+        self.assertIn(b'<svg', response.data)
+        self.assertEqual(self.client.get('/charts/flights_per_year.png').data[:8], b'\x89PNG\r\n\x1a\n')
+
+        revalidated = self.client.get('/charts/top_routes.svg?top_n=3',
+                                      headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated.headers['ETag'], response.headers['ETag'])
+
+        self.assertEqual(self.client.get('/charts/top_routes.svg?top_n=0').status_code, 400)
+        self.assertEqual(self.client.get('/charts/class_distribution.json').status_code, 400)
+        self.assertEqual(self.client.get('/charts/no_such_chart.svg').status_code, 404)
+
+    def test_failed_chart_is_not_cached(self):
+        from flight_analysis import visualizer
+
+        # Render in this process, so the patched render_chart is the one called
+        with mock.patch.multiple(self.app, _chart_pool=ThreadPoolExecutor(1), _visualizers={}), \
+                mock.patch.object(visualizer, 'render_chart', side_effect=[RuntimeError('worker failed'), b'<svg/>']):
+            self.assertEqual(self.client.get('/charts/class_distribution.svg').status_code, 500)
+            response = self.client.get('/charts/class_distribution.svg')
+            self.assertEqual((response.status_code, response.data), (200, b'<svg/>'))
+            self.app._chart_pool.shutdown()
+
+class StreamingStatsTest(unittest.TestCase):
+    """csv_stats() over small chunks against the stats of a FlightDatabase of the whole file."""
+
+    def test_matches_database(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = write_csv(os.path.join(tmp, 'flights.csv'), 5_000, seed=4)
+            expected = FlightDatabase(path).stats
+            stats = csv_stats(path, chunksize=333)
+
+        self.assertEqual(stats.count, expected.count)
+        self.assertEqual(stats.total_flight_hours(), expected.total_flight_hours())
+        self.assertAlmostEqual(stats.average_duration(), expected.average_duration())
+        for name in ('flights_by_airline', 'flights_by_aircraft', 'flights_by_class', 'route_counts',
+                     'flight_hours_per_airline', 'flight_hours_per_year', 'flights_per_year', 'unique_airlines',
+                     'unique_airports', 'most_used_airport'):
+            with self.subTest(name=name):
+                self.assertEqual(getattr(stats, name)(), getattr(expected, name)())
+        self.assertEqual(stats.busiest_routes(20), expected.busiest_routes(20))
+        # Only the tables the totals count are kept
+        for table in ('flight_number', 'seat_number', 'registration'):
+            self.assertEqual(stats.tables[table], [])
+
+class FlightQueryTest(unittest.TestCase):
+    """FlightQuery against a naive filter and sort over db.flights."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.db = FlightDatabase(write_csv(os.path.join(cls.tmp.name, 'flights.csv'), 4_000, seed=5))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def naive(self, conditions, order, count):
+        flights = self.db.flights
+        tests = {
+            'airline': lambda flight, name: flight.airline_name.lower() == name.lower(),
+            'flight_class': lambda flight, name: flight.flight_class == name,
+            'reason': lambda flight, name: flight.flight_reason == name,
+            'route': lambda flight, route: (flight.from_iata, flight.to_iata) == route,
+            'date_between': lambda flight, window: pd.Timestamp(window[0]) <= flight.date <= pd.Timestamp(window[1]),
+        }
+        positions = [i for i, flight in enumerate(flights)
+                     if all(tests[name](flight, value) for name, value in conditions.items())]
+        if order is not None:
+            key, reverse = order
+            sort_key = {'date': lambda i: flights[i].date, 'duration': lambda i: flights[i].duration_minutes,
+                        'airline': lambda i: flights[i].airline_name}[key]
+            positions.sort(key=sort_key, reverse=reverse)
+        return positions if count is None else positions[:count]
+
+    def test_against_naive_filter(self):
+        db = self.db
+        first = db.flights[0]
+        conditions = {
+            'airline': first.airline_name.upper(),
+            'flight_class': 'Economy',
+            'reason': first.flight_reason,
+            'route': db.top_routes(1)[0][0],
+            'date_between': ('2014-03-01', '2019-08-31'),
+        }
+        chosen = [(), ('airline',), ('flight_class',), ('route',), ('date_between',), ('flight_class', 'reason'),
+                  ('airline', 'date_between'), ('flight_class', 'reason', 'date_between')]
+        orders = [None, ('date', False), ('date', True), ('duration', False), ('duration', True),
+                  ('airline', False), ('airline', True)]
+        for names in chosen:
+            for order in orders:
+                for count in (None, 0, 1, 25, 500):
+                    with self.subTest(where=names, order=order, limit=count):
+                        query = db.query().where(**{name: conditions[name] for name in names})
+                        if order is not None:
+                            query = query.order_by(*order)
+                        if count is not None:
+                            query = query.limit(count)
+                        expected = self.naive({name: conditions[name] for name in names}, order, count)
+                        self.assertEqual(query.positions().tolist(), expected)
+
+    def test_limit_keeps_ties_in_row_order(self):
+        # Far more flights than durations or airlines, so the limit cuts through ties
+        for key in ('duration', 'airline'):
+            for reverse in (False, True):
+                for count in (1, 10, 333, 3_999):
+                    with self.subTest(key=key, reverse=reverse, limit=count):
+                        query = self.db.query().where(flight_class='Economy').order_by(key, reverse).limit(count)
+                        expected = self.naive({'flight_class': 'Economy'}, (key, reverse), count)
+                        self.assertEqual(query.positions().tolist(), expected)
+
+    def test_large_results_are_not_cached(self):
+        db = self.db
+        route = db.top_routes(1)[0][0]
+        db.cache.clear()
+        db.query().order_by('date').limit(10).positions()
+        self.assertEqual(len(db.cache), 0)
+        economy = db.query().where(flight_class='Economy')
+        with mock.patch('flight_analysis.query.CACHED_POSITIONS', len(db.index.flight_class('Economy')) - 1):
+            self.assertIsNot(economy.positions(), economy.positions())
+            self.assertEqual(len(db.cache), 0)
+            db.query().where(route=route).positions()
+            self.assertEqual(len(db.cache), 1)
+        positions = economy.positions()
+        self.assertIs(economy.positions(), positions)
+        self.assertFalse(positions.flags.writeable)
+
+class ExportTest(unittest.TestCase):
+    """FlightDatabase.export() read back, for every format."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.path = write_csv(os.path.join(cls.tmp.name, 'flights.csv'), 3_000, seed=6)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_csv_round_trip(self):
+        for source in (SAMPLE_CSV, self.path):
+            with self.subTest(source=source):
+                db = FlightDatabase(source)
+                target = os.path.join(self.tmp.name, 'export.csv')
+                db.export(target)
+                self.assertEqual([flight.to_dict() for flight in FlightDatabase(target).flights],
+                                 [flight.to_dict() for flight in db.flights])
+
+    def test_csv_query(self):
+        db = FlightDatabase(self.path)
+        query = db.query().where(flight_class='Economy').order_by('duration', reverse=True).limit(100)
+        target = os.path.join(self.tmp.name, 'query.csv')
+        db.export(target, query=query)
+        self.assertEqual([flight.to_dict() for flight in FlightDatabase(target).flights],
+                         [flight.to_dict() for flight in query.flights()])
+
+    def test_ndjson(self):
+        db = FlightDatabase(SAMPLE_CSV)
+        target = os.path.join(self.tmp.name, 'export.ndjson')
+        db.export(target)
+        with open(target, encoding='utf-8') as f:
+            self.assertEqual([json.loads(line) for line in f], [flight.to_dict() for flight in db.flights])
+
+    @unittest.skipUnless(importlib.util.find_spec('pyarrow'), "needs pyarrow")
+    def test_parquet(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        db = FlightDatabase(self.path)
+        target = os.path.join(self.tmp.name, 'export.parquet')
+        with open(target, 'wb') as f:
+            f.writelines(db.export_chunks('parquet', chunk_size=700))
+        parquet = pq.ParquetFile(target)
+        self.assertEqual(parquet.metadata.num_rows, len(db))
+        self.assertEqual(parquet.metadata.num_row_groups, 5)
+        schema = parquet.schema_arrow
+        self.assertEqual(schema.names, list(Flight.FIELDS))
+        self.assertEqual(schema.field('date').type, pa.date32())
+        # Parquet has no seconds unit, so time32('s') comes back as milliseconds
+        self.assertEqual(schema.field('dep_time').type, pa.time32('ms'))
+        self.assertEqual(schema.field('airline_name').type, pa.dictionary(pa.int32(), pa.string()))
+        table = parquet.read()
+        for field in ('flight_number', 'airline_name', 'to_iata', 'registration', 'flight_class', 'duration_minutes'):
+            with self.subTest(field=field):
+                self.assertEqual(table.column(field).to_pylist(), [flight.to_dict()[field] for flight in db.flights])
+
+class QueryCacheTest(unittest.TestCase):
+    """QueryCache and the @cached_query FlightDatabase methods."""
+
+    def test_hits_misses_and_versions(self):
+        cache = QueryCache()
+        computed = []
+
+        def compute():
+            computed.append(True)
+            return len(computed)
+
+        key = ('top_routes', (5,), ())
+        self.assertEqual(cache.get_or_compute(key, 0, compute), 1)
+        self.assertEqual(cache.get_or_compute(key, 0, compute), 1)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        # An entry from an older version is recomputed
+        self.assertEqual(cache.get_or_compute(key, 1, compute), 2)
+        self.assertEqual(cache.get_or_compute(key, 1, compute), 2)
+        # A result computed for an older version doesn't replace a newer one
+        self.assertEqual(cache.get_or_compute(key, 0, compute), 3)
+        self.assertEqual(cache.get_or_compute(key, 1, compute), 2)
+        self.assertEqual(cache.stats(), {'hits': 3, 'misses': 3, 'size': 1, 'maxsize': 256})
+
+    def test_lru_eviction(self):
+        cache = QueryCache(maxsize=3)
+        for n in range(3):
+            cache.get_or_compute(('top_routes', (n,), ()), 0, lambda: n)
+        # Using 0 makes 1 the least recently used
+        cache.get_or_compute(('top_routes', (0,), ()), 0, lambda: 'recomputed')
+        cache.get_or_compute(('top_routes', (3,), ()), 0, lambda: 3)
+        self.assertEqual(len(cache), 3)
+        for n, expected in ((0, 0), (2, 2), (3, 3), (1, 'recomputed')):
+            self.assertEqual(cache.get_or_compute(('top_routes', (n,), ()), 0, lambda: 'recomputed'), expected)
+        # Aggregates without arguments are kept outside the LRU
+        cache.get_or_compute(('average_duration', (), ()), 0, lambda: 1.5)
+        self.assertEqual(len(cache), 4)
+
+    def test_cached_methods(self):
+        db = FlightDatabase(SAMPLE_CSV)
+        by_airline = db.flights_by_airline()
+        self.assertEqual(db.flights_by_airline(), by_airline)
+        self.assertEqual((db.cache.hits, db.cache.misses), (1, 1))
+
+        # Callers get copies: changing one doesn't change what the cache serves
+        by_airline['Changed'] = 1_000
+        routes = db.top_routes(3)
+        routes.clear()
+        self.assertNotIn('Changed', db.flights_by_airline())
+        self.assertEqual(len(db.top_routes(3)), 3)
+
+        # Appending bumps the version, so the stale totals are not served again
+        version = db.version
+        flight = db.flights[0]
+        route = (flight.from_iata, flight.to_iata)
+        flights_on_route = dict(db.top_routes(100))[route]
+        db.append([flight])
+        self.assertGreater(db.version, version)
+        self.assertEqual(db.flights_by_airline()[flight.airline_name], by_airline[flight.airline_name] + 1)
+        self.assertEqual(dict(db.top_routes(100))[route], flights_on_route + 1)
+
+        # So does sorting in place
+        version = db.version
+        hours = db.flight_hours_between('2000-01-01', '2030-12-31')
+        db.sort_by_duration()
+        self.assertGreater(db.version, version)
+        misses = db.cache.misses
+        self.assertEqual(db.flight_hours_between('2000-01-01', '2030-12-31'), hours)
+        self.assertEqual(db.cache.misses, misses + 1)
+
+class SnapshotTest(unittest.TestCase):
+    """FlightDatabase(path, snapshot=True): reuse, validation against the CSV and rebuilding."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = write_csv(os.path.join(self.tmp.name, 'flights.csv'), 2_000, seed=7)
+        self.directory = os.path.join(self.tmp.name, '.snapshots', 'flights.csv')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def current(self):
+        with open(os.path.join(self.directory, 'current.json'), encoding='utf-8') as f:
+            return json.load(f)
+
+    def generations(self):
+        return sorted(name for name in os.listdir(self.directory) if name.startswith('gen-'))
+
+    def test_reuse_and_rebuild(self):
+        first = FlightDatabase(self.path, snapshot=True)
+        generation = self.current()['generation']
+
+        second = FlightDatabase(self.path, snapshot=True)
+        self.assertTrue(second.columns.mapped)
+        self.assertEqual([flight.to_dict() for flight in second.flights],
+                         [flight.to_dict() for flight in first.flights])
+
+        # Same contents, new mtime: the SHA-256 matches, so the CSV is not parsed again
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        with mock.patch('flight_analysis.models.read_columns', side_effect=AssertionError("parsed again")):
+            touched = FlightDatabase(self.path, snapshot=True)
+        self.assertTrue(touched.columns.mapped)
+        self.assertEqual(len(touched), len(first))
+        self.assertEqual(self.current()['generation'], generation)
+
+        # New rows: the snapshot no longer matches and is rebuilt
+        with open(self.path, encoding='utf-8') as f:
+            last_line = f.read().splitlines()[-1]
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(last_line + '\n')
+        appended = FlightDatabase(self.path, snapshot=True)
+        self.assertEqual(len(appended), len(first) + 1)
+        self.assertNotEqual(self.current()['generation'], generation)
+        self.assertEqual(self.generations(), [self.current()['generation']])
+
+        reopened = FlightDatabase(self.path, snapshot=True)
+        self.assertTrue(reopened.columns.mapped)
+        self.assertEqual([flight.to_dict() for flight in reopened.flights],
+                         [flight.to_dict() for flight in appended.flights])
+
+class LiveDatabaseTest(unittest.TestCase):
+    """LiveDatabase behind app.py: readiness, pinned databases and failed reloads."""
+
+    def setUp(self):
+        import app
+
+        self.app = app
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = write_csv(os.path.join(self.tmp.name, 'flights.csv'), 500, seed=8)
+        self.live = LiveDatabase(self.path)
+        patch = mock.patch.object(app, 'live', self.live)
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.client = app.app.test_client()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_health_until_loaded(self):
+        health = self.client.get('/health')
+        self.assertEqual(health.status_code, 503)
+        self.assertEqual(health.get_json()['state'], 'loading')
+        waiting = self.client.get('/api/average_duration')
+        self.assertEqual((waiting.status_code, waiting.headers['Retry-After']), (503, '1'))
+
+        self.assertTrue(self.live.reload())
+        health = self.client.get('/health')
+        self.assertEqual(health.status_code, 200)
+        self.assertEqual((health.get_json()['state'], health.get_json()['rows']), ('ready', 500))
+        self.assertEqual(self.client.get('/api/average_duration').status_code, 200)
+
+    def test_request_keeps_its_database(self):
+        self.live.reload()
+        old = self.live.current()[1]
+        smaller = FlightDatabase(write_csv(os.path.join(self.tmp.name, 'smaller.csv'), 100, seed=9))
+        with self.app.app.test_request_context('/api/sort_by_date'):
+            self.app.app.preprocess_request()
+            self.live.swap(smaller)
+            self.assertIs(self.app.g.db, old)
+            self.assertEqual(self.app.api('sort_by_date').get_json()['total'], 500)
+        self.assertEqual(self.client.get('/api/sort_by_date').get_json()['total'], 100)
+        self.assertEqual(self.live.current()[0], 2)
+
+    def test_failed_reload_keeps_serving(self):
+        self.live.reload()
+        generation, db = self.live.current()
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('not,a,flight,log\n1,2,3,4\n')
+        self.assertFalse(self.live.reload())
+        self.assertEqual(self.live.current(), (generation, db))
+
+        health = self.client.get('/health')
+        self.assertEqual(health.status_code, 200)
+        self.assertEqual(health.get_json()['state'], 'ready')
+        self.assertIsNotNone(health.get_json()['error'])
+        self.assertEqual(self.client.get('/api/sort_by_date').get_json()['total'], 500)
+
+class MultiFileTest(unittest.TestCase):
+    """FlightDatabase over a directory, a glob or a list of CSVs."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.directory = os.path.join(cls.tmp.name, 'logs')
+        os.makedirs(cls.directory)
+        # Written out of name order, so sorting is visible
+        cls.paths = {name: write_csv(os.path.join(cls.directory, name), rows, seed=seed)
+                     for name, rows, seed in (('c.csv', 300, 10), ('a.csv', 500, 11), ('b.csv', 200, 12))}
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def concatenated(self, *names):
+        """to_dict() rows of one CSV holding the named files' rows in the given order."""
+        target = os.path.join(self.tmp.name, '-'.join(names))
+        with open(target, 'w', encoding='utf-8') as out:
+            for i, name in enumerate(names):
+                with open(self.paths[name], encoding='utf-8') as f:
+                    lines = f.readlines()
+                out.writelines(lines if i == 0 else lines[1:])
+        return [flight.to_dict() for flight in FlightDatabase(target).flights]
+
+    def test_sources_merge_in_path_order(self):
+        expected = self.concatenated('a.csv', 'b.csv', 'c.csv')
+        paths = self.paths
+        for source, workers in ((self.directory, None), (os.path.join(self.directory, '*.csv'), 2),
+                                ([paths['a.csv'], paths['b.csv'], paths['c.csv']], 1)):
+            with self.subTest(source=source, workers=workers):
+                db = FlightDatabase(source, workers=workers)
+                self.assertEqual([flight.to_dict() for flight in db.flights], expected)
+                self.assertEqual([load.path for load in db.load_report], sorted(paths.values()))
+        db = FlightDatabase([paths['c.csv'], paths['a.csv']])
+        self.assertEqual([flight.to_dict() for flight in db.flights], self.concatenated('c.csv', 'a.csv'))
+
+    def test_bad_files(self):
+        bad = os.path.join(self.tmp.name, 'bad.csv')
+        with open(bad, 'w', encoding='utf-8') as f:
+            f.write('not,a,flight,log\n1,2,3,4\n')
+        with self.assertWarnsRegex(UserWarning, "Skipped '.*bad.csv'"):
+            db = FlightDatabase([self.paths['a.csv'], bad, self.paths['b.csv']], workers=1)
+        self.assertEqual([flight.to_dict() for flight in db.flights], self.concatenated('a.csv', 'b.csv'))
+        self.assertEqual([load.rows for load in db.load_report], [500, 0, 200])
+        self.assertEqual([load.error is None for load in db.load_report], [True, False, True])
+
+        missing = os.path.join(self.tmp.name, 'missing.csv')
+        with self.assertRaisesRegex(ValueError, "Could not load any flight CSV"):
+            FlightDatabase([bad, missing], workers=1)
+
+class SortedViewTest(unittest.TestCase):
+    """sorted_by_*() against list.sort(), without touching the stored order."""
+
+    def test_views(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = FlightDatabase(write_csv(os.path.join(tmp, 'flights.csv'), 2_000, seed=13))
+        flights = db.flights
+        rows = [repr(flight) for flight in flights]
+        arrays = {name: array.copy() for name, array in db.columns.arrays.items()}
+        version = db.version
+
+        for name, key in (('date', lambda flight: flight.date), ('duration', lambda flight: flight.duration_minutes),
+                          ('airline', lambda flight: flight.airline_name)):
+            for reverse in (False, True):
+                with self.subTest(key=name, reverse=reverse):
+                    view = getattr(db, f'sorted_by_{name}')(reverse=reverse)
+                    # list.sort() is stable with reverse=True too: ties keep their row order
+                    expected = sorted(flights, key=key, reverse=reverse)
+                    self.assertEqual([id(flight) for flight in view], [id(flight) for flight in expected])
+
+        self.assertIs(db.flights, flights)
+        self.assertEqual([repr(flight) for flight in db.flights], rows)
+        self.assertEqual(db.version, version)
+        for name, array in arrays.items():
+            np.testing.assert_array_equal(db.columns.arrays[name], array)
+
+class RouteGraphTest(unittest.TestCase):
+    """The route graph queries against Counters over db.flights."""
+
+    def check(self, db):
+        flights = db.flights
+        per_route = Counter((flight.from_iata, flight.to_iata) for flight in flights)
+        minutes = Counter()
+        for flight in flights:
+            minutes[(flight.from_iata, flight.to_iata)] += int(flight.duration_minutes)
+        for n in (1, 5, 40, len(per_route) + 5):
+            with self.subTest(n=n):
+                self.assertEqual(db.top_routes(n), per_route.most_common(n))
+                self.assertEqual(db.top_routes(n, weight='minutes'), minutes.most_common(n))
+
+        top = per_route.most_common(8)
+        nodes = sorted({airport for route, _ in top for airport in route})
+        self.assertEqual(db.route_sankey(8), {
+            'nodes': nodes,
+            'source': [nodes.index(origin) for (origin, _), _ in top],
+            'target': [nodes.index(destination) for (_, destination), _ in top],
+            'value': [count for _, count in top],
+        })
+
+        airports = {flight.from_iata for flight in flights} | {flight.to_iata for flight in flights}
+        for iata in sorted(airports)[:10] + ['???']:
+            with self.subTest(iata=iata):
+                self.assertEqual(db.airport_degree(iata), {
+                    'destinations': len({to for origin, to in per_route if origin == iata}),
+                    'origins': len({origin for origin, to in per_route if to == iata}),
+                    'departures': sum(count for (origin, _), count in per_route.items() if origin == iata),
+                    'arrivals': sum(count for (_, to), count in per_route.items() if to == iata),
+                })
+
+    def test_against_counters(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = FlightDatabase(write_csv(os.path.join(tmp, 'flights.csv'), 3_000, seed=14))
+            extra = FlightDatabase(write_csv(os.path.join(tmp, 'extra.csv'), 300, seed=15)).flights
+        self.check(db)
+        # The graph is extended in place by append()
+        db.append(extra)
+        self.check(db)
+
+class TimeSeriesTest(unittest.TestCase):
+    """The date-window queries against a brute-force count over db.flights."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.db = FlightDatabase(write_csv(os.path.join(cls.tmp.name, 'flights.csv'), 3_000, seed=16))
+        cls.airline = cls.db.flights[0].airline_name
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def selected(self, start, end, airline):
+        """(date, minutes) of the flights in [start, end] (whole days), optionally of one airline."""
+        return [(flight.date.date(), int(flight.duration_minutes)) for flight in self.db.flights
+                if start <= flight.date.date() <= end
+                and (airline is None or flight.airline_name.lower() == airline.lower())]
+
+    @staticmethod
+    def period_start(day, freq):
+        if freq == 'day':
+            return day
+        if freq == 'week':
+            return day - timedelta(days=day.weekday())
+        return day.replace(day=1)
+
+    @staticmethod
+    def next_period(label, freq):
+        if freq == 'day':
+            return label + timedelta(days=1)
+        if freq == 'week':
+            return label + timedelta(days=7)
+        return (label.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+    def test_between(self):
+        for start, end in (('2010-01-01', '2030-12-31'), ('2016-02-10', '2016-05-03'), ('2015-12-30', '2015-12-30'),
+                           ('1990-01-01', '1990-01-20'), ('2017-01-01', '2016-01-01')):
+            for airline in (None, self.airline.upper()):
+                with self.subTest(start=start, end=end, airline=airline):
+                    selected = self.selected(date.fromisoformat(start), date.fromisoformat(end), airline)
+                    self.assertEqual(self.db.flights_between(start, end, airline), len(selected))
+                    self.assertEqual(self.db.flight_hours_between(start, end, airline),
+                                     round(sum(minutes for _, minutes in selected) / 60, 2))
+
+    def test_per_period(self):
+        dates = [flight.date.date() for flight in self.db.flights]
+        for window in ((None, None), ('2016-02-10', '2016-05-03'), ('2015-12-30', '2017-01-02'),
+                       ('1990-01-01', '1990-01-20')):
+            first, last = (date.fromisoformat(day) if day else default
+                           for day, default in zip(window, (min(dates), max(dates))))
+            for freq in ('day', 'week', 'month'):
+                for airline in (None, self.airline):
+                    with self.subTest(window=window, freq=freq, airline=airline):
+                        counts, minutes = Counter(), Counter()
+                        label = self.period_start(first, freq)
+                        while label <= last:
+                            counts[label] = minutes[label] = 0
+                            label = self.next_period(label, freq)
+                        for day, duration in self.selected(first, last, airline):
+                            counts[self.period_start(day, freq)] += 1
+                            minutes[self.period_start(day, freq)] += duration
+
+                        per_period = self.db.flights_per_period(freq, *window, airline_name=airline)
+                        self.assertEqual(list(per_period.items()), list(counts.items()))
+                        hours = self.db.flight_hours_per_period(freq, *window, airline_name=airline)
+                        self.assertEqual(hours, {label: round(total / 60, 2) for label, total in minutes.items()})
+
+class PerYearTest(unittest.TestCase):
+    """flights_per_year() and flight_hours_per_year(): ascending years, whatever the row order."""
+
+    def test_ascending_years(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = FlightDatabase(write_csv(os.path.join(tmp, 'flights.csv'), 2_000, seed=17))
+        db.sort_by_duration()
+        flights, minutes = Counter(), Counter()
+        for flight in db.flights:
+            flights[flight.date.year] += 1
+            minutes[flight.date.year] += int(flight.duration_minutes)
+        # In row order the years come out of order, as the per-flight loop used to return them
+        self.assertNotEqual(list(minutes), sorted(minutes))
+
+        self.assertEqual(list(db.flights_per_year().items()), sorted(flights.items()))
+        self.assertEqual(list(db.flight_hours_per_year().items()),
+                         [(year, round(minutes[year] / 60, 2)) for year in sorted(minutes)])
+
+if __name__ == '__main__':
+    unittest.main()